@@ -1,9 +1,29 @@
 # formats/base_format.py
+import io
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any, IO
+from itertools import chain, islice
+from typing import Callable, Dict, Any, IO, Iterable, Iterator, Optional, Tuple
 
 class BaseFormat(ABC):
     """Abstract Base Class for all output format serializers."""
+
+    # Keymap keys whose values are only final once the payload has been fully
+    # produced (or consumed). Streaming formats write them after the payload.
+    TRAILER_KEYS = ('integrity', 'run_index')
+    # Whether keymaps are read and written as bytes rather than text.
+    binary = False
+    # Whether the format stores universal bit runs rather than the strategy
+    # payload. Such formats implement deserialize_runs and serialize_runs
+    # (and serialize_update_runs if they are random_access).
+    stores_runs = False
+    # Whether keymaps can be read from recorded positions and copied in part,
+    # as serialize_update and the run index overrides of read_run_index and
+    # runs_from require.
+    random_access = True
+    # Bytes every keymap in this format starts with, which identify the format
+    # of a keymap read from stdin (None if there are none).
+    magic: Optional[bytes] = None
     
     @property
     @abstractmethod
@@ -26,3 +46,118 @@ class BaseFormat(ABC):
     def deserialize(self, stream: IO[str]) -> Dict[str, Any]:
         """Deserializes a stream into the keymap dictionary."""
         pass
+
+    def serialize_stream(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[str]):
+        """
+        Serializes a keymap whose payload is produced lazily. Values under
+        TRAILER_KEYS may still change until the payload iterator is exhausted.
+        The default implementation materializes the payload and calls serialize.
+        """
+        payload = list(payload)
+        self.serialize({**metadata, "payload": payload}, stream)
+
+    def deserialize_stream(self, stream: IO[str]) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        """
+        Deserializes a keymap into its metadata and a lazy iterator over the
+        payload. Values under TRAILER_KEYS are only guaranteed to be complete
+        once the payload iterator is exhausted. The default implementation
+        parses the whole keymap up front.
+        """
+        data = self.deserialize(stream)
+        payload = data.pop("payload", None) or []
+        return data, iter(payload)
+
+    def deserialize_runs(self, stream: IO[bytes]) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        """
+        For formats that store universal bit runs, deserializes the metadata and
+        a lazy iterator of RunSequence chunks, bypassing the strategy payload.
+        """
+        raise NotImplementedError(f"The '{self.name}' format does not store bit runs.")
+
+    def serialize_runs(self, metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO[bytes]):
+        """
+        For formats that store universal bit runs, serializes a keymap from a
+        lazy iterator of (bit, count) runs, bypassing the strategy payload.
+        Values under TRAILER_KEYS may still change until the runs are exhausted.
+        """
+        raise NotImplementedError(f"The '{self.name}' format does not store bit runs.")
+
+    def copy_payload(self, source: IO, metadata: Dict[str, Any], stream: IO,
+                     on_payload_end: Callable[[Dict[str, Any]], None]):
+        """
+        Writes a keymap with the given metadata and the payload of the keymap
+        read from source, which must be in this format. on_payload_end receives
+        the source keymap's metadata (including its TRAILER_KEYS) before the new
+        trailer is written. The default implementation deserializes and
+        re-serializes the payload; formats override it to copy the bytes.
+        """
+        source_metadata, payload = self.deserialize_stream(source)
+        payload = chain(payload, _call(on_payload_end, source_metadata))
+        self.serialize_stream(metadata, payload, stream)
+
+    def serialize_update(self, source: IO, source_index: Dict[str, Any], checkpoint: int, metadata: Dict[str, Any],
+                         payload: Iterable[Any], stream: IO):
+        """
+        Writes a keymap with the given metadata whose payload is the payload of
+        the keymap read from source (in this format) up to the run of the given
+        checkpoint of its run index, followed by the elements of payload, which
+        encode the runs from that run on. The leading part is copied from the
+        position recorded for the checkpoint, so formats that record positions
+        implement this; the default raises NotImplementedError.
+        """
+        raise NotImplementedError(f"The '{self.name}' format cannot update keymaps in place.")
+
+    def serialize_update_runs(self, source: IO, source_index: Dict[str, Any], checkpoint: int,
+                              metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO):
+        """Like serialize_update, for formats that store bit runs, taking the runs from the checkpoint's run on."""
+        raise NotImplementedError(f"The '{self.name}' format cannot update keymaps in place.")
+
+    def read_run_index(self, stream: IO) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Returns the keymap metadata and its run index (None if it has none).
+        Formats override this to find the index without reading the payload;
+        the default implementation deserializes the whole keymap.
+        """
+        metadata, payload = self.deserialize_stream(stream)
+        for _ in payload:
+            pass
+        return metadata, metadata.get('run_index')
+
+    def runs_from(self, stream: IO, metadata: Dict[str, Any], run_index: Dict[str, Any],
+                  checkpoint: int) -> Iterator[Tuple[str, int]]:
+        """
+        Returns the bit runs of the keymap read from stream, starting with the
+        run named by the given checkpoint of its run index. Formats override
+        this to seek to the checkpoint's recorded position; the default
+        implementation decodes the payload from the start and skips runs.
+        """
+        _, payload = self.deserialize_stream(stream)
+        runs = strategy_for(metadata).decode_iter(payload)
+        return islice(runs, run_index['runs'][checkpoint], None)
+
+    def open_file(self, path: Any, mode: str = 'r') -> IO:
+        """
+        Opens a keymap file for reading ('r') or writing ('w') in this format's
+        mode. An open binary stream (such as stdin) may be given instead of a
+        path; text formats wrap it, and it is closed along with the result.
+        """
+        if not isinstance(path, (str, bytes, os.PathLike)):
+            return path if self.binary else io.TextIOWrapper(path, encoding='utf-8')
+        if self.binary:
+            return open(path, mode + 'b')
+        return open(path, mode, encoding='utf-8')
+
+def _call(callback: Callable, *args) -> Iterator[Any]:
+    """An empty iterator that calls callback(*args) when it is exhausted."""
+    callback(*args)
+    return
+    yield
+
+def strategy_for(metadata: Dict[str, Any]):
+    """Returns the strategy named in keymap metadata."""
+    # Imported lazily: the strategies package does not depend on formats.
+    from strategies import STRATEGIES
+    strategy_name = metadata.get('strategy')
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"Unknown or missing strategy '{strategy_name}' in keymap.")
+    return STRATEGIES[strategy_name]
@@ -0,0 +1,340 @@
+# formats/binary_format.py
+import io
+import json
+import mmap
+import struct
+from array import array
+from itertools import chain
+from typing import Callable, Dict, Any, IO, Iterable, Iterator, List, Optional, Tuple
+
+from .base_format import BaseFormat, strategy_for
+from utils.core import batch_runs
+from utils.runs import RunSequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; varints are packed in pure Python instead.
+    np = None
+
+MAGIC = b'HODB'
+VERSION = 1
+# Maximum number of runs varint-packed into a single payload frame.
+FRAME_RUNS = 1 << 16
+_U32 = struct.Struct('>I')
+# Bytes copied per write when a payload is copied verbatim.
+COPY_BYTES = 8 << 20
+
+def encode_varints(values: array) -> bytes:
+    """Packs unsigned integers as LEB128 varints."""
+    if np is not None and len(values):
+        v = np.frombuffer(values, dtype=np.uint64)
+        sizes = np.ones(v.size, dtype=np.int64)
+        rest = v >> np.uint64(7)
+        while rest.any():
+            sizes += rest > 0
+            rest >>= np.uint64(7)
+        offsets = np.cumsum(sizes) - sizes
+        out = np.empty(int(sizes.sum()), dtype=np.uint8)
+        for k in range(int(sizes.max())):
+            mask = sizes > k
+            low = (v[mask] >> np.uint64(7 * k)) & np.uint64(0x7f)
+            more = (sizes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+            out[offsets[mask] + k] = low | more
+        return out.tobytes()
+
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7f) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+def decode_varints(data: bytes) -> array:
+    """Unpacks a buffer of complete LEB128 varints into an array('Q')."""
+    if data and data[-1] & 0x80:
+        raise ValueError("Truncated varint in binary keymap payload.")
+    if np is not None and data:
+        b = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(b < 0x80)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        position = np.arange(b.size) - np.repeat(starts, ends - starts + 1)
+        if position.max() > 9:
+            raise ValueError("Overlong varint in binary keymap payload.")
+        parts = (b & 0x7f).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+        return array('Q', np.add.reduceat(parts, starts).tobytes())
+
+    values = array('Q')
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+class BinaryFormat(BaseFormat):
+    """
+    A compact binary keymap. The layout is the magic bytes and a version byte,
+    a length-prefixed JSON header with the metadata, the starting bit, then the
+    universal bit runs as length-prefixed frames of LEB128 run lengths (a zero
+    length frame ends the payload), and finally a length-prefixed JSON trailer
+    with the TRAILER_KEYS values. The strategy payload is rebuilt from the runs
+    on load, so every strategy round-trips (payloads with empty runs or
+    repeated bits come back normalized).
+    """
+    binary = True
+    stores_runs = True
+    magic = MAGIC
+
+    @property
+    def name(self) -> str: return "binary"
+
+    @property
+    def extension(self) -> str: return ".hodb"
+
+    def serialize(self, data: Dict[str, Any], stream: IO[bytes]):
+        metadata = {key: value for key, value in data.items() if key != 'payload'}
+        self.serialize_stream(metadata, data['payload'], stream)
+
+    def deserialize(self, stream: IO[bytes]) -> Dict[str, Any]:
+        metadata, payload = self.deserialize_stream(stream)
+        payload = list(payload)
+        return {**metadata, "payload": payload}
+
+    def serialize_stream(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[bytes]):
+        """
+        Writes the keymap, splitting the run frames so that the run of every
+        checkpoint of a run index in the metadata starts a frame, and recording
+        [frame offset relative to the starting bit, stored bit] as its position.
+        """
+        self.serialize_runs(metadata, strategy_for(metadata).decode_iter(payload), stream)
+
+    def serialize_runs(self, metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO[bytes]):
+        header_keys = self._write_header(metadata, stream)
+        self._write_frames(metadata, runs, stream)
+        self._write_trailer(metadata, header_keys, stream)
+
+    def serialize_update(self, source: IO[bytes], source_index: Dict[str, Any], checkpoint: int,
+                         metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[bytes]):
+        self.serialize_update_runs(source, source_index, checkpoint, metadata,
+                                   strategy_for(metadata).decode_iter(payload), stream)
+
+    def serialize_update_runs(self, source: IO[bytes], source_index: Dict[str, Any], checkpoint: int,
+                              metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO[bytes]):
+        """Copies the starting bit and the frames of source before the checkpoint's frame verbatim, then writes runs as frames after them."""
+        offset, expected = source_index['positions'][checkpoint]
+        with _load(source) as data:
+            _read_header(data)
+            header_keys = self._write_header(metadata, stream)
+            _copy(data, data.tell() + offset, stream)
+        self._write_frames(metadata, runs, stream, source_index['runs'][checkpoint], offset, expected)
+        self._write_trailer(metadata, header_keys, stream)
+
+    def _write_frames(self, metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO[bytes],
+                      first_run: int = 0, position: int = 0, expected: Optional[str] = None):
+        """
+        Writes the runs as frames, then the terminating empty frame. A fresh
+        payload starts with its starting bit; a resumed one continues with run
+        first_run after `position` bytes of copied frames whose stored bits end
+        expecting the bit `expected`.
+        """
+        index = metadata.get('run_index')
+        checkpoints = index['runs'] if index is not None else []
+
+        frames = _split_frames((sequence for sequence in batch_runs(runs, FRAME_RUNS) if sequence), checkpoints, first_run)
+        if not position:
+            first = next(frames, None)
+            expected = first[1].start_bit if first is not None else '0'
+            stream.write(expected.encode('ascii'))
+            position = 1
+            frames = chain([first], frames) if first is not None else iter(())
+        for first_run, sequence in frames:
+            while index is not None and len(index['positions']) < len(checkpoints) \
+                    and checkpoints[len(index['positions'])] == first_run:
+                index['positions'].append([position, expected])
+            lengths = sequence.lengths
+            if sequence.start_bit != expected:
+                # An empty run keeps the stored bits alternating across frames.
+                lengths = array('Q', [0]) + lengths
+            frame = encode_varints(lengths)
+            stream.write(_U32.pack(len(frame)))
+            stream.write(frame)
+            position += 4 + len(frame)
+            expected = sequence.bit_at(len(sequence))
+        stream.write(_U32.pack(0))
+
+    def _write_header(self, metadata: Dict[str, Any], stream: IO[bytes]) -> set:
+        # The run index is only complete after the payload, so it goes to the trailer alone.
+        header = {key: value for key, value in metadata.items() if key != 'run_index'}
+        encoded = json.dumps(header).encode('utf-8')
+        stream.write(MAGIC + bytes([VERSION]) + _U32.pack(len(encoded)) + encoded)
+        return set(header)
+
+    def _write_trailer(self, metadata: Dict[str, Any], header_keys: set, stream: IO[bytes]):
+        trailer = {key: value for key, value in metadata.items()
+                   if key in self.TRAILER_KEYS or key not in header_keys}
+        trailer = json.dumps(trailer).encode('utf-8')
+        stream.write(_U32.pack(len(trailer)) + trailer)
+
+    def deserialize_stream(self, stream: IO[bytes]) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        metadata, sequences = self.deserialize_runs(stream)
+        return metadata, strategy_for(metadata).encode_iter(chain.from_iterable(sequences))
+
+    def deserialize_runs(self, stream: IO[bytes]) -> Tuple[Dict[str, Any], Iterator[RunSequence]]:
+        """Reads regular files through a memory map and other streams (pipes, decompressors) frame by frame."""
+        data = _map(stream)
+        if data is None:
+            data = stream
+        try:
+            metadata = _read_header(data)
+            start_bit = chr(_read_exact(data, 1)[0])
+        except Exception:
+            if data is not stream:
+                data.close()
+            raise
+
+        def sequences() -> Iterator[RunSequence]:
+            try:
+                yield from _read_frames(data, start_bit)
+                metadata.update(_read_trailer(data))
+            finally:
+                if data is not stream:
+                    data.close()
+
+        return metadata, sequences()
+
+    def read_run_index(self, stream: IO[bytes]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Reads the header and the trailer, hopping over the frames by their length prefixes."""
+        with _load(stream) as data:
+            metadata = _read_header(data)
+            data.seek(1, io.SEEK_CUR)
+            _skip_frames(data)
+            metadata.update(_read_trailer(data))
+        return metadata, metadata.get('run_index')
+
+    def runs_from(self, stream: IO[bytes], metadata: Dict[str, Any], run_index: Dict[str, Any],
+                  checkpoint: int) -> Iterator[Tuple[str, int]]:
+        """Decodes the frames starting at the frame recorded for the checkpoint."""
+        positions = run_index.get('positions') or ()
+        if checkpoint >= len(positions):
+            return super().runs_from(stream, metadata, run_index, checkpoint)
+        data = _load(stream)
+        try:
+            _read_header(data)
+        except Exception:
+            data.close()
+            raise
+        offset, bit = positions[checkpoint]
+        data.seek(offset, io.SEEK_CUR)
+
+        def runs() -> Iterator[Tuple[str, int]]:
+            with data:
+                for sequence in _read_frames(data, bit):
+                    yield from sequence
+
+        return runs()
+
+    def copy_payload(self, source: IO[bytes], metadata: Dict[str, Any], stream: IO[bytes],
+                     on_payload_end: Callable[[Dict[str, Any]], None]):
+        """Copies the starting bit and run frames verbatim, hopping over the frames by their length prefixes."""
+        with _load(source) as data:
+            source_metadata = _read_header(data)
+            start = data.tell()
+            data.seek(1, io.SEEK_CUR)
+            _skip_frames(data)
+            end = data.tell()
+            source_metadata.update(_read_trailer(data))
+            header_keys = self._write_header(metadata, stream)
+            data.seek(start)
+            _copy(data, end, stream)
+        on_payload_end(source_metadata)
+        self._write_trailer(metadata, header_keys, stream)
+
+def _split_frames(sequences: Iterable[RunSequence], cuts: List[int], run: int = 0) -> Iterator[Tuple[int, RunSequence]]:
+    """
+    Yields (index of its first run, frame) for every sequence, whose runs are
+    numbered from `run`, cutting it so that each run index in cuts starts a
+    frame. cuts is ascending and is read as the frames are produced, so it may
+    still grow while iterating.
+    """
+    k = 0
+    for sequence in sequences:
+        start = 0
+        while True:
+            while k < len(cuts) and cuts[k] <= run + start:
+                k += 1
+            stop = len(sequence) if k >= len(cuts) else min(len(sequence), cuts[k] - run)
+            yield run + start, sequence if start == 0 and stop == len(sequence) else sequence[start:stop]
+            if stop >= len(sequence):
+                break
+            start = stop
+        run += len(sequence)
+
+def _read_exact(data: IO[bytes], size: int) -> bytes:
+    chunk = data.read(size)
+    if len(chunk) != size:
+        raise ValueError("Truncated binary HoD keymap.")
+    return chunk
+
+def _read_frames(data: IO[bytes], bit: str) -> Iterator[RunSequence]:
+    """Yields the run frames read from data, up to and including the terminating empty frame."""
+    while True:
+        (size,) = _U32.unpack(_read_exact(data, 4))
+        if not size:
+            return
+        sequence = RunSequence(bit, decode_varints(_read_exact(data, size)))
+        bit = sequence.bit_at(len(sequence))
+        if 0 in sequence.lengths:
+            # Empty runs only mark a bit flip; drop them and merge their neighbours.
+            sequence = RunSequence.from_runs(iter(sequence))
+        if sequence:
+            yield sequence
+
+def _skip_frames(data: IO[bytes]):
+    """Seeks past the frames starting at the current position and their terminating empty frame."""
+    while True:
+        (size,) = _U32.unpack(_read_exact(data, 4))
+        if not size:
+            return
+        data.seek(size, io.SEEK_CUR)
+
+def _read_trailer(data: IO[bytes]) -> Dict[str, Any]:
+    (size,) = _U32.unpack(_read_exact(data, 4))
+    return json.loads(_read_exact(data, size))
+
+def _read_header(data: IO[bytes]) -> Dict[str, Any]:
+    """Checks the magic bytes and version, and returns the header metadata, leaving data at the starting bit."""
+    if data.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a binary HoD keymap (bad magic bytes).")
+    version = _read_exact(data, 1)[0]
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary keymap version {version}.")
+    (size,) = _U32.unpack(_read_exact(data, 4))
+    return json.loads(_read_exact(data, size))
+
+def _copy(data: IO[bytes], end: int, stream: IO[bytes]):
+    """Copies the bytes from the current position of data up to offset end to stream."""
+    while (remaining := end - data.tell()) > 0:
+        stream.write(_read_exact(data, min(remaining, COPY_BYTES)))
+
+def _map(stream: IO[bytes]) -> Optional[mmap.mmap]:
+    """Memory-maps a regular file, positioned where the stream is; returns None for other streams."""
+    if isinstance(stream, (io.BufferedReader, io.FileIO)):
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # Empty files and pipes cannot be mapped.
+            return None
+        mapped.seek(stream.tell())
+        return mapped
+    return None
+
+def _load(stream: IO[bytes]):
+    """
+    Returns a seekable view of the keymap positioned where the stream is:
+    memory-mapped for regular files, otherwise read into memory.
+    """
+    mapped = _map(stream)
+    return mapped if mapped is not None else io.BytesIO(stream.read())
@@ -1,10 +1,26 @@
 # formats/conf_format.py
 import configparser
 import json
-from typing import Dict, Any, IO
+from itertools import islice
+from typing import Dict, Any, IO, Iterable, Iterator, Tuple
 from .base_format import BaseFormat
 
+# Number of payload elements written per line of the payload value.
+WRITE_BATCH = 4096
+
 class ConfFormat(BaseFormat):
+    """
+    An INI-style keymap. The payload is a JSON array in the `data` value of
+    [hod_payload], written as continuation lines of up to WRITE_BATCH elements
+    each so that it can be streamed both ways. The metadata known up front
+    (all but the TRAILER_KEYS) is written before it in [hod_header], for
+    streaming readers; the complete metadata follows it in [hod_metadata],
+    the section every reader of conf keymaps has always looked in. The whole
+    file is still ordinary configparser input.
+    """
+    # Keymaps start with [hod_header], or with [hod_metadata] if written before the payload was streamed.
+    magic = b"[hod_"
+
     @property
     def name(self) -> str: return "conf"
 
@@ -12,39 +28,92 @@ class ConfFormat(BaseFormat):
     def extension(self) -> str: return ".conf"
 
     def serialize(self, data: Dict[str, Any], stream: IO[str]):
-        config = configparser.ConfigParser()
-        config.add_section('hod_metadata')
-        
-        for key, value in data.items():
-            if key not in ['payload', 'integrity']:
-                config.set('hod_metadata', str(key), str(value))
-        
-        # Serialize complex nested objects as JSON strings
-        config.set('hod_metadata', 'integrity', json.dumps(data['integrity']))
-
-        config.add_section('hod_payload')
-        # Serialize the entire payload as a JSON string for robustness
-        config.set('hod_payload', 'data', json.dumps(data['payload']))
-        
-        config.write(stream)
+        metadata = {key: value for key, value in data.items() if key != 'payload'}
+        self.serialize_stream(metadata, data['payload'], stream)
 
     def deserialize(self, stream: IO[str]) -> Dict[str, Any]:
-        config = configparser.ConfigParser()
-        config.read_file(stream)
-        
-        data = {}
-        meta = config['hod_metadata']
-        for key in meta:
-            # Safely evaluate literals, e.g., numbers, bools
-            try:
-                data[key] = json.loads(meta[key])
-            except (json.JSONDecodeError, TypeError):
-                data[key] = meta[key]
-        
-        # Correctly parse the integrity and payload JSON strings
-        data['integrity'] = json.loads(meta['integrity'])
-        data['payload'] = json.loads(config['hod_payload']['data'])
-        
-        # Coerce types back
-        data['input_size_bytes'] = int(data['input_size_bytes'])
+        metadata, payload = self.deserialize_stream(stream)
+        payload = list(payload)
+        return {**metadata, "payload": payload}
+
+    def serialize_stream(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[str]):
+        """Writes the header section, streams the payload a batch of elements per line, then writes the metadata section."""
+        _write_section('hod_header', {key: value for key, value in metadata.items() if key not in self.TRAILER_KEYS},
+                       stream)
+
+        stream.write("[hod_payload]\ndata = [")
+        payload = iter(payload)
+        separator = "\n\t"
+        while batch := list(islice(payload, WRITE_BATCH)):
+            stream.write(separator + json.dumps(batch)[1:-1])
+            separator = ",\n\t"
+        stream.write("]\n\n" if separator == "\n\t" else "\n\t]\n\n")
+
+        # Read after the payload is exhausted, so TRAILER_KEYS and keys added while it was produced are final.
+        _write_section('hod_metadata', metadata, stream)
+
+    def deserialize_stream(self, stream: IO[str]) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        """
+        Parses the header section eagerly and yields the payload elements a
+        line at a time. The complete metadata section is added to the metadata
+        once the payload iterator is exhausted. Keymaps with the metadata
+        before the payload, all on one line (as older versions wrote them),
+        are still read, the payload in one piece.
+        """
+        lines = iter(stream)
+        header = []
+        for line in lines:
+            if line.rstrip() == "[hod_payload]":
+                break
+            header.append(line)
+        else:
+            raise ValueError("Malformed conf keymap: no [hod_payload] section.")
+        header = "".join(header)
+        metadata = _read_section(header, 'hod_header') or _read_section(header, 'hod_metadata')
+        return metadata, self._iter_payload(lines, metadata)
+
+    @staticmethod
+    def _iter_payload(lines: Iterator[str], metadata: Dict[str, Any]) -> Iterator[Any]:
+        line = next(lines, "")
+        key, _, value = line.partition("=")
+        if key.strip() != "data":
+            raise ValueError("Malformed conf keymap: [hod_payload] has no data value.")
+        if value.strip() != "[":
+            yield from json.loads(value)
+        else:
+            for line in lines:
+                text = line.strip()
+                if text == "]":
+                    break
+                yield from json.loads("[" + text.rstrip(",") + "]")
+            else:
+                raise ValueError("Malformed conf keymap: the payload is not closed.")
+        metadata.update(_read_section("".join(lines), 'hod_metadata'))
+
+def _write_section(section: str, values: Dict[str, Any], stream: IO[str]):
+    config = configparser.ConfigParser()
+    config.add_section(section)
+    for key, value in values.items():
+        # Missing values (such as the file name of stdin) are left out rather than stored as the string "None".
+        if value is None:
+            continue
+        # Nested values (such as the run index) are stored as JSON so they load back intact.
+        config.set(section, str(key), json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+    config.write(stream)
+
+def _read_section(text: str, section: str) -> Dict[str, Any]:
+    config = configparser.ConfigParser()
+    config.read_string(text)
+    data = {}
+    if not config.has_section(section):
         return data
+    for key, value in config[section].items():
+        # Safely evaluate literals, e.g., numbers, bools
+        try:
+            data[key] = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            data[key] = value
+    # Coerce types back
+    if 'input_size_bytes' in data:
+        data['input_size_bytes'] = int(data['input_size_bytes'])
+    return data
@@ -1,12 +1,26 @@
 # formats/json_format.py
+import io
 import json
-from typing import Dict, Any, IO
-from .base_format import BaseFormat
+import re
+from itertools import accumulate, chain
+from typing import Callable, Dict, Any, IO, Iterable, Iterator, Optional, Tuple
+from .base_format import BaseFormat, strategy_for
+
+# Number of payload elements written per stream.write call.
+WRITE_BATCH = 4096
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# How serialize_stream separates payload elements within a batch's line, separates
+# the lines of consecutive batches, and closes a non-empty payload array.
+_ELEMENT_SEPARATOR = ", "
+_BATCH_SEPARATOR = ",\n    "
+_PAYLOAD_END = "\n  ]"
 
 class JsonFormat(BaseFormat):
+    magic = b"{"
+
     @property
     def name(self) -> str: return "json"
-    
+
     @property
     def extension(self) -> str: return ".hod"
 
@@ -15,3 +29,348 @@ class JsonFormat(BaseFormat):
 
     def deserialize(self, stream: IO[str]) -> Dict[str, Any]:
         return json.load(stream)
+
+    def serialize_stream(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[str]):
+        """
+        Writes the metadata first, then streams payload elements a batch per line,
+        and finally the TRAILER_KEYS (and any keys added while the payload was
+        produced). The result is ordinary JSON that json.load can read.
+
+        With a run index in the metadata and a strategy that encodes one
+        element per run, the position of each checkpoint's element (relative to
+        the start of the payload array) is recorded as it is written.
+        """
+        header_keys = self._write_header(metadata, stream)
+        self._write_payload(metadata, payload, stream)
+        self._write_trailer(metadata, header_keys, stream)
+
+    def serialize_update(self, source: IO[str], source_index: Dict[str, Any], checkpoint: int, metadata: Dict[str, Any],
+                         payload: Iterable[Any], stream: IO[str]):
+        """Copies the payload text of source up to the element of the checkpoint's run verbatim, then streams payload after it."""
+        reader = _JsonStreamReader(source)
+        reader.expect("{")
+        if reader.read_members({}, stop_at="payload") is None:
+            raise ValueError("Malformed JSON keymap: no payload.")
+        reader.expect("[")
+        header_keys = self._write_header(metadata, stream)
+        position = source_index['positions'][checkpoint]
+        reader.copy_chars(position, stream)
+        self._write_payload(metadata, payload, stream, position, source_index['runs'][checkpoint])
+        self._write_trailer(metadata, header_keys, stream)
+
+    def _write_payload(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO[str], position: int = 0,
+                       count: int = 0):
+        """
+        Streams the payload elements and closes the array. A resumed payload
+        continues after `position` characters of copied text holding `count`
+        elements and ending with a separator.
+        """
+        batch = []
+        index = metadata.get('run_index')
+        if index is not None and not strategy_for(metadata).element_per_run:
+            index = None
+        prefix = "" if position else "\n    "
+
+        def flush():
+            nonlocal prefix, position, count
+            if index is not None:
+                # Element offsets are only needed for the run index; each element is then encoded on its own.
+                texts = [json.dumps(element) for element in batch]
+                _record_positions(index, texts, count, position + len(prefix))
+                text = prefix + _ELEMENT_SEPARATOR.join(texts)
+            else:
+                text = prefix + json.dumps(batch)[1:-1]
+            stream.write(text)
+            prefix = _BATCH_SEPARATOR
+            position += len(text)
+            count += len(batch)
+            batch.clear()
+
+        for element in payload:
+            batch.append(element)
+            if len(batch) >= WRITE_BATCH:
+                flush()
+        if batch:
+            flush()
+        stream.write(_PAYLOAD_END if position else "]")
+
+    def copy_payload(self, source: IO[str], metadata: Dict[str, Any], stream: IO[str],
+                     on_payload_end: Callable[[Dict[str, Any]], None]):
+        """
+        Copies the payload text of a keymap written by serialize_stream
+        verbatim; its closing bracket is the only one on a line of its own at
+        that indentation.
+        """
+        reader = _JsonStreamReader(source)
+        reader.expect("{")
+        source_metadata = {}
+        if reader.read_members(source_metadata, stop_at="payload") is None:
+            raise ValueError("Malformed JSON keymap: no payload.")
+        reader.expect("[")
+        header_keys = self._write_header(metadata, stream)
+        if reader.peek() == "]":
+            reader.advance()
+            stream.write("]")
+        else:
+            stream.write("\n    ")
+            reader.copy_until(_PAYLOAD_END, stream)
+            reader.pos += len(_PAYLOAD_END)
+            stream.write(_PAYLOAD_END)
+        if reader.peek() == ",":
+            reader.advance()
+            reader.read_members(source_metadata)
+        else:
+            reader.expect("}")
+        on_payload_end(source_metadata)
+        self._write_trailer(metadata, header_keys, stream)
+
+    def read_run_index(self, stream: IO[str]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Reads the header members, then the trailer members (which include the
+        run index) by searching back from the end of the file for the end of
+        the payload array.
+        """
+        reader = _JsonStreamReader(stream)
+        reader.expect("{")
+        metadata = {}
+        if reader.read_members(metadata, stop_at="payload") is None:
+            return metadata, metadata.get('run_index')
+        end = stream.seek(0, io.SEEK_END)
+        size = reader.chunk_size
+        while True:
+            start = max(0, end - size)
+            # Keymaps are ASCII (json.dumps escapes everything else), so any byte offset is a valid seek position.
+            stream.seek(start)
+            tail = stream.read()
+            found = tail.rfind(_PAYLOAD_END)
+            if found >= 0:
+                trailer = tail[found + len(_PAYLOAD_END):].lstrip()
+                if trailer.startswith(","):
+                    metadata.update(json.loads("{" + trailer[1:]))
+                return metadata, metadata.get('run_index')
+            if start == 0:
+                # An empty payload array is not closed on a line of its own.
+                stream.seek(0)
+                return super().read_run_index(stream)
+            size *= 4
+
+    def runs_from(self, stream: IO[str], metadata: Dict[str, Any], run_index: Dict[str, Any],
+                  checkpoint: int) -> Iterator[Tuple[str, int]]:
+        """Seeks to the recorded position of the checkpoint's element and decodes the payload from there."""
+        positions = run_index.get('positions') or ()
+        if checkpoint >= len(positions):
+            return super().runs_from(stream, metadata, run_index, checkpoint)
+        start = stream.tell()
+        reader = _JsonStreamReader(stream)
+        reader.expect("{")
+        if reader.read_members({}, stop_at="payload") is None:
+            raise ValueError("Malformed JSON keymap: no payload.")
+        reader.expect("[")
+        stream.seek(start + reader.offset + reader.pos + positions[checkpoint])
+        elements = chain.from_iterable(_JsonStreamReader(stream).array_batches())
+        return strategy_for(metadata).decode_iter(elements)
+
+    def _write_header(self, metadata: Dict[str, Any], stream: IO[str]) -> list:
+        """Writes the members before the payload, up to its opening bracket, and returns their keys."""
+        header_keys = [key for key in metadata if key not in self.TRAILER_KEYS]
+        stream.write("{\n")
+        for key in header_keys:
+            stream.write(_member(key, metadata[key]) + ",\n")
+        stream.write('  "payload": [')
+        return header_keys
+
+    def _write_trailer(self, metadata: Dict[str, Any], header_keys: list, stream: IO[str]):
+        for key in metadata:
+            if key not in header_keys:
+                stream.write(",\n" + _member(key, metadata[key]))
+        stream.write("\n}")
+
+    def deserialize_stream(self, stream: IO[str]) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        """
+        Parses the members before "payload" eagerly and yields the payload
+        elements lazily. Members after the payload are added to the metadata
+        once the payload iterator is exhausted.
+        """
+        reader = _JsonStreamReader(stream)
+        reader.expect("{")
+        metadata = {}
+        if reader.peek() == "}":
+            reader.advance()
+            return metadata, iter(())
+        key = reader.read_members(metadata, stop_at="payload")
+        if key is None:
+            return metadata, iter(())
+        return metadata, self._iter_payload(reader, metadata)
+
+    @staticmethod
+    def _iter_payload(reader: '_JsonStreamReader', metadata: Dict[str, Any]) -> Iterator[Any]:
+        if reader.peek() != "[":
+            yield from reader.value() or ()
+        else:
+            reader.advance()
+            for batch in reader.array_batches():
+                yield from batch
+        if reader.peek() == ",":
+            reader.advance()
+            reader.read_members(metadata)
+        else:
+            reader.expect("}")
+
+def _record_positions(index: Dict[str, Any], batch: list, first: int, position: int):
+    """Records the position of every checkpoint whose run is an element of the batch about to be written at position."""
+    runs, positions = index['runs'], index['positions']
+    if len(positions) >= len(runs) or runs[len(positions)] >= first + len(batch):
+        return
+    starts = list(accumulate((len(text) + len(_ELEMENT_SEPARATOR) for text in batch), initial=position))
+    while len(positions) < len(runs) and runs[len(positions)] < first + len(batch):
+        positions.append(starts[runs[len(positions)] - first])
+
+def _member(key: str, value: Any) -> str:
+    """Formats one object member as json.dump(indent=2) would inside the top-level object."""
+    return json.dumps({key: value}, indent=2)[2:-2]
+
+class _JsonStreamReader:
+    """Reads JSON tokens and values from a text stream one buffered chunk at a time."""
+
+    def __init__(self, stream: IO[str], chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # Characters read before buffer[0].
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or '' at the end of the stream."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def advance(self):
+        self.pos += 1
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON keymap: expected '{char}' but found '{found or 'end of file'}'.")
+        self.advance()
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value, reading more of the stream as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def copy_until(self, marker: str, stream: IO[str]):
+        """Writes the text up to the next occurrence of marker to stream, leaving the reader at the marker."""
+        while True:
+            end = self.buffer.find(marker, self.pos)
+            if end >= 0:
+                stream.write(self.buffer[self.pos:end])
+                self.pos = end
+                return
+            # Keep a possible partial marker at the end of the buffer for the next search.
+            keep = max(self.pos, len(self.buffer) - len(marker) + 1)
+            stream.write(self.buffer[self.pos:keep])
+            self.pos = keep
+            if not self._fill():
+                raise ValueError(f"Malformed JSON keymap: expected {marker!r} but found end of file.")
+
+    def copy_chars(self, count: int, stream: IO[str]):
+        """Writes the next `count` characters to stream."""
+        while len(self.buffer) - self.pos < count:
+            stream.write(self.buffer[self.pos:])
+            count -= len(self.buffer) - self.pos
+            self.pos = len(self.buffer)
+            if not self._fill():
+                raise ValueError("Malformed JSON keymap: unexpected end of file.")
+        stream.write(self.buffer[self.pos:self.pos + count])
+        self.pos += count
+
+    def array_batches(self) -> Iterator[list]:
+        """
+        Yields the remaining items of an array whose '[' was already consumed,
+        in batches. Each batch parses the buffer up to its last comma in one
+        call; a cut inside a nested value cannot parse, so it backs off to an
+        earlier comma and finally to decoding a single value. A cut past the
+        end of the array (in the members after it) parses up to the array's
+        closing bracket, which ends the batches.
+        """
+        while True:
+            if self.peek() == "]":
+                self.advance()
+                return
+            if len(self.buffer) - self.pos < self.chunk_size // 2 and not self.eof:
+                self._fill()
+            batch = None
+            cut = self.buffer.rfind(",", self.pos)
+            for _ in range(8):
+                if cut <= self.pos:
+                    break
+                text = "[" + self.buffer[self.pos:cut] + "]"
+                try:
+                    batch, end = self.decoder.raw_decode(text)
+                except json.JSONDecodeError:
+                    cut = self.buffer.rfind(",", self.pos, cut)
+                    continue
+                if end < len(text):
+                    # The array closed before the cut; text[end - 1] is its bracket.
+                    self.pos += end - 1
+                    yield batch
+                    return
+                self.pos = cut + 1
+                break
+            if batch is not None:
+                yield batch
+                continue
+
+            yield [self.value()]
+            if self.peek() == ",":
+                self.advance()
+            else:
+                self.expect("]")
+                return
+
+    def read_members(self, target: Dict[str, Any], stop_at: str = None):
+        """
+        Reads object members into target up to the closing brace. If stop_at is
+        reached, stops right after its colon and returns the key; otherwise
+        returns None.
+        """
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Malformed JSON keymap: object keys must be strings.")
+            self.expect(":")
+            if key == stop_at:
+                return key
+            target[key] = self.value()
+            if self.peek() == ",":
+                self.advance()
+            else:
+                self.expect("}")
+                return None
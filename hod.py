@@ -2,24 +2,26 @@
 # hod.py
 import os
 import sys
+import json
 import logging
+import functools
 import click
 
 # --- Dynamic Loading ---
-from strategies import STRATEGIES, load_strategies
-from formats import FORMATS, FORMATS_BY_EXT, load_formats_by_name, load_formats_by_ext
+from strategies import STRATEGIES
+from formats import FORMATS
 
 # --- Utilities ---
-from utils.core import generate_bit_runs
-from utils.hashing import calculate_file_hash, sign_payload, verify_payload
-from utils.meta import create_metadata
-from utils.display import pretty_print_payload
+# Only what the option definitions need is imported here; each command imports
+# the modules it runs, so startup does not pay for sockets, process pools or
+# the pipeline of commands that are not run.
+from utils.constants import (
+    CACHE_DIR_ENV, CODEC_EXTENSIONS, CORPORA, MANIFEST_NAME, SERVER_ENV, SUPPORTED_HASH_ALGORITHMS,
+)
+from utils.units import parse_size
 
 # --- Setup ---
 logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO"), format='%(asctime)s [%(levelname)s] %(message)s')
-load_strategies()
-load_formats_by_name()
-load_formats_by_ext()
 
 
 @click.group()
@@ -35,168 +37,325 @@ def cli():
     pass
 
 
+def _parse_option_size(option, value):
+    """Parses a size option such as '1MB', raising HodError for invalid values."""
+    from utils.pipeline import HodError
+    if value is None:
+        return None
+    try:
+        size = parse_size(value)
+    except ValueError as e:
+        raise HodError(f"Invalid {option}: {e}") from e
+    if size <= 0:
+        raise HodError(f"Invalid {option}: must be a positive size.")
+    return size
+
+
+def _open_cache(cache_dir, cache_size):
+    """Returns the KeymapCache for --cache-dir/--cache-size, or None if no cache directory is set."""
+    if not cache_dir:
+        return None
+    from utils.cache import KeymapCache
+    try:
+        return KeymapCache(cache_dir, parse_size(cache_size))
+    except ValueError as e:
+        logging.error(f"Invalid --cache-size: {e}")
+        sys.exit(1)
+
+
+def _with_cache(func):
+    """Adds the --cache-dir and --cache-size options, passed to the command as `cache`."""
+    @functools.wraps(func)
+    def wrapper(*args, cache_dir=None, cache_size=None, **kwargs):
+        return func(*args, cache=_open_cache(cache_dir, cache_size), **kwargs)
+    wrapper = click.option('--cache-size', default='1GB', show_default=True,
+                           help='Upper bound on the cache size; least recently used keymaps are evicted.')(wrapper)
+    return click.option('--cache-dir', envvar=CACHE_DIR_ENV, type=click.Path(file_okay=False),
+                        help=f'Reuse keymaps of identical content from this cache directory (or ${CACHE_DIR_ENV}).')(wrapper)
+
+
+def _with_server(func):
+    """Adds the --server option, which makes the command a thin client of a `hod serve` daemon."""
+    return click.option('--server', envvar=SERVER_ENV, type=click.Path(dir_okay=False), metavar='SOCKET',
+                        help=f'Run the job on the `hod serve` daemon listening on this socket (or ${SERVER_ENV}).')(func)
+
+
+def _check_local_paths(*paths):
+    """Raises HodError for stdin/stdout, which --server jobs cannot use: the daemon needs file names to pick formats."""
+    from utils.pipeline import STDIO, HodError
+    if STDIO in paths:
+        raise HodError("stdin and stdout ('-') are not supported with --server.")
+
+
+def _with_stats(command):
+    """Adds a --stats FILE option and runs the command inside a Stats session passed as `stats`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, stats_file=None, **kwargs):
+            from utils.stats import Stats
+            stats = Stats.for_command(command, stats_file)
+            with stats.session():
+                return func(*args, stats=stats, **kwargs)
+        return click.option('--stats', 'stats_file', type=click.Path(dir_okay=False),
+                            help='Write a JSON report of stage timings, counters and peak memory to this file.')(wrapper)
+    return decorator
+
+
 @cli.command()
-@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
-@click.argument('output_file', type=click.Path(dir_okay=False))
-@click.option('--strategy', '-s', type=click.Choice(list(STRATEGIES.keys())), default='rle', help='Encoding strategy to use.')
-@click.option('--hash', 'hash_algo', type=click.Choice(['sha256', 'sha512', 'md5']), help='Calculate and store a hash of the original file for integrity checks.')
+@_with_stats('encode')
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.argument('output_file', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--strategy', '-s', type=click.Choice(list(STRATEGIES.keys())), help='Encoding strategy to use. Defaults to rle, or to the strategy of the --update keymap.')
+@click.option('--hash', 'hash_algos', type=click.Choice(SUPPORTED_HASH_ALGORITHMS), multiple=True, help='Calculate and store a hash of the original file for integrity checks. Repeat to store several.')
 @click.option('--passphrase', prompt=False, hide_input=True, confirmation_prompt=False, help='A passphrase to bind the keymap with an HMAC signature.')
 @click.option('--format', 'output_format_name', type=click.Choice(list(FORMATS.keys())), help='Output format. Inferred from output extension if not provided.')
-def encode(input_file, output_file, strategy, hash_algo, passphrase, output_format_name):
-    """Encode a file into a symbolic HoD keymap."""
-    logging.info(f"Starting encoding of '{input_file}'")
-
-    # 1. Select Strategy and Format
-    encoder = STRATEGIES[strategy]
-    if output_format_name:
-        output_format = FORMATS[output_format_name]
-    else:
-        _, ext = os.path.splitext(output_file)
-        if ext in FORMATS_BY_EXT:
-            output_format = FORMATS_BY_EXT[ext]
-            logging.info(f"Inferred output format '{output_format.name}' from extension '{ext}'")
-        else:
-            output_format = FORMATS['json']
-            logging.warning(f"Unknown extension. Defaulting to '{output_format.name}'.")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True, help='Worker processes used to extract (and, for stateless strategies, encode) bit runs.')
+@click.option('--index-interval', help='Embed a run index with a checkpoint every SIZE bytes (e.g. 1MB) for decode --range and --update.')
+@click.option('--compress', 'compression', type=click.Choice(list(CODEC_EXTENSIONS)), help='Compress the keymap. Inferred from an output extension such as .hod.gz if not provided.')
+@click.option('--update', 'previous', type=click.Path(exists=True, dir_okay=False), metavar='OLD_KEYMAP',
+              help='Reuse the payload of an indexed keymap of an earlier version of the file up to its first changed chunk.')
+@_with_cache
+@_with_server
+def encode(input_file, output_file, strategy, hash_algos, passphrase, output_format_name, jobs, index_interval, compression,
+           previous, server, cache, stats):
+    """Encode a file into a symbolic HoD keymap. Use - for stdin or stdout."""
+    from utils.pipeline import HodError, encode_file
+    try:
+        index_interval = _parse_option_size('--index-interval', index_interval)
+        if server:
+            if previous:
+                raise HodError("--update is not supported with --server.")
+            _check_local_paths(input_file, output_file)
+            options = {"strategy": strategy, "hash_algos": list(hash_algos), "passphrase": passphrase,
+                       "format_name": output_format_name, "index_interval": index_interval, "compression": compression}
+            if cache:
+                options.update(cache_dir=os.path.abspath(cache.directory), cache_size=cache.max_bytes)
+            from utils.client import submit_file
+            submit_file(server, 'encode', options, input_file, output_file)
+            logging.info(f"✅ Encoding successful on '{server}'. Keymap saved to '{output_file}'.")
+            return
+        encode_file(input_file, output_file, strategy, hash_algos, passphrase, output_format_name, jobs, stats, cache,
+                    index_interval, previous, compression)
+    except HodError as e:
+        logging.error(str(e))
+        sys.exit(1)
 
-    # 2. Generate Core Symbolic Representation (Bit Runs)
-    logging.info("Generating bit runs from source file...")
-    with open(input_file, 'rb') as f:
-        bit_runs = list(generate_bit_runs(f))
-    
-    # 3. Create Metadata
-    file_hash = calculate_file_hash(input_file, hash_algo) if hash_algo else None
-    input_size = os.path.getsize(input_file)
-    metadata = create_metadata(input_file, input_size, encoder.name, hash_algo, file_hash)
-
-    # 4. Use Strategy to Encode Payload
-    logging.info(f"Encoding payload with '{encoder.name}' strategy...")
-    payload = encoder.encode(bit_runs)
-    
-    # 5. Build final Keymap
-    keymap = {**metadata, "payload": payload}
 
-    # 6. (Optional) Sign Payload with HMAC
-    if passphrase:
-        logging.info("Signing payload with passphrase-derived HMAC...")
-        signature = sign_payload(payload, passphrase)
-        keymap['integrity']['payload_hmac_signature'] = signature
+@cli.command()
+@_with_stats('decode')
+@click.argument('input_hod', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.argument('output_file', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--passphrase', prompt=False, hide_input=True, help='The passphrase used to sign the keymap.')
+@click.option('--show-payload', is_flag=True, help='Pretty-print the symbolic payload and exit.')
+@click.option('--paranoid-reverify', is_flag=True, help='Also re-read the reconstructed file from disk to verify its hash.')
+@click.option('--range', 'byte_range', metavar='START:END', help='Reconstruct only bytes START to END (exclusive) using the run index.')
+@_with_server
+def decode(input_hod, output_file, passphrase, show_payload, paranoid_reverify, byte_range, server, stats):
+    """Decode a HoD keymap to reconstruct the original file. Use - for stdin or stdout."""
+    from utils.pipeline import HodError, decode_file, decode_range
+    try:
+        if server:
+            if byte_range or show_payload:
+                raise HodError("--range and --show-payload are not supported with --server.")
+            _check_local_paths(input_hod, output_file)
+            from utils.client import submit_file
+            submit_file(server, 'decode', {"passphrase": passphrase, "paranoid_reverify": paranoid_reverify},
+                        input_hod, output_file)
+            logging.info(f"✅ Decoding successful on '{server}'. File saved to '{output_file}'.")
+            return
+        if byte_range:
+            from utils.index import parse_range
+            try:
+                start, end = parse_range(byte_range)
+            except ValueError as e:
+                raise HodError(f"Invalid --range: {e}") from e
+            decode_range(input_hod, output_file, start, end, passphrase, stats)
+            return
+        decode_file(input_hod, output_file, passphrase, show_payload, paranoid_reverify, stats)
+    except HodError as e:
+        logging.error(str(e))
+        sys.exit(1)
+
 
-    # 7. Serialize to Disguised Format
-    logging.info(f"Serializing keymap to '{output_format.name}' format at '{output_file}'")
+@cli.command()
+@click.argument('keymaps', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--original', type=click.Path(exists=True, dir_okay=False), help='Also compare the reconstructed bytes of a single keymap with this file.')
+@click.option('--passphrase', prompt=False, hide_input=True, help='The passphrase used to sign the keymaps.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Worker processes (or, with --server, concurrent jobs). Defaults to the number of CPUs.')
+@_with_server
+def verify(keymaps, original, passphrase, jobs, server):
+    """Check keymaps against their stored hashes and signatures without writing any output."""
+    from utils.pipeline import HodError
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            output_format.serialize(keymap, f)
-    except Exception as e:
-        logging.error(f"Failed to write output file: {e}")
+        if server:
+            from utils.client import verify_remote
+            report = verify_remote(server, list(keymaps), original, passphrase, jobs)
+        else:
+            from utils.tree import verify_keymaps
+            report = verify_keymaps(list(keymaps), original, passphrase, jobs)
+    except HodError as e:
+        logging.error(str(e))
         sys.exit(1)
+    summary = report['summary']
+    if summary['failed']:
+        logging.error(f"❌ {summary['failed']} of {summary['files']} keymaps failed verification.")
+        sys.exit(1)
+    logging.info(f"✅ All {summary['files']} keymaps verified in {summary['seconds']:.2f}s.")
 
-    logging.info(f"✅ Encoding successful. Keymap saved to '{output_file}'.")
 
+@cli.command("encode-tree")
+@click.argument('source', type=click.Path(exists=True, file_okay=False))
+@click.argument('destination', type=click.Path(file_okay=False))
+@click.option('--strategy', '-s', type=click.Choice(list(STRATEGIES.keys())), default='rle', help='Encoding strategy to use.')
+@click.option('--hash', 'hash_algos', type=click.Choice(SUPPORTED_HASH_ALGORITHMS), multiple=True, help='Store a hash of each original file. Repeat to store several.')
+@click.option('--passphrase', prompt=False, hide_input=True, help='A passphrase to bind every keymap with an HMAC signature.')
+@click.option('--format', 'output_format_name', type=click.Choice(list(FORMATS.keys())), default='json', show_default=True, help='Keymap format; its extension is appended to each file name.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Worker processes. Defaults to the number of CPUs.')
+@click.option('--manifest', 'manifest_path', type=click.Path(dir_okay=False), help=f'Where to write the results manifest. Defaults to DESTINATION/{MANIFEST_NAME}.')
+@click.option('--index-interval', help='Embed a run index with a checkpoint every SIZE bytes in each keymap.')
+@click.option('--compress', 'compression', type=click.Choice(list(CODEC_EXTENSIONS)), help="Compress every keymap; the codec's extension is appended too.")
+@_with_cache
+def encode_tree_command(source, destination, strategy, hash_algos, passphrase, output_format_name, jobs, manifest_path,
+                        index_interval, compression, cache):
+    """Encode every file under SOURCE into keymaps under DESTINATION."""
+    from utils.pipeline import HodError
+    from utils.tree import encode_tree
+    try:
+        index_interval = _parse_option_size('--index-interval', index_interval)
+    except HodError as e:
+        logging.error(str(e))
+        sys.exit(1)
+    manifest = encode_tree(source, destination, strategy, hash_algos, passphrase, output_format_name, jobs, manifest_path,
+                           cache, index_interval, compression)
+    _report_tree(manifest)
 
-@cli.command()
-@click.argument('input_hod', type=click.Path(exists=True, dir_okay=False))
-@click.argument('output_file', type=click.Path(dir_okay=False))
-@click.option('--passphrase', prompt=False, hide_input=True, help='The passphrase used to sign the keymap.')
-@click.option('--show-payload', is_flag=True, help='Pretty-print the symbolic payload and exit.')
-def decode(input_hod, output_file, passphrase, show_payload):
-    """Decode a HoD keymap to reconstruct the original file."""
-    logging.info(f"Starting decoding of '{input_hod}'")
-
-    # 1. Select Format and Deserialize
-    _, ext = os.path.splitext(input_hod)
-    if ext not in FORMATS_BY_EXT:
-        logging.error(f"Unknown file format extension '{ext}'. Cannot decode.")
+
+@cli.command("decode-tree")
+@click.argument('source', type=click.Path(exists=True, file_okay=False))
+@click.argument('destination', type=click.Path(file_okay=False))
+@click.option('--passphrase', prompt=False, hide_input=True, help='The passphrase used to sign the keymaps.')
+@click.option('--paranoid-reverify', is_flag=True, help='Also re-read each reconstructed file from disk to verify its hash.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Worker processes. Defaults to the number of CPUs.')
+@click.option('--manifest', 'manifest_path', type=click.Path(dir_okay=False), help=f'Where to write the results manifest. Defaults to DESTINATION/{MANIFEST_NAME}.')
+def decode_tree_command(source, destination, passphrase, paranoid_reverify, jobs, manifest_path):
+    """Reconstruct every keymap under SOURCE into files under DESTINATION."""
+    from utils.tree import decode_tree
+    manifest = decode_tree(source, destination, passphrase, paranoid_reverify, jobs, manifest_path)
+    _report_tree(manifest)
+
+
+def _report_tree(manifest):
+    summary = manifest['summary']
+    if summary['failed']:
+        logging.error(f"❌ {summary['failed']} of {summary['files']} files failed; see the manifest for details.")
         sys.exit(1)
-    
-    input_format = FORMATS_BY_EXT[ext]
-    logging.info(f"Detected keymap format '{input_format.name}'")
+    logging.info(f"✅ All {summary['files']} files processed in {summary['seconds']:.2f}s.")
+
+
+@cli.command()
+@click.option('--corpus', 'corpora', type=click.Choice(CORPORA), multiple=True, help='Synthetic corpus to benchmark (repeatable). Defaults to all.')
+@click.option('--size', 'sizes', multiple=True, help='Corpus size such as 1KB, 64MB or 2GB (repeatable). Defaults to 1KB and 1MB.')
+@click.option('--strategy', '-s', 'strategy_names', type=click.Choice(list(STRATEGIES.keys())), multiple=True, help='Strategy to benchmark (repeatable). Defaults to all.')
+@click.option('--format', 'format_names', type=click.Choice(list(FORMATS.keys())), multiple=True, help='Format to benchmark (repeatable). Defaults to all.')
+@click.option('--seed', type=int, default=0, show_default=True, help='Seed for the synthetic corpora.')
+@click.option('--output', '-o', 'output_file', type=click.Path(dir_okay=False), help='Write the JSON report here instead of stdout.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='A saved report to compare stage times against.')
+@click.option('--threshold', type=float, default=0.10, show_default=True, help='Fractional slowdown reported as a regression.')
+@click.option('--fail-on-regression', is_flag=True, help='Exit with status 1 if the baseline comparison finds regressions.')
+@click.option('--workdir', type=click.Path(file_okay=False, exists=True), help='Directory for temporary corpora and keymaps.')
+@click.option('--startup-runs', type=click.IntRange(min=0), default=10, show_default=True, help='Fresh-interpreter CLI invocations timed to measure startup latency (0 to skip).')
+@click.option('--startup-only', is_flag=True, help='Only measure CLI startup latency.')
+def bench(corpora, sizes, strategy_names, format_names, seed, output_file, baseline, threshold, fail_on_regression, workdir,
+          startup_runs, startup_only):
+    """Benchmark every strategy and format, stage by stage, on synthetic corpora."""
+    from utils.bench import compare_to_baseline, measure_startup, run_benchmarks
     try:
-        with open(input_hod, 'r', encoding='utf-8') as f:
-            keymap = input_format.deserialize(f)
-    except Exception as e:
-        logging.error(f"Failed to parse keymap file: {e}")
+        sizes = [parse_size(size) for size in sizes or ('1KB', '1MB')]
+    except ValueError as e:
+        logging.error(f"Invalid --size: {e}")
         sys.exit(1)
 
-    # 2. Extract Data and Select Strategy
-    strategy_name = keymap.get('strategy')
-    payload = keymap.get('payload')
-    integrity = keymap.get('integrity', {})
-    if not strategy_name or strategy_name not in STRATEGIES:
-        logging.error(f"Unknown or missing strategy '{strategy_name}' in keymap.")
+    if startup_only:
+        report = run_benchmarks((), (), (), ())
+    else:
+        report = run_benchmarks(corpora or CORPORA, sizes, strategy_names or STRATEGIES.keys(),
+                                format_names or FORMATS.keys(), seed, workdir,
+                                progress=lambda case: logging.info(f"Benchmarking {case}..."))
+    if startup_runs or startup_only:
+        logging.info("Measuring CLI startup latency...")
+        report['startup'] = measure_startup(startup_runs)
+
+    regressions = []
+    if baseline:
+        with open(baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(report, json.load(f), threshold)
+        for regression in regressions:
+            logging.warning(f"⚠️ Regression in {regression['case']} {regression['metric']}: "
+                            f"{regression['baseline']:.4f}s -> {regression['current']:.4f}s ({regression['change']:+.0%})")
+        if not regressions:
+            logging.info("✅ No regressions against the baseline.")
+
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Benchmark report saved to '{output_file}'.")
+    else:
+        click.echo(json.dumps(report, indent=2))
+    if regressions and fail_on_regression:
         sys.exit(1)
-    decoder = STRATEGIES[strategy_name]
-
-    # 3. (Optional) Verify HMAC Signature
-    hmac_sig = integrity.get('payload_hmac_signature')
-    if hmac_sig:
-        if not passphrase:
-            logging.error("This keymap is trust-paired. Please provide the --passphrase to decode.")
-            sys.exit(1)
-        if not verify_payload(payload, hmac_sig, passphrase):
-            logging.error("❌ HMAC signature verification FAILED. The keymap may be tampered with or the passphrase is incorrect.")
-            sys.exit(1)
-        logging.info("HMAC signature verified successfully.")
-    elif passphrase:
-        logging.warning("Passphrase provided, but the keymap is not trust-paired (no HMAC signature found).")
-
-    # 4. Decode Payload to Universal Bit Runs
-    logging.info(f"Decoding payload using '{decoder.name}' strategy...")
+
+
+@cli.command()
+@click.argument('socket_path', metavar='SOCKET', type=click.Path(dir_okay=False))
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help='Worker processes. Defaults to the number of CPUs.')
+@click.option('--max-pending', type=click.IntRange(min=1), help='Jobs admitted at once; further clients wait unread. Defaults to 4 per worker.')
+@click.option('--spool-dir', type=click.Path(file_okay=False, exists=True), help='Directory for the inputs and outputs of running jobs.')
+def serve(socket_path, jobs, max_pending, spool_dir):
+    """Run a daemon that serves encode, decode and verify jobs on a Unix socket."""
+    from utils.pipeline import HodError
+    from utils.server import HodServer  # asyncio is only needed by the daemon.
     try:
-        bit_runs = decoder.decode(payload)
-    except Exception as e:
-        logging.error(f"Failed to decode payload: {e}")
+        HodServer(socket_path, jobs, max_pending, spool_dir).run()
+    except HodError as e:
+        logging.error(str(e))
         sys.exit(1)
 
-    # 5. Handle --show-payload flag
-    if show_payload:
-        pretty_print_payload(strategy_name, payload)
-        sys.exit(0)
 
-    # 6. Reconstruct File
-    logging.info(f"Reconstructing original file at '{output_file}'...")
+@cli.command("server-metrics")
+@_with_server
+def server_metrics(server):
+    """Show the queue depth, job counts and latencies of a `hod serve` daemon."""
+    from utils.client import fetch_metrics
+    from utils.pipeline import HodError
+    if not server:
+        logging.error(f"No server given; pass --server or set ${SERVER_ENV}.")
+        sys.exit(1)
     try:
-        with open(output_file, 'wb') as f:
-            current_byte = 0
-            bit_count = 0
-            for bit, count in bit_runs:
-                for _ in range(count):
-                    current_byte = (current_byte << 1) | (1 if bit == '1' else 0)
-                    bit_count += 1
-                    if bit_count == 8:
-                        f.write(current_byte.to_bytes(1, 'big'))
-                        current_byte = 0
-                        bit_count = 0
-            # Write any remaining bits if the file size isn't a multiple of 8
-            if bit_count > 0:
-                 current_byte <<= (8 - bit_count)
-                 f.write(current_byte.to_bytes(1, 'big'))
-
-    except Exception as e:
-        logging.error(f"Failed during file reconstruction: {e}")
+        click.echo(json.dumps(fetch_metrics(server), indent=2))
+    except HodError as e:
+        logging.error(str(e))
         sys.exit(1)
 
-    # 7. (Optional) Verify Reconstructed File Hash
-    original_hash = integrity.get('file_hash')
-    if original_hash:
-        hash_algo = integrity.get('file_hash_algorithm')
-        logging.info(f"Verifying reconstructed file against stored {hash_algo} hash...")
-        reconstructed_hash = calculate_file_hash(output_file, hash_algo)
-        if reconstructed_hash == original_hash:
-            logging.info("✅ Hash verification successful. File reconstructed perfectly.")
-        else:
-            logging.warning("⚠️ HASH MISMATCH! Reconstructed file does not match the original hash.")
-            logging.warning(f"  Original:     {original_hash}")
-            logging.warning(f"  Reconstructed:{reconstructed_hash}")
-    else:
-        logging.info(f"✅ Decoding complete. No original file hash was stored to verify against.")
+
+@cli.command("cache-info")
+@click.option('--cache-dir', envvar=CACHE_DIR_ENV, required=True, type=click.Path(file_okay=False),
+              help=f'The keymap cache directory (or ${CACHE_DIR_ENV}).')
+@click.option('--clear', is_flag=True, help='Remove every cached keymap and reset the counters.')
+def cache_info(cache_dir, clear):
+    """Show the hit/miss counters and size of a keymap cache."""
+    from utils.cache import KeymapCache
+    cache = KeymapCache(cache_dir)
+    if clear:
+        cache.clear()
+        logging.info(f"Cleared keymap cache '{cache_dir}'.")
+    click.echo(json.dumps(cache.info(), indent=2))
 
 
 @cli.command("list-strategies")
 def list_strategies():
     """List all available encoding strategies."""
     print("Available Encoding Strategies:")
-    for name, strategy in STRATEGIES.items():
+    for name in STRATEGIES:
         print(f"  - {name}")
 
 if __name__ == '__main__':
@@ -1,25 +1,11 @@
 # strategies/__init__.py
-import pkgutil
-import importlib
 from .base_strategy import BaseStrategy
+from utils.registry import PluginRegistry
 
-# Dictionary to hold all discovered strategies, keyed by name
-STRATEGIES = {}
+# Registry of all discovered strategies, keyed by name. Strategy modules are
+# only imported when a strategy is looked up.
+STRATEGIES = PluginRegistry(__name__, __path__, BaseStrategy, "hod.strategies")
 
 def load_strategies():
-    """Dynamically loads all strategies from this package."""
-    if STRATEGIES:
-        return
-        
-    package_path = __path__
-    prefix = __name__ + "."
-    
-    for _, name, _ in pkgutil.iter_modules(package_path, prefix):
-        module = importlib.import_module(name)
-        for attribute_name in dir(module):
-            attribute = getattr(module, attribute_name)
-            if isinstance(attribute, type) and issubclass(attribute, BaseStrategy) and attribute is not BaseStrategy:
-                strategy_instance = attribute()
-                STRATEGIES[strategy_instance.name] = strategy_instance
-
-load_strategies()
+    """Discovers the available strategies (from the cached manifest when it is current)."""
+    STRATEGIES.manifest
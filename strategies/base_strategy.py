@@ -1,10 +1,17 @@
 # strategies/base_strategy.py
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Any
+from typing import Iterable, Iterator, List, Tuple, Any
 
 class BaseStrategy(ABC):
     """Abstract Base Class for all encoding strategies."""
-    
+
+    # True when every run is encoded independently of its neighbours, so
+    # ranges of runs can be encoded in parallel worker processes.
+    stateless = False
+    # True when every payload element encodes exactly one bit run, so the
+    # element at a given position in the payload is the run at that index.
+    element_per_run = False
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -13,10 +20,24 @@ class BaseStrategy(ABC):
 
     @abstractmethod
     def encode(self, bit_runs: List[Tuple[str, int]]) -> Any:
-        """Encodes universal bit runs into the strategy-specific payload."""
+        """Encodes universal bit runs (tuples or a RunSequence) into the strategy-specific payload."""
         pass
 
     @abstractmethod
     def decode(self, payload: Any) -> List[Tuple[str, int]]:
         """Decodes a strategy-specific payload back into universal bit runs."""
         pass
+
+    def encode_iter(self, bit_runs: Iterable[Tuple[str, int]]) -> Iterator[Any]:
+        """
+        Lazily encodes universal bit runs, yielding payload elements one at a time.
+        Strategies should override this; the default materializes the runs.
+        """
+        return iter(self.encode(list(bit_runs)))
+
+    def decode_iter(self, payload: Iterable[Any]) -> Iterator[Tuple[str, int]]:
+        """
+        Lazily decodes payload elements back into universal bit runs.
+        Strategies should override this; the default materializes the payload.
+        """
+        return iter(self.decode(list(payload)))
@@ -1,10 +1,35 @@
 # strategies/fibonacci.py
-from typing import List, Tuple, Any
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple, Any
 from .base_strategy import BaseStrategy
 
+# Fibonacci numbers 1, 2, 3, 5, ... covering every run length below 2**64.
+FIB_TABLE = [1, 2]
+while FIB_TABLE[-1] < 1 << 64:
+    FIB_TABLE.append(FIB_TABLE[-1] + FIB_TABLE[-2])
+# Distinct run lengths whose representation is memoized; most runs are short.
+FIB_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=FIB_CACHE_SIZE)
+def _zeckendorf(n: int) -> Tuple[int, ...]:
+    result = []
+    while n > 0:
+        # Greedily take the largest Fibonacci number that fits; the result is already descending.
+        fib = FIB_TABLE[bisect_right(FIB_TABLE, n) - 1]
+        result.append(fib)
+        n -= fib
+    return tuple(result)
+
 def to_fib_representation(n: int) -> List[int]:
     """Converts a number to its Zeckendorf representation."""
     if n == 0: return [0]
+    if n >= FIB_TABLE[-1]:
+        return _to_fib_representation_slow(n)
+    return list(_zeckendorf(n))
+
+def _to_fib_representation_slow(n: int) -> List[int]:
+    """Builds the Fibonacci numbers up to n on the fly, for lengths beyond FIB_TABLE."""
     fib = [1, 2]
     while fib[-1] <= n:
         fib.append(fib[-1] + fib[-2])
@@ -21,12 +46,21 @@ def to_fib_representation(n: int) -> List[int]:
     return sorted(result, reverse=True)
 
 class FibonacciStrategy(BaseStrategy):
+    stateless = True
+    element_per_run = True
+
     @property
     def name(self) -> str:
         return "fibonacci"
 
     def encode(self, bit_runs: List[Tuple[str, int]]) -> Any:
-        return [[bit, to_fib_representation(count)] for bit, count in bit_runs]
+        return list(self.encode_iter(bit_runs))
 
     def decode(self, payload: Any) -> List[Tuple[str, int]]:
-        return [(item[0], sum(item[1])) for item in payload]
+        return list(self.decode_iter(payload))
+
+    def encode_iter(self, bit_runs: Iterable[Tuple[str, int]]) -> Iterator[Any]:
+        return ([bit, to_fib_representation(count)] for bit, count in bit_runs)
+
+    def decode_iter(self, payload: Iterable[Any]) -> Iterator[Tuple[str, int]]:
+        return ((item[0], sum(item[1])) for item in payload)
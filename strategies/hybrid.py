@@ -0,0 +1,84 @@
+# strategies/hybrid.py
+import base64
+from itertools import chain
+from typing import Iterable, Iterator, List, Tuple, Any
+from .base_strategy import BaseStrategy
+from utils.core import batch_runs, bytes_to_runs, pack_sequences
+from utils.runs import RunSequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; block costs are computed in pure Python instead.
+    np = None
+
+# Number of runs per payload block.
+BLOCK_RUNS = 1024
+# Upper bounds of the run lengths with 1, 2, ... decimal digits.
+_DIGIT_LIMITS = [10 ** digits for digits in range(1, 20)]
+
+def _rle_cost(lengths) -> int:
+    """Characters needed for a block's run lengths as a JSON list: the digits plus a ', ' per run."""
+    if np is not None:
+        digits = np.searchsorted(np.array(_DIGIT_LIMITS, dtype=np.uint64), np.frombuffer(lengths, dtype=np.uint64),
+                                 side='right') + 1
+        return int(digits.sum()) + 2 * len(lengths)
+    return sum(len(str(length)) for length in lengths) + 2 * len(lengths)
+
+def _literal_cost(bits: int) -> int:
+    """Characters needed for a block's bits packed into bytes and base64-encoded."""
+    return (bits + 7) // 8 * 4 // 3 + 4
+
+class HybridStrategy(BaseStrategy):
+    """
+    Splits the runs into blocks of BLOCK_RUNS runs and stores each block in
+    whichever form is shorter: its run lengths, ["r", starting bit, [length,
+    ...]], or its bits themselves, ["b", bit count, base64 of the bits packed
+    into bytes]. Short runs (as in random or compressed data, about four runs
+    per byte) come out as literal bits, long runs as lengths. Blocks are
+    numbered from the start of the stream, so the strategy is not stateless.
+    """
+
+    @property
+    def name(self) -> str:
+        return "hybrid"
+
+    def encode(self, bit_runs: List[Tuple[str, int]]) -> Any:
+        return list(self.encode_iter(bit_runs))
+
+    def decode(self, payload: Any) -> List[Tuple[str, int]]:
+        return list(self.decode_iter(payload))
+
+    def encode_iter(self, bit_runs: Iterable[Tuple[str, int]]) -> Iterator[Any]:
+        for block in batch_runs(bit_runs, BLOCK_RUNS):
+            if not block:
+                continue
+            bits = block.total_bits
+            if _literal_cost(bits) < _rle_cost(block.lengths):
+                packed = b''.join(pack_sequences([block]))
+                yield ["b", bits, base64.b64encode(packed).decode('ascii')]
+            else:
+                yield ["r", block.start_bit, block.lengths.tolist()]
+
+    def decode_iter(self, payload: Iterable[Any]) -> Iterator[Tuple[str, int]]:
+        return chain.from_iterable(map(_decode_block, payload))
+
+def _decode_block(block: Any) -> RunSequence:
+    kind = block[0]
+    if kind == "r":
+        return RunSequence(str(block[1]), block[2])
+    if kind == "b":
+        bits = int(block[1])
+        data = base64.b64decode(block[2], validate=True)
+        if not 0 <= len(data) * 8 - bits < 8:
+            raise ValueError(f"Invalid hybrid literal block: {len(data)} bytes for {bits} bits.")
+        sequence = bytes_to_runs(data)
+        # Drop the zero bits that padded the last byte.
+        padding = len(data) * 8 - bits
+        while padding:
+            trimmed = min(padding, sequence.lengths[-1])
+            sequence.lengths[-1] -= trimmed
+            padding -= trimmed
+            if not sequence.lengths[-1]:
+                sequence.lengths.pop()
+        return sequence
+    raise ValueError(f"Invalid hybrid payload block kind: {kind!r}")
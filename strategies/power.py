@@ -1,21 +1,55 @@
 # strategies/power.py
 import re
-from typing import List, Tuple, Any
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Any
 from .base_strategy import BaseStrategy
 
+# Payload items parsed per bulk regex pass.
+PARSE_BATCH = 4096
+_ITEM = re.compile(r"(\d)\^(\d+)")
+# A batch of plain items joined by newlines; anything else takes the per-item path.
+_BATCH = re.compile(r"[01]\^[0-9]+(?:\n[01]\^[0-9]+)*")
+_BATCH_ITEM = re.compile(r"([01])\^([0-9]+)")
+
+def parse_power_items(items: List[Any]) -> Iterable[Tuple[str, int]]:
+    """
+    Parses a batch of power notation items. Well-formed batches are checked and
+    split with two regex passes over the joined text; otherwise each item is
+    parsed on its own, which also accepts anything the per-item match accepts.
+    """
+    if all(type(item) is str for item in items):
+        text = "\n".join(items)
+        if _BATCH.fullmatch(text):
+            parsed = _BATCH_ITEM.findall(text)
+            # More matches than items means an item itself contained a newline.
+            if len(parsed) == len(items):
+                return [(bit, int(count)) for bit, count in parsed]
+    return map(_parse_power_item, items)
+
+def _parse_power_item(item: Any) -> Tuple[str, int]:
+    match = _ITEM.match(item)
+    if not match:
+        raise ValueError(f"Invalid power notation item: {item}")
+    return (match.group(1), int(match.group(2)))
+
 class PowerStrategy(BaseStrategy):
+    stateless = True
+    element_per_run = True
+
     @property
     def name(self) -> str:
         return "power"
 
     def encode(self, bit_runs: List[Tuple[str, int]]) -> Any:
-        return [f"{bit}^{count}" for bit, count in bit_runs]
+        return list(self.encode_iter(bit_runs))
 
     def decode(self, payload: Any) -> List[Tuple[str, int]]:
-        runs = []
-        for item in payload:
-            match = re.match(r"(\d)\^(\d+)", item)
-            if not match:
-                raise ValueError(f"Invalid power notation item: {item}")
-            runs.append((match.group(1), int(match.group(2))))
-        return runs
+        return list(self.decode_iter(payload))
+
+    def encode_iter(self, bit_runs: Iterable[Tuple[str, int]]) -> Iterator[Any]:
+        return (f"{bit}^{count}" for bit, count in bit_runs)
+
+    def decode_iter(self, payload: Iterable[Any]) -> Iterator[Tuple[str, int]]:
+        payload = iter(payload)
+        while (items := list(islice(payload, PARSE_BATCH))):
+            yield from parse_power_items(items)
@@ -1,16 +1,24 @@
 # strategies/rle.py
-from typing import List, Tuple, Any
+from typing import Iterable, Iterator, List, Tuple, Any
 from .base_strategy import BaseStrategy
 
 class RleStrategy(BaseStrategy):
+    element_per_run = True
+
     @property
     def name(self) -> str:
         return "rle"
 
     def encode(self, bit_runs: List[Tuple[str, int]]) -> Any:
-        # For RLE, the universal format is already the payload.
-        return bit_runs
+        return list(self.encode_iter(bit_runs))
 
     def decode(self, payload: Any) -> List[Tuple[str, int]]:
+        return list(self.decode_iter(payload))
+
+    def encode_iter(self, bit_runs: Iterable[Tuple[str, int]]) -> Iterator[Any]:
+        # For RLE, the universal format is already the payload.
+        return iter(bit_runs)
+
+    def decode_iter(self, payload: Iterable[Any]) -> Iterator[Tuple[str, int]]:
         # The payload is expected to be in the universal format.
-        return [(str(bit), int(count)) for bit, count in payload]
+        return ((str(bit), int(count)) for bit, count in payload)
@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os
+import random
+import sys
+
+import pytest
+
+# The CLI and its packages live at the repository root rather than in an installed distribution.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def sample_bytes(size: int, seed: int = 0) -> bytes:
+    """Mixed test input: long runs (zero and 0xff blocks), text-like bytes and random bytes."""
+    rng = random.Random(seed)
+    parts = []
+    while sum(map(len, parts)) < size:
+        kind = rng.randrange(4)
+        length = rng.randrange(1, 400)
+        if kind == 0:
+            parts.append(bytes(length))
+        elif kind == 1:
+            parts.append(b"\xff" * length)
+        elif kind == 2:
+            parts.append(bytes(rng.choice(b"etaoin shrdlu\n") for _ in range(length)))
+        else:
+            parts.append(bytes(rng.randrange(256) for _ in range(length)))
+    return b"".join(parts)[:size]
+
+@pytest.fixture
+def sample_file(tmp_path):
+    """Writes sample_bytes(size, seed) to a file and returns its path."""
+    def make(size: int = 3000, seed: int = 0, name: str = "input.bin") -> str:
+        path = tmp_path / name
+        path.write_bytes(sample_bytes(size, seed))
+        return str(path)
+    return make
@@ -0,0 +1,17 @@
+# tests/test_bench.py
+import pytest
+
+from utils.bench import STAGES, generate_corpus, run_case
+
+@pytest.mark.parametrize("format_name", ["json", "binary", "conf"])
+def test_run_case_round_trips_through_the_pipeline(tmp_path, format_name):
+    corpus = str(tmp_path / "corpus.bin")
+    generate_corpus("text", 20000, corpus)
+    result = run_case(corpus, "rle", format_name, str(tmp_path))
+    assert result["reconstructed_ok"] is True
+    assert result["input_bytes"] == 20000 and result["keymap_bytes"] > 0
+    assert result["runs"] > 0
+    assert set(result["stages"]) == set(STAGES)
+    assert result["stages"]["run_generation"] > 0 and result["stages"]["hashing"] > 0
+    # Only the corpus is left behind.
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["corpus.bin"]
@@ -0,0 +1,62 @@
+# tests/test_cache.py
+import hashlib
+import os
+
+import pytest
+
+import utils.pipeline
+from conftest import sample_bytes
+from utils.cache import KeymapCache
+from utils.pipeline import decode_file, encode_file
+from utils.stats import Stats
+
+@pytest.fixture
+def cache(tmp_path):
+    return KeymapCache(str(tmp_path / "cache"))
+
+def _entries(cache):
+    return sorted(name for _, _, names in os.walk(cache.directory) for name in names if "-" in name)
+
+def _encode(input_file, output_file, cache, **options):
+    stats = Stats('encode')
+    metadata = encode_file(input_file, output_file, cache=cache, stats=stats, **options)
+    return metadata, stats.counters
+
+def test_miss_hashes_the_key_while_encoding(sample_file, tmp_path, cache, monkeypatch):
+    monkeypatch.setattr(utils.pipeline, "_file_hashes", lambda *args: pytest.fail("input read ahead of encoding"))
+    metadata, counters = _encode(sample_file(), str(tmp_path / "k.hod"), cache, hash_algos=("md5",))
+    assert counters["cache_misses"] == 1
+    content = sample_bytes(3000)
+    assert _entries(cache) == [f"3000-{hashlib.sha256(content).hexdigest()}.rle.json.hod"]
+    # Only the requested hashes are recorded, though sha256 was computed for the key.
+    assert metadata["file_hash_algorithms"] == ["md5"]
+    assert metadata["integrity"]["file_hashes"] == {"md5": hashlib.md5(content).hexdigest()}
+    assert cache.info()["misses"] == 1 and cache.info()["stores"] == 1
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+def test_hit_reuses_the_payload(sample_file, tmp_path, cache, extension):
+    first = sample_file(name="first.bin")
+    _encode(first, str(tmp_path / f"first{extension}"), cache)
+    second = sample_file(name="second.bin")
+    keymap = str(tmp_path / f"second{extension}")
+    metadata, counters = _encode(second, keymap, cache, hash_algos=("sha512", "md5"))
+    assert counters["cache_hits"] == 1
+    assert metadata["original_filename"] == "second.bin"
+    assert set(metadata["integrity"]["file_hashes"]) == {"sha512", "md5"}
+    assert decode_file(keymap, str(tmp_path / "out.bin"))["verified"] is True
+    assert (tmp_path / "out.bin").read_bytes() == sample_bytes(3000)
+
+def test_same_size_other_content_is_a_miss(sample_file, tmp_path, cache):
+    _encode(sample_file(seed=1, name="a.bin"), str(tmp_path / "a.hod"), cache)
+    metadata, counters = _encode(sample_file(seed=2, name="b.bin"), str(tmp_path / "b.hod"), cache)
+    assert counters["cache_misses"] == 1
+    assert len(_entries(cache)) == 2
+    assert decode_file(str(tmp_path / "b.hod"), str(tmp_path / "out.bin"))["verified"] is None
+    assert (tmp_path / "out.bin").read_bytes() == sample_bytes(3000, seed=2)
+
+def test_may_contain_matches_strategy_and_format(sample_file, tmp_path, cache):
+    _encode(sample_file(), str(tmp_path / "k.hod"), cache)
+    assert cache.may_contain(3000, "rle", "json", ".hod")
+    assert not cache.may_contain(3000, "power", "json", ".hod")
+    assert not cache.may_contain(3000, "rle", "json", ".hod", index_interval=512)
+    assert not cache.may_contain(3001, "rle", "json", ".hod")
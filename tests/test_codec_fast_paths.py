@@ -0,0 +1,115 @@
+# tests/test_codec_fast_paths.py
+import random
+import re
+
+import pytest
+
+from strategies.fibonacci import FIB_TABLE, FibonacciStrategy, to_fib_representation
+from strategies.power import PARSE_BATCH, PowerStrategy
+
+# The power and fibonacci codecs as they were before their fast paths, as the reference.
+
+def _baseline_power_encode(bit_runs):
+    return [f"{bit}^{count}" for bit, count in bit_runs]
+
+def _baseline_power_decode(payload):
+    runs = []
+    for item in payload:
+        match = re.match(r"(\d)\^(\d+)", item)
+        if not match:
+            raise ValueError(f"Invalid power notation item: {item}")
+        runs.append((match.group(1), int(match.group(2))))
+    return runs
+
+def _baseline_fib_representation(n):
+    if n == 0: return [0]
+    fib = [1, 2]
+    while fib[-1] <= n:
+        fib.append(fib[-1] + fib[-2])
+    result = []
+    i = len(fib) - 2
+    while n > 0 and i >= 0:
+        if fib[i] <= n:
+            result.append(fib[i])
+            n -= fib[i]
+            i -= 1
+        i -= 1
+    return sorted(result, reverse=True)
+
+def _baseline_fib_decode(payload):
+    return [(item[0], sum(item[1])) for item in payload]
+
+def _outcome(function, *args):
+    """The result of a call, or the type of the exception it raised."""
+    try:
+        return function(*args)
+    except Exception as e:
+        return type(e)
+
+def _runs(count, seed=0, longest=1 << 20):
+    rng = random.Random(seed)
+    return [("01"[i % 2], rng.choice((1, 2, 3, rng.randrange(1, longest)))) for i in range(count)]
+
+@pytest.mark.parametrize("count", [0, 1, PARSE_BATCH - 1, PARSE_BATCH, PARSE_BATCH + 1, 3 * PARSE_BATCH + 7])
+def test_power_matches_baseline(count):
+    runs = _runs(count, seed=count)
+    payload = PowerStrategy().encode(runs)
+    assert payload == _baseline_power_encode(runs)
+    assert PowerStrategy().decode(payload) == _baseline_power_decode(payload) == runs
+
+@pytest.mark.parametrize("odd", [
+    "2^5",          # A digit other than 0 or 1 is accepted by the per-item match.
+    "1^5junk",      # So is trailing text after the count.
+    "0^007",
+    "1^3\n0^2",     # An item containing a newline must not be split into two runs.
+    "1^٣",     # Non-ASCII digits.
+    "1^",
+    "x^1",
+    "",
+    " 0^1",
+    7,
+    None,
+    ["1", 2],
+])
+@pytest.mark.parametrize("position", [0, PARSE_BATCH - 1, PARSE_BATCH + 5])
+def test_power_malformed_items_fall_back_like_baseline(odd, position):
+    payload = _baseline_power_encode(_runs(PARSE_BATCH + 10, seed=1))
+    payload[position] = odd
+    assert _outcome(PowerStrategy().decode, payload) == _outcome(_baseline_power_decode, payload)
+
+def test_fibonacci_representation_matches_baseline():
+    rng = random.Random(2)
+    values = list(range(0, 3000))
+    values += [rng.randrange(1, 1 << 64) for _ in range(2000)]
+    values += [fib + delta for fib in FIB_TABLE for delta in (-1, 0, 1)]
+    # Lengths at and beyond the end of FIB_TABLE take the slow path.
+    values += [FIB_TABLE[-1] * 3 + 17, 1 << 70, (1 << 90) - 1]
+    for n in values:
+        assert to_fib_representation(n) == _baseline_fib_representation(n), n
+
+def test_fibonacci_representation_is_not_shared_with_the_cache():
+    first = to_fib_representation(12)
+    first.append(99)
+    assert to_fib_representation(12) == _baseline_fib_representation(12)
+
+@pytest.mark.parametrize("count", [0, 1, 5000])
+def test_fibonacci_matches_baseline(count):
+    runs = _runs(count, seed=count, longest=1 << 40)
+    payload = FibonacciStrategy().encode(runs)
+    assert payload == [[bit, _baseline_fib_representation(length)] for bit, length in runs]
+    assert FibonacciStrategy().decode(payload) == _baseline_fib_decode(payload) == runs
+
+@pytest.mark.parametrize("odd", [
+    ["1", [1, 1, 1]],      # Not a Zeckendorf representation, but the lengths still sum.
+    ["0", [0]],
+    ["1", []],
+    ["1", [8, 5], "extra"],
+    ["1"],
+    ["1", None],
+    [],
+    None,
+])
+def test_fibonacci_malformed_elements_decode_like_baseline(odd):
+    payload = FibonacciStrategy().encode(_runs(20, seed=3))
+    payload[7] = odd
+    assert _outcome(FibonacciStrategy().decode, payload) == _outcome(_baseline_fib_decode, payload)
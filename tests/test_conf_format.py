@@ -0,0 +1,67 @@
+# tests/test_conf_format.py
+import configparser
+import io
+import json
+
+from formats.conf_format import WRITE_BATCH, ConfFormat
+
+def _keymap_text(payload, **trailer) -> str:
+    stream = io.StringIO()
+    metadata = {"hod_version": "2.0", "strategy": "rle", "input_size_bytes": 7, "integrity": {"file_hash": None},
+                **trailer}
+    ConfFormat().serialize_stream(metadata, iter(payload), stream)
+    return stream.getvalue()
+
+def test_streamed_keymap_is_plain_configparser_input():
+    payload = [["0", n] for n in range(1, 2 * WRITE_BATCH + 3)]
+    config = configparser.ConfigParser()
+    config.read_string(_keymap_text(payload))
+    assert json.loads(config["hod_payload"]["data"]) == payload
+    assert json.loads(config["hod_metadata"]["integrity"]) == {"file_hash": None}
+
+def test_payload_is_read_a_line_at_a_time():
+    payload = [["0", n] if n % 2 else ["1", n] for n in range(1, 3 * WRITE_BATCH)]
+    trailer = {"run_index": {"interval": 64, "runs": [0, 7], "offsets": [0, 9]}}
+    lines = []
+    stream = io.StringIO(_keymap_text(payload, **trailer))
+    metadata, elements = ConfFormat().deserialize_stream(map(lambda line: lines.append(line) or line, stream))
+    assert metadata["input_size_bytes"] == 7 and "run_index" not in metadata
+    assert next(elements) == payload[0]
+    # Only the header and the first batch have been read.
+    assert len(lines) < 15
+    assert [payload[0], *elements] == payload
+    assert metadata["run_index"] == trailer["run_index"]
+    assert metadata["integrity"] == {"file_hash": None}
+
+def test_empty_payload_round_trips():
+    metadata, elements = ConfFormat().deserialize_stream(io.StringIO(_keymap_text([])))
+    assert list(elements) == []
+    assert metadata["integrity"] == {"file_hash": None}
+
+def test_single_line_keymaps_still_parse():
+    payload = [["0", 1], ["1", 2]]
+    config = configparser.ConfigParser()
+    config["hod_metadata"] = {"strategy": "rle", "input_size_bytes": "3", "integrity": json.dumps({"a": 1})}
+    config["hod_payload"] = {"data": json.dumps(payload)}
+    stream = io.StringIO()
+    config.write(stream)
+    data = ConfFormat().deserialize(io.StringIO(stream.getvalue()))
+    assert data["payload"] == payload
+    assert data["integrity"] == {"a": 1} and data["input_size_bytes"] == 3
+
+def test_missing_values_are_left_out():
+    text = _keymap_text([["0", 1]], original_filename=None)
+    assert "original_filename" not in text
+    metadata, elements = ConfFormat().deserialize_stream(io.StringIO(text))
+    list(elements)
+    assert metadata.get("original_filename") is None
+
+def test_original_reader_still_loads_streamed_keymaps():
+    # The reader conf keymaps shipped with: the whole file through configparser, metadata from [hod_metadata].
+    payload = [["0", n] for n in range(1, WRITE_BATCH + 5)]
+    config = configparser.ConfigParser()
+    config.read_string(_keymap_text(payload, run_index={"runs": [0]}))
+    meta = config["hod_metadata"]
+    assert json.loads(meta["integrity"]) == {"file_hash": None}
+    assert int(meta["input_size_bytes"]) == 7 and meta["strategy"] == "rle"
+    assert json.loads(config["hod_payload"]["data"]) == payload
@@ -0,0 +1,94 @@
+# tests/test_core.py
+import io
+import random
+
+import pytest
+
+from conftest import sample_bytes
+from utils.core import (LONG_RUN_BITS, BitPacker, generate_bit_runs, generate_run_sequences, iter_bit_runs,
+                        iter_run_sequences, pack_sequences, reconstruct_blocks)
+from utils.runs import RunSequence
+
+INPUTS = {
+    "empty": b"",
+    "single byte": b"\xa5",
+    "random": random.Random(1).randbytes(5000),
+    "long runs": bytes(3000) + b"\xff" * 2500 + b"\x01" + bytes(700),
+    "mixed": sample_bytes(4000),
+}
+
+@pytest.fixture(params=list(INPUTS), ids=list(INPUTS))
+def data(request) -> bytes:
+    return INPUTS[request.param]
+
+@pytest.mark.parametrize("block_size", [1, 7, 1024, 1 << 17])
+def test_iter_bit_runs_matches_generate_bit_runs(data, block_size):
+    expected = list(generate_bit_runs(io.BytesIO(data)))
+    assert list(iter_bit_runs(io.BytesIO(data), block_size)) == expected
+
+@pytest.mark.parametrize("block_size", [1, 7, 1024])
+def test_run_sequences_merge_runs_across_blocks(data, block_size):
+    sequences = list(iter_run_sequences(io.BytesIO(data), block_size))
+    assert all(sequences)
+    # A run that reaches the end of a block continues in the next chunk only if the bits differ.
+    for previous, current in zip(sequences, sequences[1:]):
+        assert previous.end_bit != current.start_bit
+    runs = [run for sequence in sequences for run in sequence]
+    assert runs == list(generate_bit_runs(io.BytesIO(data)))
+
+def test_numpy_engine_matches_generate_bit_runs(data):
+    pytest.importorskip("numpy")
+    runs = [run for sequence in generate_run_sequences(io.BytesIO(data), 64) for run in sequence]
+    assert runs == list(generate_bit_runs(io.BytesIO(data)))
+
+def _bits(data: bytes, nbits: int) -> str:
+    return "".join(f"{byte:08b}" for byte in data)[:nbits]
+
+def _runs_of(bits: str) -> list:
+    runs = []
+    for bit in bits:
+        if runs and runs[-1][0] == bit:
+            runs[-1][1] += 1
+        else:
+            runs.append([bit, 1])
+    return [tuple(run) for run in runs]
+
+PACKER_CASES = {
+    "empty": [],
+    # Runs of 3, 7 and 11 bits start and end inside bytes.
+    "byte crossings": [("1", 3), ("0", 7), ("1", 11), ("0", 5), ("1", 6)],
+    # Longer than LONG_RUN_BITS and than the 64-byte packing block, starting mid-byte.
+    "long runs": [("0", 5), ("1", (1 << 16) + 9), ("0", 64 * 8 * 3 + 1), ("1", 2)],
+    # 13 bits leave a partial final byte, padded with zero bits.
+    "partial byte": [("1", 13)],
+}
+
+@pytest.fixture(params=list(PACKER_CASES), ids=list(PACKER_CASES))
+def runs(request) -> list:
+    return PACKER_CASES[request.param]
+
+def _check_packed(blocks: list, runs: list, block_size: int):
+    data = b"".join(blocks)
+    nbits = sum(count for _, count in runs)
+    assert len(data) == (nbits + 7) // 8
+    assert _runs_of(_bits(data, nbits)) == runs
+    assert _bits(data, len(data) * 8)[nbits:] == "0" * (len(data) * 8 - nbits)
+    # Blocks are handed out once block_size bytes are complete; a short run can overshoot by its own length.
+    assert all(block_size <= len(block) <= block_size + LONG_RUN_BITS // 8 + 1 for block in blocks[:-1])
+
+def test_reconstruct_blocks_round_trips(runs):
+    _check_packed(list(reconstruct_blocks(runs, 64)), runs, 64)
+
+def test_pack_sequences_carries_bits_between_chunks(runs):
+    # Every run becomes its own chunk, so partial bytes must carry across chunk boundaries.
+    sequences = [RunSequence(bit, [count]) for bit, count in runs]
+    _check_packed(list(pack_sequences(sequences, 64)), runs, 64)
+
+def test_bit_packer_run_by_run(runs):
+    packer = BitPacker(64)
+    blocks = [block for bit, count in runs for block in packer.add_run(bit == "1", count)]
+    _check_packed(blocks + list(packer.finish()), runs, 64)
+
+def test_packing_inverts_extraction(data):
+    assert b"".join(reconstruct_blocks(iter_bit_runs(io.BytesIO(data), 7), 64)) == data
+    assert b"".join(pack_sequences(iter_run_sequences(io.BytesIO(data), 7), 64)) == data
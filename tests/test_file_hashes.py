@@ -0,0 +1,72 @@
+# tests/test_file_hashes.py
+import json
+
+import pytest
+
+import utils.pipeline
+from conftest import sample_bytes
+from utils.constants import SUPPORTED_HASH_ALGORITHMS
+from utils.meta import create_metadata
+from utils.pipeline import HodError, decode_file, encode_file, verify_file
+
+@pytest.fixture
+def hashed_with(monkeypatch):
+    """Records the algorithms of every MultiHasher the pipeline creates."""
+    created = []
+    original = utils.pipeline.MultiHasher
+    def record(algorithms):
+        created.append(list(algorithms))
+        return original(algorithms)
+    monkeypatch.setattr(utils.pipeline, "MultiHasher", record)
+    return created
+
+@pytest.mark.parametrize("hash_algos", [(), ("md5",), ("sha512", "sha256")])
+def test_metadata_lists_the_hash_algorithms(hash_algos):
+    metadata = create_metadata("input.bin", 10, "rle", file_hashes=dict.fromkeys(hash_algos))
+    assert metadata["file_hash_algorithms"] == list(hash_algos)
+    assert create_metadata("input.bin", 10, "rle", "sha256")["file_hash_algorithms"] == ["sha256"]
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+@pytest.mark.parametrize("hash_algos", [(), ("md5",), ("sha512", "sha256")])
+def test_decode_computes_only_the_stored_hashes(sample_file, tmp_path, hashed_with, extension, hash_algos):
+    keymap = str(tmp_path / f"k{extension}")
+    metadata = encode_file(sample_file(), keymap, hash_algos=hash_algos)
+    assert metadata["file_hash_algorithms"] == list(hash_algos)
+    hashed_with.clear()
+    result = decode_file(keymap, str(tmp_path / "out.bin"))
+    assert hashed_with == [list(hash_algos)]
+    assert result["verified"] is (True if hash_algos else None)
+    hashed_with.clear()
+    assert verify_file(keymap)["verified"] is (True if hash_algos else None)
+    assert hashed_with == [list(hash_algos)]
+
+def test_algorithms_precede_the_payload(sample_file, tmp_path):
+    keymap = tmp_path / "k.hod"
+    encode_file(sample_file(), str(keymap), hash_algos=("md5",))
+    text = keymap.read_text(encoding="utf-8")
+    assert text.index('"file_hash_algorithms"') < text.index('"payload"') < text.index('"integrity"')
+
+def test_keymaps_without_the_list_compute_every_hash(sample_file, tmp_path, hashed_with):
+    keymap = tmp_path / "k.hod"
+    encode_file(sample_file(), str(keymap), hash_algos=("md5",))
+    # Rewritten the way keymaps streamed before the header listed the algorithms were laid out.
+    data = json.loads(keymap.read_text(encoding="utf-8"))
+    del data["file_hash_algorithms"]
+    integrity = data.pop("integrity")
+    keymap.write_text(json.dumps({**data, "integrity": integrity}, indent=2), encoding="utf-8")
+    hashed_with.clear()
+    assert decode_file(str(keymap), str(tmp_path / "out.bin"))["verified"] is True
+    assert hashed_with == [list(SUPPORTED_HASH_ALGORITHMS)]
+
+def test_verify_compares_with_the_original(sample_file, tmp_path):
+    source, keymap = sample_file(), str(tmp_path / "k.hodb")
+    encode_file(source, keymap)
+    result = verify_file(keymap, source)
+    assert (result["verified"], result["hmac_verified"], result["matches_original"]) == (None, None, True)
+    changed = tmp_path / "changed.bin"
+    changed.write_bytes(sample_bytes(1000) + b"?" + sample_bytes(3000)[1001:])
+    with pytest.raises(HodError, match="at byte 1000"):
+        verify_file(keymap, str(changed))
+    changed.write_bytes(sample_bytes(3000) + b"!")
+    with pytest.raises(HodError, match="at byte 3000"):
+        verify_file(keymap, str(changed))
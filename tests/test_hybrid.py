@@ -0,0 +1,47 @@
+# tests/test_hybrid.py
+import random
+
+import pytest
+
+from conftest import sample_bytes
+from formats import FORMATS
+from strategies.hybrid import BLOCK_RUNS, HybridStrategy
+from utils.core import bytes_to_runs
+from utils.pipeline import decode_file, encode_file
+
+def _random_bytes(size, seed=0):
+    rng = random.Random(seed)
+    return bytes(rng.randrange(256) for _ in range(size))
+
+@pytest.mark.parametrize("data", [b"", b"\x80", bytes(5000), sample_bytes(5000), _random_bytes(5000)],
+                         ids=["empty", "one byte", "zeros", "sample", "random"])
+def test_runs_round_trip(data):
+    runs = list(bytes_to_runs(data))
+    payload = HybridStrategy().encode(runs)
+    assert list(HybridStrategy().decode(payload)) == runs
+
+def test_each_block_takes_the_shorter_form():
+    runs = list(bytes_to_runs(_random_bytes(2000) + bytes(100000) * 40))
+    payload = HybridStrategy().encode(runs)
+    assert payload[0][0] == "b" and payload[-1][0] == "r"
+    assert len(payload) == -(-len(runs) // BLOCK_RUNS)
+
+def test_literal_blocks_drop_the_padding_bits():
+    # Three runs totalling 11 bits: the packed literal block ends in five padding zeros.
+    runs = [("1", 2), ("0", 1), ("1", 8)]
+    payload = HybridStrategy().encode(runs)
+    assert payload[0][:2] == ["b", 11]
+    assert list(HybridStrategy().decode(payload)) == runs
+
+@pytest.mark.parametrize("block", [["x", 1, []], ["b", 9, "AA=="], ["b", 8, "not base64!"]])
+def test_malformed_blocks_are_rejected(block):
+    with pytest.raises(ValueError):
+        list(HybridStrategy().decode([block]))
+
+@pytest.mark.parametrize("format_name", list(FORMATS))
+def test_file_round_trip(sample_file, tmp_path, format_name):
+    keymap = str(tmp_path / f"keymap{FORMATS[format_name].extension}")
+    encode_file(sample_file(size=20000), keymap, "hybrid", ("sha256",), format_name=format_name)
+    output = tmp_path / "output.bin"
+    assert decode_file(keymap, str(output))["verified"] is True
+    assert output.read_bytes() == sample_bytes(20000)
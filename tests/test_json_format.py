@@ -0,0 +1,62 @@
+# tests/test_json_format.py
+import io
+import json
+
+from formats.json_format import JsonFormat, _JsonStreamReader
+
+def _keymap_text(payload, **trailer) -> str:
+    stream = io.StringIO()
+    metadata = {"hod_version": "2.0", "strategy": "rle", "integrity": {"file_hash": None}, **trailer}
+    JsonFormat().serialize_stream(metadata, payload, stream)
+    return stream.getvalue()
+
+def _count_decodes(reader: _JsonStreamReader) -> list:
+    calls = []
+    decode = reader.decoder.raw_decode
+    reader.decoder.raw_decode = lambda *args: calls.append(args) or decode(*args)
+    return calls
+
+def test_streamed_keymap_is_plain_json():
+    payload = [["0", 3], ["1", 5], ["0", 1]]
+    text = _keymap_text(payload)
+    assert json.loads(text)["payload"] == payload
+
+def test_payload_round_trips_with_trailer():
+    payload = [["0", n] if n % 2 else ["1", n] for n in range(1, 5000)]
+    trailer = {"run_index": {"interval": 64, "runs": list(range(0, 5000, 7)), "offsets": [0] * 715, "positions": []}}
+    metadata, elements = JsonFormat().deserialize_stream(io.StringIO(_keymap_text(payload, **trailer)))
+    assert list(elements) == payload
+    assert metadata["run_index"] == trailer["run_index"]
+
+def test_batches_stop_at_the_end_of_the_payload():
+    # A comma-heavy trailer after the payload must not be parsed again for every remaining element.
+    payload = [["0", n] for n in range(200)]
+    trailer = {"run_index": {"runs": list(range(0, 200, 50)), "positions": [], "hashes": ["ab" * 32] * 2000}}
+    text = _keymap_text(payload, **trailer)
+    reader = _JsonStreamReader(io.StringIO(text))
+    reader.expect("{")
+    reader.read_members({}, stop_at="payload")
+    reader.expect("[")
+    calls = _count_decodes(reader)
+    elements = [element for batch in reader.array_batches() for element in batch]
+    assert elements == payload
+    assert len(calls) <= 3
+    assert reader.peek() == ","
+
+def test_compact_json_keymaps_still_parse():
+    payload = [["0", 1], ["1", [2, 3]], ["0", 4]]
+    text = json.dumps({"strategy": "rle", "payload": payload, "integrity": {"a": [1, 2, 3]}})
+    metadata, elements = JsonFormat().deserialize_stream(io.StringIO(text))
+    assert list(elements) == payload
+    assert metadata["integrity"] == {"a": [1, 2, 3]}
+
+def test_run_index_positions_match_the_batched_text():
+    payload = [["0", n] if n % 2 else ["1", n] for n in range(1, 10000)]
+    index = {"runs": [0, 5, 4095, 4096, 9000], "positions": []}
+    text = _keymap_text(payload, run_index=index)
+    start = text.index("[", text.index('"payload"')) + 1
+    # Elements are laid out the same whether or not their positions are recorded.
+    assert text[:text.index("\n  ]")] == _keymap_text(payload).split("\n  ]")[0]
+    for run, position in zip(index["runs"], index["positions"]):
+        element, _ = json.JSONDecoder().raw_decode(text, start + position)
+        assert element == payload[run]
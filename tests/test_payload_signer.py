@@ -0,0 +1,38 @@
+# tests/test_payload_signer.py
+import pytest
+
+from utils.hashing import LEGACY_HMAC_SCHEME, PAYLOAD_HMAC_SCHEME, SIGN_BATCH, PayloadSigner, sign_payload
+
+def _payload(count):
+    return [["01"[i % 2], i + 1] for i in range(count)]
+
+def _signature(payload, scheme=LEGACY_HMAC_SCHEME, context="rle", passphrase="secret"):
+    signer = PayloadSigner(passphrase, scheme, context)
+    assert list(signer.wrap(payload)) == payload
+    return signer.hexdigest()
+
+@pytest.mark.parametrize("count", [0, 1, SIGN_BATCH - 1, SIGN_BATCH, SIGN_BATCH + 1, 2 * SIGN_BATCH + 3])
+def test_legacy_scheme_matches_sign_payload(count):
+    payload = _payload(count)
+    assert _signature(payload) == sign_payload(payload, "secret")
+
+@pytest.mark.parametrize("count", [1, SIGN_BATCH + 1])
+def test_v2_signature_does_not_depend_on_the_batching(count, monkeypatch):
+    payload = _payload(count)
+    expected = _signature(payload, PAYLOAD_HMAC_SCHEME)
+    monkeypatch.setattr("utils.hashing.SIGN_BATCH", 3)
+    assert _signature(payload, PAYLOAD_HMAC_SCHEME) == expected
+
+def test_v2_scheme_binds_the_strategy_and_passphrase():
+    payload = _payload(10)
+    signature = _signature(payload, PAYLOAD_HMAC_SCHEME)
+    assert signature != sign_payload(payload, "secret")
+    assert signature != _signature(payload, PAYLOAD_HMAC_SCHEME, context="power")
+    assert signature != _signature(payload, PAYLOAD_HMAC_SCHEME, passphrase="other")
+    signer = PayloadSigner("secret", PAYLOAD_HMAC_SCHEME, "rle")
+    list(signer.wrap(payload))
+    assert signer.verify(signature) and not signer.verify(signature[::-1])
+
+def test_unknown_scheme_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported payload HMAC scheme"):
+        PayloadSigner("secret", "hod-hmac-v9")
@@ -0,0 +1,76 @@
+# tests/test_ranges.py
+import json
+
+import pytest
+
+from conftest import sample_bytes
+from utils.pipeline import HodError, decode_range, encode_file
+
+INTERVAL = 512
+
+@pytest.fixture
+def indexed(sample_file, tmp_path):
+    def make(extension: str = ".hod", passphrase: str = None) -> str:
+        keymap = str(tmp_path / f"indexed{extension}")
+        encode_file(sample_file(), keymap, index_interval=INTERVAL, passphrase=passphrase)
+        return keymap
+    return make
+
+@pytest.fixture
+def precious(tmp_path):
+    path = tmp_path / "precious.txt"
+    path.write_bytes(b"do not overwrite")
+    return path
+
+def _swap_first_runs(keymap: str):
+    """Tampers with the payload in place: the first two runs swap lengths, so every offset stays valid."""
+    with open(keymap, encoding="utf-8") as f:
+        text = f.read()
+    at = text.index('"payload"')
+    old = '["1", 2], ["0", 1],'
+    assert text.index(old, at) < text.index("]", at + len(old))
+    text = text[:at] + text[at:].replace(old, '["1", 1], ["0", 2],', 1)
+    with open(keymap, "w", encoding="utf-8") as f:
+        f.write(text)
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb", ".hod.gz"])
+@pytest.mark.parametrize("start, end", [(0, 1), (0, None), (511, 513), (700, 2100), (2999, None), (1024, 1024),
+                                        (2500, 9000)])
+def test_range_matches_input(indexed, tmp_path, extension, start, end):
+    output = tmp_path / "range.bin"
+    metadata = decode_range(indexed(extension), str(output), start, end)
+    assert output.read_bytes() == sample_bytes(3000)[start:end]
+    assert metadata["verified"] is True
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+def test_signed_range_needs_the_passphrase(indexed, precious, extension):
+    keymap = indexed(extension, passphrase="right")
+    with pytest.raises(HodError, match="trust-paired"):
+        decode_range(keymap, str(precious), 100, 900)
+    with pytest.raises(HodError, match="HMAC"):
+        decode_range(keymap, str(precious), 100, 900, passphrase="wrong")
+    assert precious.read_bytes() == b"do not overwrite"
+    decode_range(keymap, str(precious), 100, 900, passphrase="right")
+    assert precious.read_bytes() == sample_bytes(3000)[100:900]
+
+def test_tampered_chunk_hashes_fail_the_index_hmac(indexed, precious):
+    keymap = indexed(passphrase="right")
+    with open(keymap, encoding="utf-8") as f:
+        data = json.load(f)
+    data["run_index"]["hashes"][0] = "0" * 64
+    with open(keymap, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    with pytest.raises(HodError, match="Run index HMAC"):
+        decode_range(keymap, str(precious), 0, 10, passphrase="right")
+    assert precious.read_bytes() == b"do not overwrite"
+
+@pytest.mark.parametrize("passphrase", [None, "right"])
+def test_tampered_payload_fails_the_chunk_hashes(indexed, precious, passphrase):
+    keymap = indexed(passphrase=passphrase)
+    _swap_first_runs(keymap)
+    with pytest.raises(HodError, match="chunk hashes"):
+        decode_range(keymap, str(precious), 10, 20, passphrase=passphrase)
+    assert precious.read_bytes() == b"do not overwrite"
+    # Chunks the tampering did not touch still decode.
+    decode_range(keymap, str(precious), INTERVAL, 2 * INTERVAL, passphrase=passphrase)
+    assert precious.read_bytes() == sample_bytes(3000)[INTERVAL:2 * INTERVAL]
@@ -0,0 +1,98 @@
+# tests/test_registry.py
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+from utils.registry import PluginRegistry
+
+PLUGIN = """
+from {package} import Base
+
+class {name}Plugin(Base):
+    name = "{key}"
+    extension = ".{key}"
+"""
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """A throwaway plugin package with two plugin modules; returns a factory of fresh registries for it."""
+    name = f"hod_test_plugins_{os.getpid()}"
+    root = tmp_path / name
+    root.mkdir()
+    (root / "__init__.py").write_text("class Base:\n    pass\n")
+    for key in ("alpha", "beta"):
+        (root / f"{key}.py").write_text(PLUGIN.format(package=name, name=key.title(), key=key))
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def registry() -> PluginRegistry:
+        # A new registry with no plugin modules imported, as in a fresh process.
+        for module in [module for module in sys.modules if module.startswith(name + ".")]:
+            del sys.modules[module]
+        importlib.invalidate_caches()
+        base = importlib.import_module(name).Base
+        return PluginRegistry(name, [str(root)], base, "hod.test-plugins", attributes=("extension",))
+
+    yield root, name, registry
+    for module in [module for module in sys.modules if module == name or module.startswith(name + ".")]:
+        del sys.modules[module]
+
+def _plugin_modules(name: str) -> list:
+    return sorted(module for module in sys.modules if module.startswith(name + "."))
+
+def test_cold_start_builds_the_manifest(package):
+    root, name, registry = package
+    plugins = registry()
+    assert sorted(plugins) == ["alpha", "beta"]
+    cache = json.loads((root / "__pycache__" / "hod-plugins.json").read_text())
+    assert cache["plugins"]["alpha"] == {"target": f"{name}.alpha:AlphaPlugin", "extension": ".alpha"}
+
+def test_warm_start_imports_no_plugin_modules(package):
+    _, name, registry = package
+    list(registry())
+    plugins = registry()
+    assert sorted(plugins) == ["alpha", "beta"]
+    assert ".beta" in plugins.index("extension")
+    assert _plugin_modules(name) == []
+    # Looking a plugin up imports only its own module.
+    assert plugins["beta"].extension == ".beta"
+    assert _plugin_modules(name) == [f"{name}.beta"]
+
+def test_stale_manifest_is_rebuilt(package):
+    root, name, registry = package
+    list(registry())
+    (root / "gamma.py").write_text(PLUGIN.format(package=name, name="Gamma", key="gamma"))
+    assert sorted(registry()) == ["alpha", "beta", "gamma"]
+    cache = json.loads((root / "__pycache__" / "hod-plugins.json").read_text())
+    assert "gamma" in cache["plugins"]
+
+@pytest.mark.parametrize("content", ["{not json", "[]", '{"signature": 1}'])
+def test_corrupt_manifest_is_rebuilt(package, content):
+    root, name, registry = package
+    list(registry())
+    (root / "__pycache__" / "hod-plugins.json").write_text(content)
+    assert sorted(registry()) == ["alpha", "beta"]
+    cache = json.loads((root / "__pycache__" / "hod-plugins.json").read_text())
+    assert sorted(cache["plugins"]) == ["alpha", "beta"]
+
+def test_unrelated_sys_path_changes_keep_the_manifest(package):
+    root, name, registry = package
+    list(registry())
+    # root's parent is on sys.path; installing or editing anything else there must not cost a rebuild.
+    (root.parent / "unrelated.py").write_text("")
+    assert sorted(registry()) == ["alpha", "beta"]
+    assert _plugin_modules(name) == []
+
+def test_new_entry_point_rebuilds_the_manifest(package, monkeypatch):
+    from importlib.metadata import EntryPoint
+    root, name, registry = package
+    list(registry())
+    (root.parent / f"{name}_extra.py").write_text(PLUGIN.format(package=name, name="Delta", key="delta"))
+    entry_point = EntryPoint("delta", f"{name}_extra:DeltaPlugin", "hod.test-plugins")
+    monkeypatch.setattr("utils.registry._entry_points", lambda group: [entry_point])
+    plugins = registry()
+    assert sorted(plugins) == ["alpha", "beta", "delta"]
+    assert plugins["delta"].extension == ".delta"
+    sys.modules.pop(f"{name}_extra", None)
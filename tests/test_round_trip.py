@@ -0,0 +1,59 @@
+# tests/test_round_trip.py
+import pytest
+
+from conftest import sample_bytes
+from formats import FORMATS
+from strategies import STRATEGIES
+from utils.compression import CODECS
+from utils.pipeline import decode_file, encode_file, verify_file
+
+INPUTS = {"sample": sample_bytes(3000), "empty": b"", "one byte": b"\x80"}
+
+@pytest.mark.parametrize("compression", [None, *CODECS])
+@pytest.mark.parametrize("format_name", list(FORMATS))
+@pytest.mark.parametrize("strategy", list(STRATEGIES))
+@pytest.mark.parametrize("content", list(INPUTS))
+def test_round_trip(tmp_path, strategy, format_name, compression, content):
+    original = tmp_path / "input.bin"
+    original.write_bytes(INPUTS[content])
+    keymap = str(tmp_path / f"keymap{FORMATS[format_name].extension}{CODECS[compression].extension if compression else ''}")
+    metadata = encode_file(str(original), keymap, strategy, ("sha256",), format_name=format_name,
+                           compression=compression)
+    assert metadata["strategy"] == strategy and metadata["input_size_bytes"] == len(INPUTS[content])
+
+    output = tmp_path / "output.bin"
+    assert decode_file(keymap, str(output))["verified"] is True
+    assert output.read_bytes() == INPUTS[content]
+    assert verify_file(keymap, str(original))["verified"] is True
+
+@pytest.mark.parametrize("strategy", list(STRATEGIES))
+@pytest.mark.parametrize("format_name", list(FORMATS))
+def test_parallel_encode_matches_serial(sample_file, tmp_path, strategy, format_name):
+    source = sample_file(size=40000)
+    extension = FORMATS[format_name].extension
+    serial, parallel = str(tmp_path / f"serial{extension}"), str(tmp_path / f"parallel{extension}")
+    encode_file(source, serial, strategy, format_name=format_name)
+    encode_file(source, parallel, strategy, format_name=format_name, jobs=2)
+    output = tmp_path / "output.bin"
+    decode_file(parallel, str(output))
+    assert output.read_bytes() == sample_bytes(40000)
+    # Keymaps carry their creation time, so only the payloads are compared.
+    assert _payload(serial, format_name) == _payload(parallel, format_name)
+
+def _payload(keymap, format_name):
+    keymap_format = FORMATS[format_name]
+    with keymap_format.open_file(keymap, 'r') as f:
+        _, payload = keymap_format.deserialize_stream(f)
+        return list(payload)
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("index_interval", [None, 1024])
+def test_binary_keymaps_are_written_from_the_runs(sample_file, tmp_path, monkeypatch, jobs, index_interval):
+    source, keymap = sample_file(size=40000), str(tmp_path / "keymap.hodb")
+    for name in ("encode_iter", "decode_iter"):
+        monkeypatch.setattr(type(STRATEGIES["hybrid"]), name, lambda *args: pytest.fail(f"{name} called"))
+    encode_file(source, keymap, "hybrid", ("sha256",), jobs=jobs, index_interval=index_interval)
+    monkeypatch.undo()
+    output = tmp_path / "output.bin"
+    assert decode_file(keymap, str(output))["verified"] is True
+    assert output.read_bytes() == sample_bytes(40000)
@@ -0,0 +1,64 @@
+# tests/test_runs.py
+from array import array
+from itertools import chain
+
+import pytest
+
+from conftest import sample_bytes
+from utils.core import bytes_to_runs
+from utils.parallel import _extract_range, _stitched
+from utils.runs import RunSequence
+
+def test_lengths_are_an_array_of_q_after_the_starting_bit():
+    sequence = RunSequence('1', [3, 1, 4])
+    assert sequence.start_bit == '1' and sequence.end_bit == '1'
+    assert isinstance(sequence.lengths, array) and sequence.lengths.typecode == 'Q'
+    assert sequence.lengths.itemsize == 8
+    assert sequence.to_memoryview().tolist() == [3, 1, 4]
+    assert [sequence.bit_at(index) for index in range(3)] == ['1', '0', '1']
+    assert sequence.total_bits == 8
+    # Lengths given as raw bytes (as the extraction engine does) are read as native uint64s.
+    assert RunSequence('0', array('Q', [5, 6]).tobytes()).lengths.tolist() == [5, 6]
+    with pytest.raises(ValueError):
+        RunSequence('x')
+
+def test_converts_to_and_from_tuples():
+    runs = [('0', 2), ('1', 7), ('0', 1), ('1', 1 << 40)]
+    sequence = RunSequence.from_runs(runs)
+    assert list(sequence) == runs
+    assert sequence[1] == ('1', 7) and sequence[-1] == ('1', 1 << 40)
+    assert list(sequence[1:3]) == runs[1:3] and sequence[1:3].start_bit == '1'
+    assert RunSequence.from_runs(sequence) == sequence
+    assert list(RunSequence.from_runs(iter(runs))) == runs
+    assert list(RunSequence()) == [] and RunSequence() == RunSequence('1')
+
+def test_from_runs_drops_empty_runs_and_merges_repeated_bits():
+    sequence = RunSequence.from_runs([('1', 0), ('0', 2), ('0', 3), ('1', 0), ('0', 1), ('1', 4)])
+    assert list(sequence) == [('0', 6), ('1', 4)]
+    with pytest.raises(ValueError):
+        RunSequence.from_runs([('0', 1), ('2', 1)])
+
+def test_concatenation_merges_the_shared_bit():
+    first, second = RunSequence('0', [2, 3]), RunSequence('1', [4, 5])
+    assert first.end_bit == second.start_bit
+    joined = RunSequence.from_runs(first)
+    joined.extend(second)
+    assert list(joined) == [('0', 2), ('1', 7), ('0', 5)]
+    assert joined.total_bits == first.total_bits + second.total_bits
+
+@pytest.mark.parametrize("ranges", [
+    [b"\x00\x00", b"\x00\x01"],  # The range boundary falls inside a run of zeros.
+    [b"\x0f", b"\xf0"],          # ...inside a run of ones.
+    [b"\x01", b"\x00"],          # ...between runs of different bits.
+    [b"\xff", b"\xff", b"\xff"],  # Single-run ranges merge into one run.
+])
+def test_stitched_ranges_match_the_whole_input(ranges):
+    results = (_extract_range(block, None) for block in ranges)
+    runs = chain.from_iterable(item for _, item in _stitched(results))
+    assert RunSequence.from_runs(list(runs)) == bytes_to_runs(b"".join(ranges))
+
+def test_stitched_random_ranges_match_the_whole_input():
+    data = sample_bytes(5000, seed=3)
+    ranges = [data[start:start + 333] for start in range(0, len(data), 333)]
+    runs = list(chain.from_iterable(item for _, item in _stitched(_extract_range(block, None) for block in ranges)))
+    assert runs == list(bytes_to_runs(data))
@@ -0,0 +1,106 @@
+# tests/test_server.py
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import sample_bytes
+from utils.client import fetch_metrics, submit_file
+from utils.pipeline import HodError
+
+HOD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hod.py")
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / "hod.sock")
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    process = subprocess.Popen([sys.executable, HOD, "serve", socket_path, "-j", "1", "--spool-dir", str(spool)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(socket_path):
+            if process.poll() is not None or time.monotonic() > deadline:
+                pytest.fail("the server did not start")
+            time.sleep(0.05)
+        yield socket_path, spool
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+def test_jobs_round_trip_and_report_metrics(server, sample_file, tmp_path):
+    socket_path, spool = server
+    keymap, output = str(tmp_path / "k.hodb"), str(tmp_path / "out.bin")
+    metadata = submit_file(socket_path, "encode", {"hash_algos": ["sha256"]}, sample_file(), keymap)
+    assert metadata["strategy"] == "rle"
+    assert submit_file(socket_path, "decode", {}, keymap, output)["verified"] is True
+    assert open(output, "rb").read() == sample_bytes(3000)
+    with pytest.raises(HodError, match="Unsupported decode options"):
+        submit_file(socket_path, "decode", {"bogus": 1}, keymap, output)
+    # A failed job leaves the existing output in place.
+    assert open(output, "rb").read() == sample_bytes(3000)
+
+    metrics = fetch_metrics(socket_path)
+    assert metrics["commands"]["encode"]["completed"] == 1
+    assert metrics["commands"]["decode"]["completed"] == 1
+    assert metrics["queue_depth"] == 0 and metrics["running"] == 0
+    # Every job's spool directory is removed once its output has been sent.
+    assert os.listdir(spool) == []
+
+def test_unreachable_server(tmp_path):
+    with pytest.raises(HodError, match="Cannot run the job"):
+        fetch_metrics(str(tmp_path / "missing.sock"))
+
+def test_failed_job_keeps_existing_output(sample_file, tmp_path):
+    output = tmp_path / "keep.bin"
+    output.write_bytes(b"keep me")
+    with pytest.raises(HodError, match="Cannot run the job"):
+        submit_file(str(tmp_path / "missing.sock"), "decode", {}, sample_file(), str(output))
+    assert output.read_bytes() == b"keep me"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_socket_is_private_from_the_moment_it_is_bound(tmp_path):
+    from utils.server import _bind_private
+    previous = os.umask(0o022)
+    try:
+        sock = _bind_private(str(tmp_path / "hod.sock"))
+        assert os.umask(0o022) == 0o022  # The process umask is restored.
+    finally:
+        os.umask(previous)
+    with sock:
+        assert os.stat(tmp_path / "hod.sock").st_mode & 0o777 == 0o600
+
+@pytest.mark.parametrize("command, options, error", [
+    ("bogus", {}, "Unknown command"),
+    ("decode", {"bogus": 1}, "Unsupported decode options"),
+])
+def test_rejected_request_body_is_drained(tmp_path, command, options, error):
+    import asyncio
+    import io
+    import threading
+    from utils.client import submit
+    from utils.server import HodServer
+
+    socket_path = str(tmp_path / "hod.sock")
+    loop = asyncio.new_event_loop()
+    started, stopped = threading.Event(), loop.create_future()
+
+    async def serve():
+        async with await asyncio.start_unix_server(HodServer(socket_path)._respond, path=socket_path):
+            started.set()
+            await stopped
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(serve(),))
+    thread.start()
+    try:
+        assert started.wait(30)
+        # Far more than the socket buffers hold, so an undrained body would leave the client with a broken pipe.
+        with pytest.raises(HodError, match=error):
+            submit(socket_path, command, options, io.BytesIO(bytes(16 << 20)))
+    finally:
+        loop.call_soon_threadsafe(stopped.set_result, None)
+        thread.join(30)
+        loop.close()
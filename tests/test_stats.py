@@ -0,0 +1,42 @@
+# tests/test_stats.py
+import time
+
+import utils.stats
+from utils.stats import TIMED_BATCH, Stats
+
+def _slow(items, seconds):
+    for item in items:
+        time.sleep(seconds)
+        yield item
+
+def test_timed_counts_every_item_and_keeps_stages_exclusive():
+    stats = Stats('test')
+    inner = stats.timed(_slow(range(30), 0.002), 'inner', 'inner_items', batch=7)
+    outer = stats.timed((item * 2 for item in inner), 'outer', 'outer_items')
+    assert list(outer) == [item * 2 for item in range(30)]
+    assert stats.counters == {'inner_items': 30, 'outer_items': 30}
+    assert stats.stages['inner'] >= 0.06
+    # The upstream sleeps are not counted again in the stage that pulled them.
+    assert stats.stages['outer'] < stats.stages['inner'] / 2
+
+def test_timed_reads_the_clock_once_per_batch(monkeypatch):
+    readings = []
+    clock = time.perf_counter
+    monkeypatch.setattr(utils.stats.time, 'perf_counter', lambda: readings.append(None) or clock())
+    stats = Stats('test')
+    assert sum(stats.timed(range(10 * TIMED_BATCH), 'stage')) == sum(range(10 * TIMED_BATCH))
+    # Two readings per batch, plus the final empty batch.
+    assert len(readings) == 2 * 11
+
+def test_disabled_stats_passes_the_iterable_through():
+    items = [1, 2, 3]
+    assert Stats('test', enabled=False).timed(items, 'stage') is items
+
+def test_bad_sink_specs_are_skipped_with_a_warning(monkeypatch, caplog):
+    specs = ["no-colon", "missing_module_for_hod_tests:factory", "utils.stats:missing_factory", "utils.stats:LogSink"]
+    monkeypatch.setenv(utils.stats.SINKS_ENV, ", ".join(specs))
+    stats = Stats.for_command("encode")
+    assert [type(sink) for sink in stats.sinks] == [utils.stats.LogSink]
+    warnings = [record.getMessage() for record in caplog.records if record.levelname == "WARNING"]
+    assert len(warnings) == 3
+    assert all(spec in warning for spec, warning in zip(specs, warnings))
@@ -0,0 +1,78 @@
+# tests/test_tree.py
+import json
+import os
+
+from conftest import sample_bytes
+from utils.constants import MANIFEST_NAME
+from utils.tree import decode_tree, encode_tree, plan_tasks, verify_keymaps, walk_files
+
+FILES = {
+    "top.bin": sample_bytes(3000, seed=1),
+    "empty.bin": b"",
+    os.path.join("a", "b", "deep.bin"): sample_bytes(1500, seed=2),
+    os.path.join("a", "text.txt"): b"hello, tree\n" * 20,
+}
+
+def _write_tree(root, files=FILES):
+    for relative, data in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+def _read_manifest(path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_nested_tree_round_trips_with_compression(tmp_path):
+    source, keymaps, output = tmp_path / "src", tmp_path / "keymaps", tmp_path / "out"
+    _write_tree(source)
+    manifest = encode_tree(str(source), str(keymaps), hash_algos=["sha256"], jobs=2, compression="gzip")
+    assert manifest["summary"] == {**manifest["summary"], "files": 4, "succeeded": 4, "failed": 0}
+    assert {result["keymap"] for result in manifest["files"]} == {relative + ".hod.gz" for relative in FILES}
+    assert _read_manifest(keymaps / MANIFEST_NAME)["files"] == manifest["files"]
+
+    manifest = decode_tree(str(keymaps), str(output), jobs=2)
+    assert manifest["summary"]["failed"] == 0
+    assert all(result["verified"] is True for result in manifest["files"])
+    for relative, data in FILES.items():
+        assert (output / relative).read_bytes() == data
+
+def test_failed_file_is_recorded_without_stopping_the_batch(tmp_path):
+    source, output = tmp_path / "keymaps", tmp_path / "out"
+    _write_tree(tmp_path / "src")
+    encode_tree(str(tmp_path / "src"), str(source), jobs=1)
+    (source / "broken.bin.hod").write_text("{ not a keymap")
+    manifest = decode_tree(str(source), str(output), jobs=1, manifest_path=str(tmp_path / "report.json"))
+    summary = manifest["summary"]
+    assert (summary["files"], summary["succeeded"], summary["failed"]) == (5, 4, 1)
+    failed = [result for result in manifest["files"] if result["status"] == "failed"]
+    assert [result["path"] for result in failed] == ["broken.bin.hod"] and failed[0]["error"]
+    assert _read_manifest(tmp_path / "report.json")["summary"]["failed"] == 1
+    for relative, data in FILES.items():
+        assert (output / relative).read_bytes() == data
+
+def test_verify_keymaps_reports_each_keymap(tmp_path):
+    source, keymaps = tmp_path / "src", tmp_path / "keymaps"
+    _write_tree(source)
+    encode_tree(str(source), str(keymaps), hash_algos=["sha256"], jobs=1)
+    (keymaps / "broken.bin.hod").write_text("{ not a keymap")
+    paths = sorted(str(path) for path in keymaps.rglob("*.hod"))
+    report = verify_keymaps(paths, jobs=2)
+    assert (report["summary"]["files"], report["summary"]["failed"]) == (5, 1)
+    assert all(result["verified"] is True for result in report["files"] if result["status"] == "ok")
+    assert not (tmp_path / "out").exists()
+
+def test_destination_inside_source_is_excluded(tmp_path):
+    source = tmp_path / "src"
+    _write_tree(source)
+    destination = source / "keymaps"
+    encode_tree(str(source), str(destination), jobs=1)
+    assert sorted(relative for relative, _ in walk_files(str(source), exclude=str(destination))) == sorted(FILES)
+    # A second run must not encode the keymaps (or the manifest) of the first.
+    manifest = encode_tree(str(source), str(destination), jobs=1)
+    assert sorted(result["path"] for result in manifest["files"]) == sorted(FILES)
+
+def test_plan_tasks_packs_small_files_largest_first():
+    files = [("big", 100), ("small1", 5), ("huge", 300), ("small2", 7), ("small3", 1)]
+    assert plan_tasks(files, pack_threshold=50, pack_bytes=10) == [["huge"], ["big"], ["small2"], ["small1", "small3"]]
+    assert plan_tasks([], pack_threshold=50) == []
@@ -0,0 +1,102 @@
+# tests/test_trust_pairing.py
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.pipeline import HodError, decode_file, encode_file
+
+@pytest.fixture
+def signed(sample_file, tmp_path):
+    def make(extension: str = ".hod") -> str:
+        keymap = str(tmp_path / f"signed{extension}")
+        encode_file(sample_file(), keymap, hash_algos=("sha256",), passphrase="right")
+        return keymap
+    return make
+
+@pytest.fixture
+def precious(tmp_path):
+    path = tmp_path / "precious.txt"
+    path.write_bytes(b"do not overwrite")
+    return path
+
+def _leftovers(directory) -> list:
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb", ".conf"])
+@pytest.mark.parametrize("passphrase", [None, "wrong"])
+def test_failed_hmac_keeps_existing_output(signed, precious, extension, passphrase):
+    with pytest.raises(HodError):
+        decode_file(signed(extension), str(precious), passphrase=passphrase)
+    assert precious.read_bytes() == b"do not overwrite"
+    assert not _leftovers(precious.parent)
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+def test_missing_passphrase_fails_before_reconstructing(signed, precious, monkeypatch, extension):
+    # Streamed keymaps carry their signature in a trailer; the header's scheme must already refuse them.
+    keymap = signed(extension)
+    for name in ("pack_sequences", "write_bit_runs"):
+        monkeypatch.setattr(f"utils.core.{name}", lambda *args: pytest.fail("reconstruction started"))
+    with pytest.raises(HodError, match="trust-paired"):
+        decode_file(keymap, str(precious))
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb", ".conf"])
+@pytest.mark.parametrize("passphrase", [None, "wrong"])
+def test_show_payload_checks_the_hmac_first(signed, precious, capsys, extension, passphrase):
+    with pytest.raises(HodError):
+        decode_file(signed(extension), str(precious), passphrase=passphrase, show_payload=True)
+    assert "Symbolic Payload" not in capsys.readouterr().out
+
+def test_show_payload_with_the_right_passphrase(signed, precious, capsys):
+    assert decode_file(signed(), str(precious), passphrase="right", show_payload=True) is None
+    assert "Symbolic Payload" in capsys.readouterr().out
+    assert precious.read_bytes() == b"do not overwrite"
+
+def test_hash_mismatch_keeps_existing_output(sample_file, tmp_path, precious):
+    keymap = str(tmp_path / "k.hod")
+    encode_file(sample_file(), keymap, hash_algos=("sha256",))
+    with open(keymap, encoding="utf-8") as f:
+        data = json.load(f)
+    data["integrity"]["file_hash"] = data["integrity"]["file_hashes"]["sha256"] = "0" * 64
+    with open(keymap, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    with pytest.raises(HodError, match="hash"):
+        decode_file(keymap, str(precious))
+    assert precious.read_bytes() == b"do not overwrite"
+    assert not _leftovers(tmp_path)
+
+def test_right_passphrase_replaces_output(signed, sample_file, precious):
+    metadata = decode_file(signed(), str(precious), passphrase="right")
+    assert metadata["verified"] is True
+    with open(sample_file(), "rb") as f:
+        assert precious.read_bytes() == f.read()
+    assert not _leftovers(precious.parent)
+
+def _run_cli(*args, stdin=None):
+    hod = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hod.py")
+    return subprocess.run([sys.executable, hod, *args], input=stdin, capture_output=True)
+
+@pytest.mark.parametrize("passphrase", [(), ("--passphrase", "wrong")])
+def test_failed_hmac_emits_nothing_to_stdout(signed, passphrase):
+    result = _run_cli("decode", signed(".hodb"), "-", *passphrase)
+    assert result.returncode == 1
+    assert result.stdout == b""
+
+def test_tampered_payload_emits_nothing_to_stdout(signed):
+    keymap = signed()
+    with open(keymap, encoding="utf-8") as f:
+        data = json.load(f)
+    data["payload"][0][1] += 1
+    with open(keymap, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    result = _run_cli("decode", "-", "-", "--passphrase", "right", stdin=open(keymap, "rb").read())
+    assert result.returncode == 1
+    assert result.stdout == b""
+
+def test_right_passphrase_releases_stdout(signed, sample_file):
+    result = _run_cli("decode", signed(), "-", "--passphrase", "right")
+    assert result.returncode == 0
+    with open(sample_file(), "rb") as f:
+        assert result.stdout == f.read()
@@ -0,0 +1,109 @@
+# tests/test_update.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import sample_bytes
+from utils.pipeline import decode_file, decode_range, encode_file
+from utils.stats import Stats
+
+INTERVAL = 512
+
+def _update(tmp_path, old: bytes, new: bytes, extension: str = ".hod", in_place: bool = False, **options):
+    """Encodes old with a run index, then new as an update of it. Returns the new keymap and the reused chunk count."""
+    source = tmp_path / "input.bin"
+    source.write_bytes(old)
+    previous = str(tmp_path / f"previous{extension}")
+    encode_file(str(source), previous, hash_algos=("sha256",), index_interval=INTERVAL, **options)
+    source.write_bytes(new)
+    keymap = previous if in_place else str(tmp_path / f"updated{extension}")
+    stats = Stats('encode')
+    encode_file(str(source), keymap, hash_algos=("sha256",), previous=previous, stats=stats, **options)
+    return keymap, stats.counters.get('reused_chunks', 0)
+
+def _decodes_to(tmp_path, keymap: str, expected: bytes, **options):
+    output = tmp_path / "output.bin"
+    assert decode_file(keymap, str(output), **options)["verified"] is True
+    assert output.read_bytes() == expected
+    # The run index was carried over, so ranges across the reused and re-encoded chunks still decode.
+    decode_range(keymap, str(output), INTERVAL - 3, len(expected) - 5, **options)
+    assert output.read_bytes() == expected[INTERVAL - 3:len(expected) - 5]
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+@pytest.mark.parametrize("change", ["tail", "append", "truncate"])
+def test_update_reuses_unchanged_chunks(tmp_path, extension, change):
+    old = sample_bytes(5000)
+    if change == "tail":
+        new = old[:4000] + bytes(255 - byte for byte in old[4000:])
+    elif change == "append":
+        new = old + sample_bytes(700, seed=9)
+    else:
+        new = old[:3700]
+    keymap, reused = _update(tmp_path, old, new, extension)
+    assert 0 < reused <= len(new) // INTERVAL
+    _decodes_to(tmp_path, keymap, new)
+
+@pytest.mark.parametrize("extension", [".hod", ".hodb"])
+def test_update_in_place(tmp_path, extension):
+    old = sample_bytes(5000)
+    new = old[:3000] + b"changed" + old[3007:]
+    keymap, reused = _update(tmp_path, old, new, extension, in_place=True)
+    assert reused == 3000 // INTERVAL
+    _decodes_to(tmp_path, keymap, new)
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".tmp"]
+
+@pytest.mark.parametrize("chunk, reused_chunks", [
+    # The new chunk continues the run of 0xff bytes before the boundary, so that run is re-encoded too.
+    (b"\xff" * INTERVAL, 3),
+    # The new chunk starts with the bit its old run had, so the old runs up to the boundary still hold.
+    (bytes(INTERVAL - 1) + b"\x01", 4),
+])
+def test_update_at_a_run_boundary(tmp_path, chunk, reused_chunks):
+    # Every chunk boundary starts a new run.
+    old = (bytes(INTERVAL) + b"\xff" * INTERVAL) * 3
+    new = old[:4 * INTERVAL] + chunk + old[5 * INTERVAL:]
+    keymap, reused = _update(tmp_path, old, new)
+    assert reused == reused_chunks
+    _decodes_to(tmp_path, keymap, new)
+
+def test_first_chunk_changed_encodes_afresh(tmp_path):
+    old = sample_bytes(3000)
+    keymap, reused = _update(tmp_path, old, b"x" + old[1:])
+    assert reused == 0
+    _decodes_to(tmp_path, keymap, b"x" + old[1:])
+
+@pytest.mark.parametrize("options", [{"passphrase": "right"}, {"compression": "gzip"}])
+def test_signed_or_compressed_update_encodes_afresh(tmp_path, options):
+    old = sample_bytes(5000)
+    new = old[:4000] + bytes(1000)
+    keymap, reused = _update(tmp_path, old, new, ".hod.gz" if "compression" in options else ".hod", **options)
+    assert reused == 0
+    _decodes_to(tmp_path, keymap, new, passphrase=options.get("passphrase"))
+
+def test_update_with_another_strategy_encodes_afresh(tmp_path):
+    source = tmp_path / "input.bin"
+    source.write_bytes(sample_bytes(5000))
+    previous = str(tmp_path / "previous.hod")
+    encode_file(str(source), previous, "rle", index_interval=INTERVAL)
+    stats = Stats('encode')
+    keymap = str(tmp_path / "updated.hod")
+    metadata = encode_file(str(source), keymap, "power", ("sha256",), previous=previous, stats=stats)
+    assert stats.counters.get('reused_chunks', 0) == 0
+    # The index interval still comes from the previous keymap.
+    assert metadata["run_index"]["interval"] == INTERVAL
+    _decodes_to(tmp_path, keymap, sample_bytes(5000))
+
+def test_cli_update_and_range(tmp_path):
+    hod = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hod.py")
+    run = lambda *args: subprocess.run([sys.executable, hod, *args], capture_output=True, check=True).stdout
+    source = tmp_path / "input.bin"
+    source.write_bytes(sample_bytes(5000))
+    keymap = str(tmp_path / "k.hodb")
+    run("encode", str(source), keymap, "--index-interval", "512B", "--hash", "sha256")
+    new = sample_bytes(5000)[:4500] + b"tail"
+    source.write_bytes(new)
+    run("encode", str(source), keymap, "--update", keymap, "--hash", "sha256")
+    assert run("decode", keymap, "-", "--range", "1KB:4502") == new[1024:4502]
+    assert run("decode", keymap, "-") == new
@@ -0,0 +1,202 @@
+# utils/bench.py
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .constants import CORPORA
+from .stats import Stats, peak_rss_mb
+from .units import format_size
+
+STAGES = ('run_generation', 'strategy_encode', 'serialize', 'deserialize',
+          'strategy_decode', 'reconstruction', 'hashing')
+_CORPUS_BLOCK = 1 << 20
+_WORDS = ("the of and to in is that for it as with was on be by this are from or "
+          "keymap bit run file strategy format payload encode decode stream").split()
+
+def _corpus_blocks(kind: str, size: int, seed: int) -> Iterator[bytes]:
+    rng = random.Random(f"{kind}:{seed}")
+    remaining = size
+    while remaining > 0:
+        n = min(remaining, _CORPUS_BLOCK)
+        if kind == 'zero':
+            block = bytes(n)
+        elif kind == 'random':
+            block = rng.randbytes(n)
+        elif kind == 'text':
+            words = []
+            length = 0
+            while length < n:
+                word = rng.choice(_WORDS) + ('\n' if rng.random() < 0.08 else ' ')
+                words.append(word)
+                length += len(word)
+            block = ''.join(words).encode('ascii')[:n]
+        elif kind == 'sparse':
+            # Mostly zero bytes with roughly one set byte per 256.
+            data = bytearray(n)
+            for position in rng.sample(range(n), max(1, n // 256)):
+                data[position] = 1 << rng.randrange(8)
+            block = bytes(data)
+        else:
+            raise ValueError(f"Unknown corpus '{kind}'. Choose from: {', '.join(CORPORA)}.")
+        remaining -= n
+        yield block
+
+def generate_corpus(kind: str, size: int, path: str, seed: int = 0):
+    """Writes a deterministic synthetic corpus of the given kind and size to path."""
+    with open(path, 'wb') as f:
+        for block in _corpus_blocks(kind, size, seed):
+            f.write(block)
+
+def _mb_per_s(size: int, seconds: float) -> Optional[float]:
+    return round(size / (1 << 20) / seconds, 3) if seconds > 0 else None
+
+def run_case(corpus_path: str, strategy_name: str, format_name: str, workdir: str) -> Dict[str, Any]:
+    """
+    Encodes and decodes one corpus file with one strategy and format through
+    encode_file and decode_file, as `hod encode --hash sha256` and `hod
+    decode` do, timing every pipeline stage with a Stats collector.
+    """
+    from formats import FORMATS
+    from .pipeline import HodError, decode_file, encode_file
+    keymap_path = os.path.join(workdir, f"keymap{FORMATS[format_name].extension}")
+    output_path = os.path.join(workdir, "reconstructed.bin")
+    input_size = os.path.getsize(corpus_path)
+    encode_stats, decode_stats = Stats('encode'), Stats('decode')
+
+    start = time.perf_counter()
+    encode_file(corpus_path, keymap_path, strategy_name, ('sha256',), format_name=format_name, stats=encode_stats)
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        reconstructed_ok = decode_file(keymap_path, output_path, stats=decode_stats)['verified'] is True
+    except HodError:
+        reconstructed_ok = False
+    decode_seconds = time.perf_counter() - start
+    stages = {name: encode_stats.stages.get(name, 0.0) + decode_stats.stages.get(name, 0.0) for name in STAGES}
+    run_count = encode_stats.counters.get('runs', 0)
+    keymap_size = os.path.getsize(keymap_path)
+    os.remove(keymap_path)
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    return {
+        "strategy": strategy_name,
+        "format": format_name,
+        "input_bytes": input_size,
+        "keymap_bytes": keymap_size,
+        "keymap_ratio": round(keymap_size / input_size, 4) if input_size else None,
+        "runs": run_count,
+        "encode_seconds": round(encode_seconds, 6),
+        "decode_seconds": round(decode_seconds, 6),
+        "encode_mb_per_s": _mb_per_s(input_size, encode_seconds),
+        "decode_mb_per_s": _mb_per_s(input_size, decode_seconds),
+        "runs_per_s": round(run_count / encode_seconds, 1) if encode_seconds > 0 else None,
+        "stages": {name: round(max(seconds, 0.0), 6) for name, seconds in stages.items()},
+        "stage_mb_per_s": {name: _mb_per_s(input_size, seconds) for name, seconds in stages.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "reconstructed_ok": reconstructed_ok,
+    }
+
+def run_benchmarks(corpora: Iterable[str], sizes: Iterable[int], strategies: Iterable[str],
+                   formats: Iterable[str], seed: int = 0, workdir: Optional[str] = None,
+                   progress=None) -> Dict[str, Any]:
+    """
+    Runs every corpus x size x strategy x format case and returns the JSON
+    report. Each case runs in a fresh worker process so peak RSS is per case.
+    """
+    # Imported here: hod.py imports this module at startup, and these are only needed to run cases.
+    import multiprocessing
+    import tempfile
+    from .core import np
+    strategies, formats = list(strategies), list(formats)
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir, prefix="hod-bench-") as tmp:
+        for corpus in corpora:
+            for size in sizes:
+                corpus_path = os.path.join(tmp, f"{corpus}-{size}.bin")
+                generate_corpus(corpus, size, corpus_path, seed)
+                for strategy_name in strategies:
+                    for format_name in formats:
+                        if progress:
+                            progress(f"{corpus}/{format_size(size)}/{strategy_name}/{format_name}")
+                        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                            result = pool.apply(run_case, (corpus_path, strategy_name, format_name, tmp))
+                        results.append({"corpus": corpus, "size": format_size(size), **result})
+                os.remove(corpus_path)
+
+    return {
+        "hod_version": "2.0",
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np is not None,
+        "seed": seed,
+        "results": results,
+    }
+
+# CLI invocations timed by measure_startup; none of them touch a keymap.
+STARTUP_COMMANDS = (('list-strategies',), ('encode', '--help'))
+
+def measure_startup(runs: int = 10, commands: Iterable[Tuple[str, ...]] = STARTUP_COMMANDS) -> Dict[str, Any]:
+    """Times complete `hod` invocations in fresh interpreters, reporting the median and minimum wall time."""
+    import subprocess
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hod.py')
+    results = {}
+    for command in commands:
+        times = []
+        for _ in range(max(runs, 1)):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, script, *command], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        results[' '.join(command)] = {"runs": len(times), "median_seconds": round(times[len(times) // 2], 6),
+                                      "min_seconds": round(times[0], 6)}
+    return results
+
+def _case_key(result: Dict[str, Any]) -> tuple:
+    return (result['corpus'], result['size'], result['strategy'], result['format'])
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.10,
+                        min_seconds: float = 0.005) -> List[Dict[str, Any]]:
+    """
+    Compares the total and per-stage times of matching cases against a saved
+    report. Returns one entry per time that grew by more than `threshold`
+    (a fraction), and records the result under report['comparison']. Times
+    below `min_seconds` in the baseline are too noisy to compare.
+    """
+    previous = {_case_key(result): result for result in baseline.get('results', [])}
+    comparisons, regressions = [], []
+    for result in report['results']:
+        old = previous.get(_case_key(result))
+        if old is None:
+            continue
+        metrics = {'encode_seconds': (old.get('encode_seconds'), result['encode_seconds']),
+                   'decode_seconds': (old.get('decode_seconds'), result['decode_seconds'])}
+        for stage, seconds in result['stages'].items():
+            metrics[f"stages.{stage}"] = (old.get('stages', {}).get(stage), seconds)
+        for metric, (before, after) in metrics.items():
+            if not before or before < min_seconds:
+                continue
+            change = (after - before) / before
+            entry = {"case": "/".join(_case_key(result)), "metric": metric,
+                     "baseline": before, "current": after, "change": round(change, 4)}
+            comparisons.append(entry)
+            if change > threshold:
+                regressions.append(entry)
+    for command, timing in report.get('startup', {}).items():
+        before = baseline.get('startup', {}).get(command, {}).get('median_seconds')
+        if not before or before < min_seconds:
+            continue
+        after = timing['median_seconds']
+        change = (after - before) / before
+        entry = {"case": f"startup/{command}", "metric": "median_seconds",
+                 "baseline": before, "current": after, "change": round(change, 4)}
+        comparisons.append(entry)
+        if change > threshold:
+            regressions.append(entry)
+    report['comparison'] = {"threshold": threshold, "compared": len(comparisons), "regressions": regressions}
+    return regressions
@@ -0,0 +1,170 @@
+# utils/cache.py
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: entries are still replaced atomically, but counters may race.
+    fcntl = None
+
+DEFAULT_CACHE_BYTES = 1 << 30
+_LOCK_NAME = ".lock"
+_COUNTERS_NAME = "counters.json"
+
+class KeymapCache:
+    """
+    An on-disk, content-addressed cache of keymaps keyed by (content size,
+    content hash, strategy, format). Entries are sharded by content size, so
+    may_contain can rule out a hit before the content is hashed. Entries are
+    complete keymaps; callers reuse only their payload and regenerate the
+    metadata and any signature. The cache is bounded by max_bytes with
+    least-recently-used eviction (an entry's mtime is its last use). A lock
+    file serializes lookups, stores and counter updates across
+    processes, and entries are written to a temporary file and renamed into
+    place, so a reader never sees a partial entry.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _variant(strategy: str, format_name: str, extension: str, index_interval: Optional[int]) -> str:
+        interval = f".i{index_interval}" if index_interval else ""
+        return f"{strategy}.{format_name}{interval}{extension}"
+
+    @classmethod
+    def key(cls, content_hash: str, size: int, strategy: str, format_name: str, extension: str = "",
+            index_interval: Optional[int] = None) -> str:
+        return f"{size}-{content_hash}.{cls._variant(strategy, format_name, extension, index_interval)}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"s{key.partition('-')[0]}", key)
+
+    def may_contain(self, size: int, strategy: str, format_name: str, extension: str = "",
+                    index_interval: Optional[int] = None) -> bool:
+        """
+        Returns whether an entry for content of this size may exist with this
+        strategy, format and index interval, from the entry names alone. When
+        it returns False, the content need not be hashed before encoding it.
+        """
+        suffix = "." + self._variant(strategy, format_name, extension, index_interval)
+        try:
+            with os.scandir(os.path.join(self.directory, f"s{size}")) as entries:
+                return any(entry.name.endswith(suffix) for entry in entries)
+        except OSError:
+            return False
+
+    def count_miss(self):
+        """Counts a miss that may_contain settled without a lookup."""
+        with self._locked():
+            self._count('misses')
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, _LOCK_NAME), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def lookup(self, key: str, opener: Callable[[str], IO]) -> Optional[IO]:
+        """
+        Returns the entry opened with opener (e.g. a format's open_file) and
+        marks it as recently used, or None on a miss. The entry is opened while
+        the lock is held, so a concurrent eviction cannot remove it first.
+        """
+        path = self._path(key)
+        with self._locked():
+            if not os.path.exists(path):
+                self._count('misses')
+                return None
+            os.utime(path)
+            self._count('hits')
+            return opener(path)
+
+    def store(self, key: str, source_path: str):
+        """Copies a freshly written keymap into the cache, then evicts down to max_bytes."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f_out, open(source_path, 'rb') as f_in:
+                shutil.copyfileobj(f_in, f_out)
+            with self._locked():
+                os.replace(temporary, path)
+                self._count('stores')
+                self._evict()
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.startswith(".tmp-"):
+                        yield entry
+
+    def _evict(self):
+        entries = [(entry.stat().st_mtime_ns, entry.stat().st_size, entry.path) for entry in self._entries()]
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+
+    def _read_counters(self) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self.directory, _COUNTERS_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _count(self, counter: str, amount: int = 1):
+        # Called with the lock held.
+        counters = self._read_counters()
+        counters[counter] = counters.get(counter, 0) + amount
+        path = os.path.join(self.directory, _COUNTERS_NAME)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(counters, f)
+        os.replace(path + ".tmp", path)
+
+    def info(self) -> Dict[str, Any]:
+        """Returns the hit/miss/store/eviction counters and the current size of the cache."""
+        with self._locked():
+            counters = self._read_counters()
+            sizes = [entry.stat().st_size for entry in self._entries()]
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            "directory": os.path.abspath(self.directory),
+            "max_bytes": self.max_bytes,
+            "entries": len(sizes),
+            "bytes": sum(sizes),
+            **{name: counters.get(name, 0) for name in ('hits', 'misses', 'stores', 'evictions')},
+            "hit_rate": round(counters.get('hits', 0) / lookups, 4) if lookups else None,
+        }
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        with self._locked():
+            for entry in list(self._entries()):
+                os.remove(entry.path)
+            try:
+                os.remove(os.path.join(self.directory, _COUNTERS_NAME))
+            except OSError:
+                pass
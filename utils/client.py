@@ -0,0 +1,127 @@
+# utils/client.py
+import contextlib
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from .pipeline import HodError, staging_path
+
+# Bytes per frame when streaming input and output over the connection.
+FRAME_BYTES = 1 << 20
+FRAME = struct.Struct('>I')
+
+# Protocol: the client sends a JSON header line ({"command", "input_name",
+# "output_name", "options"}), then the input as frames of a 4-byte big-endian
+# length and that many bytes, ended by an empty frame. The server answers with
+# the output in the same framing, then a JSON result line ({"status": "ok",
+# "result": ...} or {"status": "error", "error": ...}).
+
+def submit(socket_path: str, command: str, options: Optional[Dict[str, Any]] = None,
+           source: Optional[BinaryIO] = None, sink: Optional[BinaryIO] = None, input_name: str = "",
+           output_name: str = "") -> Dict[str, Any]:
+    """
+    Runs a job on a `hod serve` daemon: streams source to it and the output it
+    sends back to sink. input_name and output_name are the client's file
+    names, whose extensions select the formats. Returns the job's result (the
+    keymap metadata for encode, decode and verify). Raises HodError if the job
+    fails or the daemon cannot be reached.
+    """
+    header = {"command": command, "input_name": input_name, "output_name": output_name, "options": options or {}}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            with sock.makefile('wb') as out:
+                out.write(json.dumps(header).encode('utf-8') + b"\n")
+                while source is not None and (chunk := source.read(FRAME_BYTES)):
+                    out.write(FRAME.pack(len(chunk)) + chunk)
+                out.write(FRAME.pack(0))
+            with sock.makefile('rb') as incoming:
+                while (size := FRAME.unpack(_read_exact(incoming, FRAME.size))[0]):
+                    chunk = _read_exact(incoming, size)
+                    if sink is not None:
+                        sink.write(chunk)
+                response = json.loads(incoming.readline())
+    except (OSError, ValueError) as e:
+        raise HodError(f"Cannot run the job on the HoD server at '{socket_path}': {e}") from e
+    if response.get("status") != "ok":
+        raise HodError(response.get("error") or "The HoD server reported an unknown error.")
+    return response["result"]
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("connection closed mid-response")
+    return data
+
+def submit_file(socket_path: str, command: str, options: Dict[str, Any], input_path: str,
+                output_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs a job on the daemon with input_path as its input, writing its output
+    (if any) to output_path. The output is staged beside output_path and only
+    replaces it once the job succeeds, so a failed job leaves it untouched.
+    """
+    staging = staging_path(output_path) if output_path else None
+    output = open(staging, 'wb') if staging else contextlib.nullcontext()
+    try:
+        with open(input_path, 'rb') as source, output as sink:
+            result = submit(socket_path, command, options, source, sink, os.path.basename(input_path),
+                            os.path.basename(output_path or ""))
+        if staging:
+            os.replace(staging, output_path)
+        return result
+    finally:
+        if staging and os.path.exists(staging):
+            os.remove(staging)
+
+def fetch_metrics(socket_path: str) -> Dict[str, Any]:
+    """
+    Returns the queue depth, job counts and latency percentiles of a `hod
+    serve` daemon. Raises HodError if the daemon cannot be reached.
+    """
+    return submit(socket_path, "metrics")
+
+def verify_remote(socket_path: str, keymaps: List[str], original: Optional[str] = None,
+                  passphrase: Optional[str] = None, jobs: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Verifies keymaps on the daemon, submitting up to `jobs` at a time, and
+    returns the same report as tree.verify_keymaps.
+    """
+    if original and len(keymaps) != 1:
+        raise HodError("An original file can only be compared with a single keymap.")
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    # The daemon opens the original itself, from its own working directory.
+    options = {"original": os.path.abspath(original) if original else None, "passphrase": passphrase}
+
+    def verify_one(path: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            metadata = submit_file(socket_path, "verify", options, path)
+        except HodError as e:
+            logging.error(f"❌ {path}: {e}")
+            result = {"path": path, "status": "failed", "error": str(e)}
+        else:
+            logging.info(f"✅ {path}")
+            result = {"path": path, "status": "ok", **{key: metadata.get(key) for key in
+                      ("input_size_bytes", "verified", "hmac_verified", "matches_original")}}
+        result["seconds"] = round(time.perf_counter() - started, 6)
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = sorted(pool.map(verify_one, dict.fromkeys(keymaps)), key=lambda result: result['path'])
+    failed = sum(result['status'] != 'ok' for result in results)
+    return {
+        "summary": {
+            "files": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 6),
+            "jobs": jobs,
+        },
+        "files": results,
+    }
@@ -0,0 +1,90 @@
+# utils/compression.py
+import bz2
+import gzip
+import lzma
+import os
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from formats.base_format import BaseFormat
+from .constants import CODEC_EXTENSIONS
+
+class Codec(NamedTuple):
+    extension: str
+    magic: bytes
+    open: Callable[..., IO]
+    # Extra arguments when opening for writing.
+    write_options: Dict[str, Any]
+
+# Stdlib codecs keymaps can be compressed with, keyed by name.
+CODECS = {
+    "gzip": Codec(CODEC_EXTENSIONS["gzip"], b"\x1f\x8b", gzip.open, {"compresslevel": 6}),
+    "bz2": Codec(CODEC_EXTENSIONS["bz2"], b"BZh", bz2.open, {}),
+    "xz": Codec(CODEC_EXTENSIONS["xz"], b"\xfd7zXZ\x00", lzma.open, {}),
+}
+
+class CompressedFormat(BaseFormat):
+    """
+    Wraps a keymap format so that its keymaps are compressed with a stdlib
+    codec. The wrapped format reads and writes through the codec's file object,
+    so keymaps stream through the compressor just as they would to disk.
+    Compressed streams cannot seek cheaply, so run index lookups and payload
+    copies use the generic implementations, which read the keymap from the start.
+    """
+    random_access = False
+
+    def __init__(self, inner: BaseFormat, codec: str):
+        self.inner = inner
+        self.codec = codec
+        self.binary = inner.binary
+        self.stores_runs = inner.stores_runs
+
+    @property
+    def name(self) -> str: return f"{self.inner.name}+{self.codec}"
+
+    @property
+    def extension(self) -> str: return self.inner.extension + CODECS[self.codec].extension
+
+    def serialize(self, data: Dict[str, Any], stream: IO):
+        self.inner.serialize(data, stream)
+
+    def deserialize(self, stream: IO) -> Dict[str, Any]:
+        return self.inner.deserialize(stream)
+
+    def serialize_stream(self, metadata: Dict[str, Any], payload: Iterable[Any], stream: IO):
+        self.inner.serialize_stream(metadata, payload, stream)
+
+    def deserialize_stream(self, stream: IO) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        return self.inner.deserialize_stream(stream)
+
+    def deserialize_runs(self, stream: IO) -> Tuple[Dict[str, Any], Iterator[Any]]:
+        return self.inner.deserialize_runs(stream)
+
+    def serialize_runs(self, metadata: Dict[str, Any], runs: Iterable[Tuple[str, int]], stream: IO):
+        self.inner.serialize_runs(metadata, runs, stream)
+
+    def open_file(self, path: Any, mode: str = 'r') -> IO:
+        codec = CODECS[self.codec]
+        options = dict(codec.write_options) if mode == 'w' else {}
+        if self.binary:
+            return codec.open(path, mode + 'b', **options)
+        return codec.open(path, mode + 't', encoding='utf-8', **options)
+
+def detect_compression(path: str) -> Optional[str]:
+    """Returns the name of the codec whose magic bytes start the file, or None for an uncompressed file."""
+    with open(path, 'rb') as f:
+        return compression_for(f.read(max(len(codec.magic) for codec in CODECS.values())))
+
+def compression_for(head: bytes) -> Optional[str]:
+    """Returns the name of the codec whose magic bytes start head, or None for uncompressed data."""
+    for name, codec in CODECS.items():
+        if head.startswith(codec.magic):
+            return name
+    return None
+
+def split_compression_extension(path: str) -> Tuple[str, Optional[str]]:
+    """Splits a codec extension (as in 'keymap.hod.gz') off a path, returning the rest and the codec name."""
+    root, ext = os.path.splitext(path)
+    for name, codec in CODECS.items():
+        if ext == codec.extension:
+            return root, name
+    return path, None
@@ -0,0 +1,16 @@
+# utils/constants.py
+# Names the CLI needs while defining its options, kept apart from the modules
+# that use them so that startup does not import those modules.
+
+# Environment variable naming the default cache directory.
+CACHE_DIR_ENV = "HOD_CACHE_DIR"
+# Environment variable naming the daemon socket that CLI commands send their jobs to.
+SERVER_ENV = "HOD_SERVER"
+# File name of the results manifest that batch commands write into their destination.
+MANIFEST_NAME = "hod-manifest.json"
+# File extensions of the stdlib codecs keymaps can be compressed with, keyed by codec name.
+CODEC_EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+# Hash algorithms that can be stored in a keymap for integrity checks.
+SUPPORTED_HASH_ALGORITHMS = ('sha256', 'sha512', 'md5')
+# Synthetic corpora known to the benchmark suite.
+CORPORA = ('zero', 'random', 'text', 'sparse')
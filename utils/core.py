@@ -1,5 +1,18 @@
 # utils/core.py
-from typing import Iterator, Tuple, BinaryIO
+import io
+from itertools import chain, islice
+from typing import Iterable, Iterator, Tuple, BinaryIO
+
+from .runs import RunSequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python generator is used instead.
+    np = None
+
+# Number of bytes read (and packed) per block. Each block expands to 8 bytes of
+# bits per input byte plus index temporaries, so this bounds peak memory.
+BLOCK_SIZE = 1 << 17
 
 def generate_bit_runs(file_handle: BinaryIO) -> Iterator[Tuple[str, int]]:
     """
@@ -12,7 +25,7 @@ def generate_bit_runs(file_handle: BinaryIO) -> Iterator[Tuple[str, int]]:
     while (byte := file_handle.read(1)):
         for i in range(8):
             bit = '1' if (byte[0] >> (7 - i)) & 1 else '0'
-            
+
             if bit == current_run_bit:
                 current_run_length += 1
             else:
@@ -20,7 +33,233 @@ def generate_bit_runs(file_handle: BinaryIO) -> Iterator[Tuple[str, int]]:
                     yield (current_run_bit, current_run_length)
                 current_run_bit = bit
                 current_run_length = 1
-                
+
     if current_run_bit is not None:
         yield (current_run_bit, current_run_length)
 
+def generate_run_sequences(file_handle: BinaryIO, block_size: int = BLOCK_SIZE) -> Iterator[RunSequence]:
+    """
+    Reads a file in large blocks and yields its bit runs as RunSequence chunks,
+    locating run boundaries with NumPy. The run still open at the end of a
+    block is carried over and merged into the next chunk.
+    """
+    current_run_bit = None
+    current_run_length = 0
+
+    while (block := file_handle.read(block_size)):
+        first, lengths = _block_run_lengths(block)
+        if first == current_run_bit:
+            lengths[0] += current_run_length
+        elif current_run_bit is not None:
+            lengths = np.concatenate((np.array([current_run_length], dtype=np.uint64), lengths))
+            first = current_run_bit
+
+        sequence = RunSequence(first, lengths[:-1].tobytes())
+        current_run_bit = sequence.bit_at(lengths.size - 1)
+        current_run_length = int(lengths[-1])
+        if sequence:
+            yield sequence
+
+    if current_run_bit is not None:
+        yield RunSequence(current_run_bit, [current_run_length])
+
+def _block_run_lengths(block: bytes):
+    """Returns the first bit of a non-empty block and the uint64 lengths of its runs."""
+    bits = np.unpackbits(np.frombuffer(block, dtype=np.uint8))
+    boundaries = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+    lengths = np.diff(boundaries, prepend=0, append=bits.size).astype(np.uint64)
+    return ('1' if bits[0] else '0'), lengths
+
+def bytes_to_runs(data: bytes) -> RunSequence:
+    """Returns the bit runs of an in-memory byte string as a single RunSequence."""
+    if not data:
+        return RunSequence()
+    if np is None:
+        return RunSequence.from_runs(list(generate_bit_runs(io.BytesIO(data))))
+    first, lengths = _block_run_lengths(data)
+    return RunSequence(first, lengths.tobytes())
+
+def generate_bit_runs_numpy(file_handle: BinaryIO, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[str, int]]:
+    """
+    Yields the same ('bit', run_length) tuples as generate_bit_runs, reading the
+    file in large blocks through the vectorized generate_run_sequences engine.
+    """
+    return chain.from_iterable(generate_run_sequences(file_handle, block_size))
+
+def iter_bit_runs(file_handle: BinaryIO, block_size: int = BLOCK_SIZE) -> Iterator[Tuple[str, int]]:
+    """
+    Yields bit runs using the fastest available engine: the vectorized NumPy
+    engine when NumPy is installed, otherwise the pure-Python generator.
+    """
+    if np is not None:
+        return generate_bit_runs_numpy(file_handle, block_size)
+    return generate_bit_runs(file_handle)
+
+def iter_run_sequences(file_handle: BinaryIO, block_size: int = BLOCK_SIZE) -> Iterator[RunSequence]:
+    """
+    Yields the bit runs as RunSequence chunks: from the vectorized engine when
+    NumPy is installed, otherwise batched from the pure-Python generator.
+    """
+    if np is not None:
+        return generate_run_sequences(file_handle, block_size)
+    return batch_runs(generate_bit_runs(file_handle))
+
+# Runs at least this long are emitted as whole fill bytes instead of being expanded bit by bit.
+LONG_RUN_BITS = 1 << 16
+# Number of tuple runs gathered into one RunSequence before packing.
+RUN_BATCH = 1 << 16
+# The pure-Python packer flushes whole bytes once this many bits are pending.
+PENDING_BITS_LIMIT = 256
+
+class BitPacker:
+    """
+    Packs bit runs into bytes. Complete bytes accumulate in an output buffer
+    that is handed out in blocks of roughly block_size bytes, while bits that
+    do not yet form a whole byte carry over to the next run or batch.
+    """
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self.out = bytearray()
+        self.acc = 0  # Pending bits that do not yet form whole bytes.
+        self.nbits = 0
+
+    def _drain(self) -> Iterator[bytes]:
+        if len(self.out) >= self.block_size:
+            yield bytes(self.out)
+            self.out.clear()
+
+    def _flush_pending(self):
+        if self.nbits >= 8:
+            rem = self.nbits & 7
+            self.out.extend((self.acc >> rem).to_bytes(self.nbits >> 3, 'big'))
+            self.acc &= (1 << rem) - 1
+            self.nbits = rem
+
+    def add_run(self, one: bool, count: int) -> Iterator[bytes]:
+        """Packs a single run with plain integer arithmetic."""
+        if count >= LONG_RUN_BITS:
+            yield from self._add_long_run(one, count)
+            return
+        self.acc = (self.acc << count) | ((1 << count) - 1 if one else 0)
+        self.nbits += count
+        if self.nbits >= PENDING_BITS_LIMIT:
+            self._flush_pending()
+            yield from self._drain()
+
+    def _add_long_run(self, one: bool, count: int) -> Iterator[bytes]:
+        # Complete the pending byte, then emit the rest of the run as fill bytes.
+        self._flush_pending()
+        if self.nbits:
+            head = 8 - self.nbits
+            self.out.append((self.acc << head) | ((1 << head) - 1 if one else 0))
+            count -= head
+        fill = b'\xff' if one else b'\x00'
+        nbytes = count >> 3
+        while nbytes:
+            take = min(nbytes, self.block_size)
+            self.out.extend(fill * take)
+            nbytes -= take
+            yield from self._drain()
+        self.nbits = count & 7
+        self.acc = (1 << self.nbits) - 1 if one else 0
+
+    def _add_short_runs(self, first_one: bool, lengths) -> Iterator[bytes]:
+        # Expands a slice of alternating short runs with NumPy, at most block_size bytes at a time.
+        lengths = lengths.astype(np.intp)
+        ends = np.cumsum(lengths)
+        limit = self.block_size << 3
+        start = 0
+        consumed = 0
+        while start < lengths.size:
+            stop = max(int(np.searchsorted(ends, consumed + limit, side='right')), start + 1)
+            values = (np.arange(start, stop) & 1).astype(np.uint8) ^ np.uint8(first_one)
+            bits = np.repeat(values, lengths[start:stop])
+            if self.nbits:
+                carry = np.unpackbits(np.array([self.acc << (8 - self.nbits)], dtype=np.uint8))[:self.nbits]
+                bits = np.concatenate((carry, bits))
+            whole = bits.size & ~7
+            self.out.extend(np.packbits(bits[:whole]).tobytes())
+            self.nbits = bits.size - whole
+            self.acc = int(np.packbits(bits[whole:])[0]) >> (8 - self.nbits) if self.nbits else 0
+            consumed = int(ends[stop - 1])
+            start = stop
+            yield from self._drain()
+
+    def add_sequence(self, sequence: RunSequence) -> Iterator[bytes]:
+        """Packs a RunSequence, vectorized with NumPy when it is available."""
+        if np is None:
+            for bit, count in sequence:
+                yield from self.add_run(bit == '1', count)
+            return
+
+        self._flush_pending()
+        lengths = sequence.to_numpy()
+        start_one = sequence.start_bit == '1'
+        start = 0
+        for index in np.flatnonzero(lengths >= LONG_RUN_BITS).tolist() + [lengths.size]:
+            if index > start:
+                yield from self._add_short_runs(start_one ^ bool(start & 1), lengths[start:index])
+            if index < lengths.size:
+                yield from self._add_long_run(start_one ^ bool(index & 1), int(lengths[index]))
+            start = index + 1
+
+    def finish(self) -> Iterator[bytes]:
+        """Flushes the remaining bytes, padding a trailing partial byte with zero bits."""
+        self._flush_pending()
+        # Write any remaining bits if the file size isn't a multiple of 8
+        if self.nbits:
+            self.out.append(self.acc << (8 - self.nbits))
+            self.acc = 0
+            self.nbits = 0
+        if self.out:
+            yield bytes(self.out)
+            self.out.clear()
+
+def batch_runs(bit_runs: Iterable[Tuple[str, int]], batch_size: int = RUN_BATCH) -> Iterator[RunSequence]:
+    """Groups ('bit', count) tuples into RunSequence batches of at most batch_size runs."""
+    if isinstance(bit_runs, RunSequence):
+        for start in range(0, len(bit_runs), batch_size):
+            yield bit_runs[start:start + batch_size]
+        return
+    runs = iter(bit_runs)
+    while (batch := list(islice(runs, batch_size))):
+        yield RunSequence.from_runs(batch)
+
+def pack_sequences(sequences: Iterable[RunSequence], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Packs RunSequence chunks back into bytes and yields them in blocks of
+    roughly block_size bytes. Long runs are written as fill bytes, and any
+    leftover bits carry over between chunks. A trailing partial byte is padded
+    with zero bits.
+    """
+    packer = BitPacker(block_size)
+    for sequence in sequences:
+        yield from packer.add_sequence(sequence)
+    yield from packer.finish()
+
+def reconstruct_blocks(bit_runs: Iterable[Tuple[str, int]], block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    Packs bit runs (('bit', count) tuples or a RunSequence) back into bytes and
+    yields them in blocks of roughly block_size bytes. With NumPy, runs are
+    packed in RunSequence batches; otherwise they are packed one at a time.
+    """
+    if np is not None or isinstance(bit_runs, RunSequence):
+        yield from pack_sequences(batch_runs(bit_runs), block_size)
+        return
+    packer = BitPacker(block_size)
+    for bit, count in bit_runs:
+        yield from packer.add_run(bit == '1', count)
+    yield from packer.finish()
+
+def write_blocks(blocks: Iterable[bytes], stream: BinaryIO) -> int:
+    """Writes reconstructed byte blocks to a binary stream. Returns the number of bytes written."""
+    written = 0
+    for block in blocks:
+        stream.write(block)
+        written += len(block)
+    return written
+
+def write_bit_runs(bit_runs: Iterable[Tuple[str, int]], stream: BinaryIO, block_size: int = BLOCK_SIZE) -> int:
+    """Reconstructs bytes from bit runs into a binary stream. Returns the number of bytes written."""
+    return write_blocks(reconstruct_blocks(bit_runs, block_size), stream)
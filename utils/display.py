@@ -1,20 +1,44 @@
 # utils/display.py
-from typing import Any, List, Tuple
+from typing import Any, Iterator, List, Tuple
 
-def pretty_print_payload(strategy_name: str, payload: Any):
-    """Prints the symbolic payload in a human-readable format."""
+from .runs import RunSequence
+
+# Number of payload items printed by pretty_print_payload.
+PREVIEW_LIMIT = 15
+
+def preview_payload(payload: Any, limit: int = PREVIEW_LIMIT) -> Tuple[List[Any], int]:
+    """
+    Consumes a lazily produced payload, returning its first `limit` items and
+    its total number of items, so it can be checked before anything is printed.
+    """
+    head = []
+    total = 0
+    for total, item in enumerate(payload, 1):
+        if total <= limit:
+            head.append(item)
+    return head, total
+
+def print_payload_preview(strategy_name: str, head: List[Any], total: int):
+    """Prints the items returned by preview_payload."""
     print("--- HoD Symbolic Payload ---")
     print(f"Strategy: {strategy_name}")
-    
+    for number, item in enumerate(head, 1):
+        print(f"  Run {number:03d}: {item}")
+    if total > len(head):
+        print(f"  ... and {total - len(head)} more runs.")
+    elif total == 0:
+        print("  Payload: []...")
+    print("----------------------------")
+
+def pretty_print_payload(strategy_name: str, payload: Any):
+    """Prints the symbolic payload in a human-readable format."""
     # This is a simplified view; a real implementation might decode
     # the strategy-specific payload to the universal ('bit', count) format first.
-    if isinstance(payload, list) and payload:
-        limit = 15
-        for i, item in enumerate(payload[:limit]):
-            print(f"  Run {i+1:03d}: {item}")
-        if len(payload) > limit:
-            print(f"  ... and {len(payload) - limit} more runs.")
+    if isinstance(payload, (list, Iterator, RunSequence)):
+        # Lazily produced payloads are consumed once, counting the runs past the limit.
+        print_payload_preview(strategy_name, *preview_payload(payload))
     else:
+        print("--- HoD Symbolic Payload ---")
+        print(f"Strategy: {strategy_name}")
         print(f"  Payload: {str(payload)[:200]}...")
-    print("----------------------------")
-
+        print("----------------------------")
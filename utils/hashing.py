@@ -2,7 +2,7 @@
 import hashlib
 import hmac
 import json
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List
 
 def calculate_file_hash(filepath: str, algorithm: str = 'sha256') -> str:
     """Calculates the hash of a file's content."""
@@ -12,6 +12,143 @@ def calculate_file_hash(filepath: str, algorithm: str = 'sha256') -> str:
             h.update(chunk)
     return h.hexdigest()
 
+class MultiHasher:
+    """Feeds the same bytes into one or more hash algorithms at once."""
+
+    def __init__(self, algorithms: Iterable[str]):
+        self._hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+
+    def update(self, data: bytes):
+        for h in self._hashes.values():
+            h.update(data)
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {algorithm: h.hexdigest() for algorithm, h in self._hashes.items()}
+
+class ByteCounter:
+    """Counts the bytes fed to it; stands in for a hasher to size a stream as it is read."""
+
+    def __init__(self):
+        self.count = 0
+
+    def update(self, data: bytes):
+        self.count += len(data)
+
+class ChunkHasher:
+    """
+    Hashes a byte stream in fixed-size chunks, appending the hex digest of each
+    complete chunk to `digests` as it fills; finish() adds the final partial chunk.
+    """
+
+    def __init__(self, chunk_size: int, algorithm: str = 'sha256', digests: List[str] = None):
+        self.chunk_size = chunk_size
+        self.algorithm = algorithm
+        self.digests = [] if digests is None else digests
+        self._hash = hashlib.new(algorithm)
+        self._filled = 0
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.chunk_size - self._filled)
+            self._hash.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.chunk_size:
+                self.finish()
+
+    def finish(self):
+        if self._filled:
+            self.digests.append(self._hash.hexdigest())
+            self._hash = hashlib.new(self.algorithm)
+            self._filled = 0
+
+class HashingReader:
+    """Wraps a binary stream, hashing every byte that is read through it."""
+
+    def __init__(self, stream: BinaryIO, hasher: MultiHasher):
+        self.stream = stream
+        self.hasher = hasher
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.hasher.update(data)
+        return data
+
+class HashingWriter:
+    """Wraps a binary stream, hashing every byte that is written through it."""
+
+    def __init__(self, stream: BinaryIO, hasher: MultiHasher):
+        self.stream = stream
+        self.hasher = hasher
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        return self.stream.write(data)
+
+class NullWriter:
+    """A binary sink that discards everything written to it, for verifying without output."""
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ComparingWriter:
+    """
+    A binary sink that compares everything written to it with a file, block by
+    block. mismatch is the offset of the first differing byte (including a
+    length difference, found on close), or None while the bytes match.
+    """
+
+    def __init__(self, path: str):
+        self.original = open(path, 'rb')
+        self.position = 0
+        self.mismatch = None
+
+    def write(self, data: bytes) -> int:
+        if self.mismatch is None:
+            expected = self.original.read(len(data))
+            if expected != data:
+                self.mismatch = self.position + next(
+                    (i for i, (a, b) in enumerate(zip(expected, data)) if a != b), min(len(expected), len(data)))
+        self.position += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.original.closed:
+            if self.mismatch is None and self.original.read(1):
+                self.mismatch = self.position
+            self.original.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def stored_hash_algorithms(integrity: Dict[str, Any]) -> List[str]:
+    """Returns the file hash algorithms recorded in an integrity block."""
+    algorithms = list(integrity.get('file_hashes') or {})
+    algorithm = integrity.get('file_hash_algorithm')
+    if algorithm and algorithm not in algorithms:
+        algorithms.insert(0, algorithm)
+    return algorithms
+
+def stored_file_hashes(integrity: Dict[str, Any]) -> Dict[str, str]:
+    """Returns the recorded file hashes keyed by algorithm, including the legacy single hash."""
+    hashes = {algorithm: value for algorithm, value in (integrity.get('file_hashes') or {}).items() if value}
+    if integrity.get('file_hash') and integrity.get('file_hash_algorithm'):
+        hashes.setdefault(integrity['file_hash_algorithm'], integrity['file_hash'])
+    return hashes
+
 def sign_payload(payload: Any, passphrase: str) -> str:
     """Generates an HMAC signature for the payload."""
     # Canonicalize payload by sorting keys to ensure consistent JSON string
@@ -26,3 +163,78 @@ def verify_payload(payload: Any, signature: str, passphrase: str) -> bool:
     expected_signature = sign_payload(payload, passphrase)
     return hmac.compare_digest(expected_signature, signature)
 
+# Tag of the run index HMAC, recorded in the integrity block as "index_hmac_signature".
+INDEX_HMAC_SCHEME = 'hod-index-hmac-v1'
+
+def sign_run_index(run_index: Dict[str, Any], input_size: int, passphrase: str) -> str:
+    """
+    Generates an HMAC signature over the input size and the chunk hashes of a
+    run index, so that a byte range can be checked without the whole payload.
+    """
+    fields = [INDEX_HMAC_SCHEME, str(input_size), str(run_index['interval']), run_index['hash_algorithm'],
+              *run_index['hashes']]
+    return hmac.new(passphrase.encode('utf-8'), "\n".join(fields).encode('utf-8'), hashlib.sha256).hexdigest()
+
+def verify_run_index(run_index: Dict[str, Any], input_size: int, signature: str, passphrase: str) -> bool:
+    """Verifies the HMAC signature of a run index."""
+    return hmac.compare_digest(sign_run_index(run_index, input_size, passphrase), signature)
+
+# Payload HMAC schemes, recorded in a keymap's "payload_hmac_scheme" key.
+# Keymaps without the key use the legacy scheme of sign_payload.
+LEGACY_HMAC_SCHEME = 'legacy'
+PAYLOAD_HMAC_SCHEME = 'hod-hmac-v2'
+# Payload elements canonicalized per json.dumps call.
+SIGN_BATCH = 4096
+
+class PayloadSigner:
+    """
+    Computes the payload HMAC incrementally as payload elements stream past,
+    canonicalizing them a batch at a time instead of serializing the whole
+    payload at once.
+
+    The legacy scheme produces the same signature as sign_payload. The
+    hod-hmac-v2 scheme signs a tag naming the scheme and the strategy (the
+    context) followed by the compact, key-sorted JSON array of the payload, so
+    a signed payload cannot be replayed under another strategy.
+    """
+
+    def __init__(self, passphrase: str, scheme: str = LEGACY_HMAC_SCHEME, context: str = ''):
+        if scheme == LEGACY_HMAC_SCHEME:
+            prefix, self._separators = '[', (', ', ': ')
+        elif scheme == PAYLOAD_HMAC_SCHEME:
+            prefix, self._separators = f"{scheme}\n{context}\n[", (',', ':')
+        else:
+            raise ValueError(f"Unsupported payload HMAC scheme '{scheme}'.")
+        self.scheme = scheme
+        self._hmac = hmac.new(passphrase.encode('utf-8'), prefix.encode('utf-8'), hashlib.sha256)
+        self._pending = []
+        self._first = True
+
+    def update(self, element: Any):
+        self._pending.append(element)
+        if len(self._pending) >= SIGN_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            # One json.dumps call per batch; its brackets are dropped so batches join seamlessly.
+            text = json.dumps(self._pending, sort_keys=True, separators=self._separators)[1:-1]
+            prefix = '' if self._first else self._separators[0]
+            self._hmac.update((prefix + text).encode('utf-8'))
+            self._pending.clear()
+            self._first = False
+
+    def wrap(self, payload: Iterable[Any]) -> Iterator[Any]:
+        """Yields the payload elements unchanged, feeding each one into the HMAC."""
+        for element in payload:
+            self.update(element)
+            yield element
+
+    def hexdigest(self) -> str:
+        self._flush()
+        final = self._hmac.copy()
+        final.update(b']')
+        return final.hexdigest()
+
+    def verify(self, signature: str) -> bool:
+        return hmac.compare_digest(self.hexdigest(), signature)
@@ -0,0 +1,155 @@
+# utils/index.py
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from .units import parse_size
+from .hashing import ChunkHasher
+from .runs import RunSequence
+
+# Keymap key holding the run index. It is a trailer key: the checkpoints are
+# only complete once the whole payload has been written.
+INDEX_KEY = "run_index"
+# Algorithm of the per-chunk content hashes that byte ranges are checked against
+# and encode --update compares the new input with.
+CHUNK_HASH_ALGORITHM = "sha256"
+
+class RunIndexer:
+    """
+    Builds a sparse run index while bit runs stream past. Every `interval`
+    output bytes, it records the index of the run containing that byte's
+    first bit ("runs") and how many bits of that run precede it ("offsets").
+    Formats that can seek append a resume position for each checkpoint
+    ("positions") as they write the run it names. The input bytes of every
+    interval-sized chunk are hashed into "hashes" through chunk_hasher().
+    """
+
+    def __init__(self, interval: int):
+        if interval <= 0:
+            raise ValueError("The run index interval must be a positive number of bytes.")
+        self.interval_bits = interval * 8
+        self.index: Dict[str, Any] = {"interval": interval, "runs": [], "offsets": [], "positions": [],
+                                      "hash_algorithm": CHUNK_HASH_ALGORITHM, "hashes": []}
+        self._runs = 0
+        self._bits = 0
+        self._next = 0
+
+    @classmethod
+    def resume(cls, run_index: Dict[str, Any], checkpoint: int) -> 'RunIndexer':
+        """
+        Returns an indexer that keeps the first `checkpoint` checkpoints and
+        chunk hashes of run_index and continues with the run of that checkpoint,
+        for an input whose bytes up to the checkpoint are unchanged.
+        """
+        indexer = cls(run_index["interval"])
+        for key in ("runs", "offsets", "positions", "hashes"):
+            indexer.index[key] = list(run_index[key][:checkpoint])
+        indexer._runs = run_index["runs"][checkpoint]
+        indexer._next = checkpoint * indexer.interval_bits
+        indexer._bits = indexer._next - run_index["offsets"][checkpoint]
+        return indexer
+
+    def chunk_hasher(self) -> ChunkHasher:
+        """Returns a hasher that appends the digest of every chunk of input bytes it is fed to the index."""
+        return ChunkHasher(self.index["interval"], self.index["hash_algorithm"], self.index["hashes"])
+
+    def sequences(self, sequences: Iterable[RunSequence]) -> Iterator[RunSequence]:
+        """Passes RunSequence chunks through, recording the checkpoints they contain."""
+        try:
+            # Imported here so that importing the pipeline does not pay for NumPy.
+            import numpy as np
+        except ImportError:  # NumPy is optional; checkpoints are located in pure Python instead.
+            np = None
+        for sequence in sequences:
+            self._add(sequence, np)
+            yield sequence
+
+    def _add(self, sequence: RunSequence, np):
+        runs, offsets = self.index["runs"], self.index["offsets"]
+        if np is not None and len(sequence):
+            lengths = sequence.to_numpy()
+            ends = np.cumsum(lengths) + np.uint64(self._bits)
+            total = int(ends[-1])
+            if self._next < total:
+                boundaries = np.arange(self._next, total, self.interval_bits, dtype=np.uint64)
+                found = np.searchsorted(ends, boundaries, side='right')
+                runs.extend((found + self._runs).tolist())
+                offsets.extend((boundaries - (ends[found] - lengths[found])).tolist())
+                self._next = int(boundaries[-1]) + self.interval_bits
+            self._bits = total
+            self._runs += len(sequence)
+            return
+
+        for length in sequence.lengths:
+            end = self._bits + length
+            while self._next < end:
+                runs.append(self._runs)
+                offsets.append(self._next - self._bits)
+                self._next += self.interval_bits
+            self._bits = end
+            self._runs += 1
+
+def checkpoint_for(run_index: Dict[str, Any], start: int) -> int:
+    """Returns the index of the last checkpoint at or before byte `start`."""
+    return min(start // run_index["interval"], len(run_index["runs"]) - 1)
+
+def prepend_run(bit: str, count: int, sequences: Iterable[RunSequence]) -> Iterator[RunSequence]:
+    """Yields the RunSequence chunks with a run of `count` bits in front, merged into their first run if it has that bit."""
+    sequences = iter(sequences)
+    first = next(sequences, None)
+    if count:
+        if first is None:
+            first = RunSequence(bit, [count])
+        elif first.start_bit == bit:
+            first.lengths[0] += count
+        else:
+            first = RunSequence(bit, array('Q', [count]) + first.lengths)
+    if first is not None:
+        yield first
+    yield from sequences
+
+def slice_runs(bit_runs: Iterable[Tuple[str, int]], skip: int, take: int) -> Iterator[Tuple[str, int]]:
+    """Yields the runs covering `take` bits, starting `skip` bits into bit_runs."""
+    if take <= 0:
+        return
+    for bit, count in bit_runs:
+        if skip >= count:
+            skip -= count
+            continue
+        count -= skip
+        skip = 0
+        if count >= take:
+            yield bit, take
+            return
+        yield bit, count
+        take -= count
+
+class RangeWriter:
+    """Wraps a binary stream, passing on only the `take` bytes that start `skip` bytes into what is written through it."""
+
+    def __init__(self, stream: BinaryIO, skip: int, take: int):
+        self.stream = stream
+        self.skip = skip
+        self.take = take
+
+    def write(self, data: bytes) -> int:
+        size = len(data)
+        if self.skip >= size:
+            self.skip -= size
+            return size
+        view = memoryview(data)[self.skip:self.skip + self.take]
+        self.skip = 0
+        self.take -= len(view)
+        if view:
+            self.stream.write(view)
+        return size
+
+def parse_range(text: str) -> Tuple[int, Optional[int]]:
+    """Parses a 'START:END' byte range (END exclusive; either may be omitted or use units like '1MB')."""
+    start, separator, end = text.partition(":")
+    if not separator:
+        raise ValueError(f"Invalid range '{text}'; expected START:END.")
+    start = parse_size(start) if start.strip() else 0
+    end = parse_size(end) if end.strip() else None
+    if start < 0 or (end is not None and end < start):
+        raise ValueError(f"Invalid range '{text}'; END must not be before START.")
+    return start, end
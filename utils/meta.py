@@ -4,23 +4,50 @@ from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 
 def create_metadata(
-    input_filename: str,
-    input_size: int,
+    input_filename: Optional[str],
+    input_size: Optional[int],
     strategy_name: str,
     hash_algo: Optional[str] = None,
-    file_hash: Optional[str] = None
+    file_hash: Optional[str] = None,
+    file_hashes: Optional[Dict[str, Optional[str]]] = None
 ) -> Dict[str, Any]:
-    """Constructs the standard metadata dictionary for a keymap."""
-    return {
+    """
+    Constructs the standard metadata dictionary for a keymap. For input read
+    from stdin (no filename, size not yet known) the size is left out, to be
+    added once the input has been read. The file hash algorithms are also
+    listed outside the integrity block, which streaming formats write after
+    the payload, so that a decoder knows which hashes to compute up front.
+    """
+    integrity = {
+        "file_hash_algorithm": hash_algo,
+        "file_hash": file_hash,
+        "payload_hmac_signature": None, # To be filled in later if used
+    }
+    if file_hashes:
+        integrity["file_hashes"] = dict(file_hashes)
+    metadata = {
         "hod_version": "2.0",
         "hod_created_utc": datetime.now(timezone.utc).isoformat(),
         "strategy": strategy_name,
-        "original_filename": os.path.basename(input_filename),
+        "original_filename": os.path.basename(input_filename) if input_filename else None,
         "input_size_bytes": input_size,
-        "integrity": {
-            "file_hash_algorithm": hash_algo,
-            "file_hash": file_hash,
-            "payload_hmac_signature": None, # To be filled in later if used
-        },
+        "file_hash_algorithms": list(file_hashes or ([hash_algo] if hash_algo else [])),
+        "integrity": integrity,
     }
+    if input_size is None:
+        del metadata["input_size_bytes"]
+    return metadata
+
+def set_file_hashes(metadata: Dict[str, Any], file_hashes: Dict[str, str]):
+    """
+    Records file hashes computed during encoding. The first algorithm also
+    fills the legacy file_hash/file_hash_algorithm fields.
+    """
+    if not file_hashes:
+        return
+    integrity = metadata["integrity"]
+    algorithm, file_hash = next(iter(file_hashes.items()))
+    integrity["file_hash_algorithm"] = algorithm
+    integrity["file_hash"] = file_hash
+    integrity["file_hashes"] = dict(file_hashes)
 
@@ -0,0 +1,97 @@
+# utils/parallel.py
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+from .core import bytes_to_runs
+
+# Bytes of input handed to each worker task.
+CHUNK_SIZE = 1 << 22
+# Tasks kept in flight per worker, bounding how much input is buffered at once.
+TASKS_PER_WORKER = 2
+
+def _extract_range(block: bytes, strategy_name: Optional[str]):
+    """
+    Worker task: extracts the bit runs of one byte range and returns them as
+    (head, body, tail). The first and last runs are returned raw because they
+    may merge with neighbouring ranges; tail is None for a single-run range.
+    When a strategy name is given, the interior runs are encoded in the worker.
+    """
+    sequence = bytes_to_runs(block)
+    if len(sequence) == 1:
+        return sequence[0], None, None
+    body = sequence[1:-1]
+    if strategy_name is not None:
+        # Imported lazily: only workers that encode need the strategies.
+        from strategies import STRATEGIES
+        body = list(STRATEGIES[strategy_name].encode_iter(body))
+    return sequence[0], body, sequence[-1]
+
+def _ordered_results(pool: Executor, task: Callable, blocks: Iterable[bytes], window: int, *args) -> Iterator[Any]:
+    """Submits one task per block, keeping at most `window` in flight, and yields results in input order."""
+    pending = deque()
+    for block in blocks:
+        pending.append(pool.submit(task, block, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def _read_blocks(file_handle: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while (block := file_handle.read(chunk_size)):
+        yield block
+
+def _stitched(results: Iterable[tuple]) -> Iterator[Tuple[str, Any]]:
+    """
+    Stitches per-range results back into one stream, yielding ('runs', runs)
+    for raw runs and ('payload', elements) for worker-encoded runs. The run
+    left open at the end of a range is merged with the first run of the next
+    range when their bits match.
+    """
+    open_run = None
+    for head, body, tail in results:
+        bit, count = head
+        if open_run is not None:
+            if open_run[0] == bit:
+                count += open_run[1]
+            else:
+                yield 'runs', [open_run]
+        if tail is None:
+            open_run = (bit, count)
+            continue
+        yield 'runs', [(bit, count)]
+        yield ('payload' if isinstance(body, list) else 'runs'), body
+        open_run = tail
+    if open_run is not None:
+        yield 'runs', [open_run]
+
+def parallel_bit_runs(file_handle: BinaryIO, jobs: int, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, int]]:
+    """
+    Yields the same bit runs as iter_bit_runs, extracting them from consecutive
+    byte ranges of the input in a pool of `jobs` worker processes.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = _ordered_results(pool, _extract_range, _read_blocks(file_handle, chunk_size),
+                                   jobs * TASKS_PER_WORKER, None)
+        for _, runs in _stitched(results):
+            yield from runs
+
+def parallel_encode(file_handle: BinaryIO, encoder, jobs: int, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yields the payload the encoder would produce for the whole input, using
+    `jobs` worker processes. Runs are always extracted in the workers; stateless
+    strategies also encode each range's interior runs there. The output is
+    identical to a serial encode.
+    """
+    if not encoder.stateless:
+        yield from encoder.encode_iter(parallel_bit_runs(file_handle, jobs, chunk_size))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = _ordered_results(pool, _extract_range, _read_blocks(file_handle, chunk_size),
+                                   jobs * TASKS_PER_WORKER, encoder.name)
+        for kind, item in _stitched(results):
+            if kind == 'payload':
+                yield from item
+            else:
+                yield from encoder.encode_iter(item)
@@ -0,0 +1,762 @@
+# utils/pipeline.py
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from strategies import STRATEGIES
+from formats import FORMATS, FORMATS_BY_EXT
+from .hashing import (
+    LEGACY_HMAC_SCHEME, PAYLOAD_HMAC_SCHEME, ByteCounter, ChunkHasher, ComparingWriter, HashingReader, HashingWriter,
+    MultiHasher, NullWriter, PayloadSigner, calculate_file_hash, sign_run_index, stored_file_hashes,
+    stored_hash_algorithms, verify_run_index,
+)
+from .index import CHUNK_HASH_ALGORITHM, INDEX_KEY, RangeWriter, RunIndexer, checkpoint_for, prepend_run, slice_runs
+from .meta import create_metadata, set_file_hashes
+from .cache import KeymapCache
+from .compression import CODECS, CompressedFormat, compression_for, detect_compression, split_compression_extension
+from .constants import SUPPORTED_HASH_ALGORITHMS
+from .stats import Stats
+
+# The path that means stdin (for an input) or stdout (for an output).
+STDIO = "-"
+# Bytes looked at to recognize the format of a keymap read from stdin.
+_SNIFF_BYTES = 16
+# Bytes per copy when releasing held-back output to stdout.
+COPY_BYTES = 1 << 20
+
+class HodError(Exception):
+    """An encode or decode failure, with a message meant for the user."""
+
+def _stdio(mode: str):
+    """Opens stdin ('r') or stdout ('w') as a binary stream whose descriptor stays open when it is closed."""
+    if mode == 'r':
+        return open(sys.stdin.fileno(), 'rb', closefd=False)
+    sys.stdout.flush()
+    return open(sys.stdout.fileno(), 'wb', closefd=False)
+
+def _open_output(output_file: str):
+    """Opens a reconstructed file (or stdout for STDIO) for writing."""
+    return _stdio('w') if output_file == STDIO else open(output_file, 'wb')
+
+@contextmanager
+def _open_output_keymap(output_format, output_file: str):
+    """Opens a keymap file (or stdout for STDIO) for writing in the output format."""
+    if output_file != STDIO:
+        with output_format.open_file(output_file, 'w') as f:
+            yield f
+        return
+    # Compressors do not close the stream they write to, so stdout is closed (and flushed) after them.
+    with _stdio('w') as stdout, output_format.open_file(stdout, 'w') as f:
+        yield f
+
+@contextmanager
+def _open_input_keymap(input_hod: str):
+    """
+    Yields the format of a keymap and the keymap opened for reading. For
+    STDIO, stdin is read and its format (and any compression) is recognized
+    from its first bytes.
+    """
+    if input_hod != STDIO:
+        input_format = select_input_format(input_hod)
+        with input_format.open_file(input_hod, 'r') as f:
+            yield input_format, f
+        return
+    with _stdio('r') as stdin:
+        stream = stdin
+        compression = compression_for(stdin.peek(_SNIFF_BYTES))
+        if compression:
+            stream = CODECS[compression].open(stdin, 'rb')
+        input_format = _format_for(stream.peek(_SNIFF_BYTES))
+        with input_format.open_file(stream, 'r') as f:
+            if compression:
+                input_format = CompressedFormat(input_format, compression)
+            logging.info(f"Detected keymap format '{input_format.name}' on stdin")
+            yield input_format, f
+
+def _format_for(head: bytes):
+    """Returns the format whose magic bytes start head (a pipe may deliver fewer bytes than the magic is long)."""
+    for name in FORMATS:
+        magic = FORMATS[name].magic
+        if head and magic and head[:len(magic)] == magic[:len(head)]:
+            return FORMATS[name]
+    raise HodError("Cannot recognize the keymap format on stdin.")
+
+def select_output_format(output_file: str, format_name: Optional[str] = None, compression: Optional[str] = None):
+    """
+    Returns the named format, or the one matching the output extension (JSON
+    if none does), compressed with the given codec or the one named by a codec
+    extension such as '.hod.gz'.
+    """
+    root, inferred = split_compression_extension(output_file)
+    compression = compression or inferred
+    if compression is not None and compression not in CODECS:
+        raise HodError(f"Unknown compression '{compression}'.")
+    if format_name:
+        if format_name not in FORMATS:
+            raise HodError(f"Unknown output format '{format_name}'.")
+        output_format = FORMATS[format_name]
+    else:
+        _, ext = os.path.splitext(root)
+        if ext in FORMATS_BY_EXT:
+            output_format = FORMATS_BY_EXT[ext]
+            logging.info(f"Inferred output format '{output_format.name}' from extension '{ext}'")
+        elif root == STDIO:
+            output_format = FORMATS['json']
+        else:
+            output_format = FORMATS['json']
+            logging.warning(f"Unknown extension. Defaulting to '{output_format.name}'.")
+    return CompressedFormat(output_format, compression) if compression else output_format
+
+def select_input_format(input_hod: str):
+    """Returns the format matching a keymap's extension, wrapped in the codec its magic bytes name if it is compressed."""
+    try:
+        compression = detect_compression(input_hod)
+    except OSError as e:
+        raise HodError(f"Failed to read keymap file: {e}") from e
+    root = split_compression_extension(input_hod)[0] if compression else input_hod
+    _, ext = os.path.splitext(root)
+    if ext not in FORMATS_BY_EXT:
+        raise HodError(f"Unknown file format extension '{ext}'. Cannot decode.")
+    input_format = FORMATS_BY_EXT[ext]
+    if compression:
+        input_format = CompressedFormat(input_format, compression)
+    logging.info(f"Detected keymap format '{input_format.name}'")
+    return input_format
+
+def encode_file(input_file: str, output_file: str, strategy: Optional[str] = None, hash_algos: Sequence[str] = (),
+                passphrase: Optional[str] = None, format_name: Optional[str] = None, jobs: int = 1,
+                stats: Optional[Stats] = None, cache: Optional[KeymapCache] = None,
+                index_interval: Optional[int] = None, previous: Optional[str] = None,
+                compression: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Encodes a file into a keymap and returns the keymap metadata (including
+    the integrity block). With a cache, a keymap previously produced for the
+    same content, strategy and format supplies the payload, and only the
+    metadata is regenerated. With an index interval, a run index with a
+    checkpoint and a content hash every index_interval bytes is embedded for
+    decode_range and updates.
+
+    With previous, the path of an indexed keymap of an earlier version of the
+    input, the payload of previous is reused up to the first chunk whose hash
+    changed and only the input from there on is encoded. The strategy and
+    index interval default to those of previous (the strategy otherwise to
+    rle). compression names a codec from CODECS, which is otherwise inferred
+    from an output extension such as '.hod.gz'.
+
+    input_file and output_file may be STDIO to read stdin and write stdout
+    (as JSON unless format_name is given). Input from stdin is sized and
+    hashed in the same pass that encodes it, and the size is written after
+    the payload. Stdin cannot be updated from a previous keymap, and the
+    cache is not used with stdin or stdout. Raises HodError on failure.
+    """
+    # Imported here: the run pipeline pulls in NumPy.
+    from .core import batch_runs, iter_bit_runs, iter_run_sequences
+    from .parallel import parallel_bit_runs, parallel_encode
+    stats = stats or Stats('encode', enabled=False)
+    logging.info(f"Starting encoding of '{input_file}'")
+
+    # 1. Select Strategy and Format
+    streaming = input_file == STDIO
+    if streaming and previous:
+        raise HodError("Updating a keymap needs an input file that can be read twice, not stdin.")
+    if cache is not None and STDIO in (input_file, output_file):
+        logging.info("The keymap cache is not used with stdin or stdout.")
+        cache = None
+    update = _read_previous(previous) if previous else None
+    if update is not None:
+        strategy = strategy or update[2].get('strategy')
+        index_interval = index_interval or (update[3] or {}).get('interval')
+    strategy = strategy or 'rle'
+    if strategy not in STRATEGIES:
+        raise HodError(f"Unknown strategy '{strategy}'.")
+    encoder = STRATEGIES[strategy]
+    output_format = select_output_format(output_file, format_name, compression)
+
+    # 2. Create Metadata (file hashes are filled in once the input has been read)
+    # The size of stdin is only known once it has been read.
+    input_size = None if streaming else os.path.getsize(input_file)
+    stats.info.update(input=input_file, output=output_file, strategy=encoder.name, format=output_format.name,
+                      input_size_bytes=input_size, jobs=jobs)
+    hash_algos = list(dict.fromkeys(hash_algos))
+    metadata = create_metadata(None if streaming else input_file, input_size, encoder.name, hash_algos[0] if hash_algos else None,
+                               file_hashes={algo: None for algo in hash_algos})
+
+    # 3. (Optional) Reuse the payload of a cached keymap for identical content
+    # A re-serialized (signed) payload would need its run index positions rebuilt, so those encode afresh.
+    use_cache = cache is not None and not (passphrase and index_interval)
+    variant = (encoder.name, output_format.name, output_format.extension, index_interval)
+    cache_key = None
+    if use_cache:
+        with stats.stage('cache_lookup'):
+            if cache.may_contain(input_size, *variant):
+                # Every requested hash is computed in the same read, for the metadata of a hit.
+                content_hashes = _file_hashes(input_file, ['sha256', *hash_algos])
+                cache_key = cache.key(content_hashes['sha256'], input_size, *variant)
+                cached = cache.lookup(cache_key, lambda path: output_format.open_file(path, 'r'))
+            else:
+                # No entry has content of this size: the key is hashed while the input is encoded.
+                cache.count_miss()
+                cached = None
+        stats.count('cache_misses' if cached is None else 'cache_hits')
+        if cached is not None:
+            logging.info(f"Reusing the cached keymap payload for content {content_hashes['sha256'][:12]}...")
+            def finish(cached_metadata):
+                set_file_hashes(metadata, _known_hashes(input_file, hash_algos, {
+                    **content_hashes, **stored_file_hashes(cached_metadata.get('integrity', {}))}))
+                if index_interval:
+                    metadata[INDEX_KEY] = cached_metadata[INDEX_KEY]
+            try:
+                with cached, output_format.open_file(output_file, 'w') as f_out:
+                    if passphrase:
+                        # The signature covers the payload elements, so they are parsed and re-serialized.
+                        cached_metadata, payload = output_format.deserialize_stream(cached)
+                        payload = _then(payload, lambda: finish(cached_metadata))
+                        _write_keymap(metadata, payload, encoder, output_format, f_out, passphrase, stats)
+                    else:
+                        with stats.stage('cache_copy'):
+                            output_format.copy_payload(cached, metadata, f_out, finish)
+            except Exception as e:
+                logging.warning(f"Ignoring unreadable cache entry '{cache_key}': {e}")
+            else:
+                stats.count('bytes_written', os.path.getsize(output_file))
+                logging.info(f"✅ Encoding successful. Keymap saved to '{output_file}'.")
+                return metadata
+
+    # 4. (Optional) Find how much of the previous keymap still describes the input
+    # The cache key's sha256 is computed with the requested hashes unless the lookup already read the input.
+    hasher_algos = list(dict.fromkeys(hash_algos + (['sha256'] if use_cache and cache_key is None else [])))
+    hasher = MultiHasher(hasher_algos)
+    checkpoint = 0
+    if update is not None:
+        with stats.stage('update_scan'):
+            checkpoint, checkpoint_bit = _update_checkpoint(input_file, input_size, update, encoder, output_format,
+                                                            index_interval, passphrase, hasher)
+        stats.count('reused_chunks', checkpoint)
+    # The previous keymap is read while the new one is written, so updating it in place goes through a temporary file.
+    target = output_file
+    if checkpoint and output_file != STDIO and os.path.exists(output_file) and os.path.samefile(previous, output_file):
+        target = output_file + ".tmp"
+
+    # 5. Stream Bit Runs through the Strategy into the Serializer
+    logging.info(f"Encoding payload with '{encoder.name}' strategy and serializing to '{output_format.name}' format at '{output_file}'")
+    try:
+        with _stdio('r') if streaming else open(input_file, 'rb') as f_in, _open_output_keymap(output_format, target) as f_out:
+            # The input is hashed in the same pass that extracts its bit runs.
+            if checkpoint:
+                logging.info(f"Reusing the first {checkpoint} unchanged chunks of '{previous}'...")
+                f_in.seek(checkpoint * index_interval)
+            source = stats.reader(f_in)
+            if streaming:
+                counter = ByteCounter()
+                source = HashingReader(source, counter)
+            if hasher_algos:
+                source = HashingReader(source, stats.hasher(hasher))
+            # Formats that store bit runs are given the runs themselves, unless the payload elements must be signed.
+            store_runs = output_format.stores_runs and not passphrase
+            if index_interval:
+                # The run index is built from the runs, so workers only extract them.
+                indexer = RunIndexer.resume(update[3], checkpoint) if checkpoint else RunIndexer(index_interval)
+                metadata[INDEX_KEY] = indexer.index
+                chunk_hasher = indexer.chunk_hasher()
+                source = HashingReader(source, chunk_hasher)
+                sequences = batch_runs(parallel_bit_runs(source, jobs)) if jobs > 1 else iter_run_sequences(source)
+                if checkpoint:
+                    # The checkpoint's run may have begun before the chunk boundary.
+                    sequences = prepend_run(checkpoint_bit, update[3]['offsets'][checkpoint], sequences)
+                runs = stats.timed(chain.from_iterable(indexer.sequences(sequences)), 'run_generation', 'runs')
+                payload = runs if store_runs else stats.timed(encoder.encode_iter(runs), 'strategy_encode', 'payload_elements')
+                payload = _then(payload, chunk_hasher.finish)
+            elif jobs > 1:
+                logging.info(f"Splitting input across {jobs} worker processes...")
+                if store_runs:
+                    payload = stats.timed(parallel_bit_runs(source, jobs), 'run_generation', 'runs')
+                else:
+                    payload = stats.timed(parallel_encode(source, encoder, jobs), 'parallel_encode', 'payload_elements')
+            else:
+                runs = stats.timed(iter_bit_runs(source), 'run_generation', 'runs')
+                payload = runs if store_runs else stats.timed(encoder.encode_iter(runs), 'strategy_encode', 'payload_elements')
+            if hash_algos:
+                payload = _then(payload, lambda: set_file_hashes(
+                    metadata, {algo: digest for algo, digest in hasher.hexdigests().items() if algo in hash_algos}))
+            if streaming:
+                # Keys added while the payload streams are written after it.
+                payload = _then(payload, lambda: metadata.update(input_size_bytes=counter.count))
+            if checkpoint:
+                with stats.stage('serialize'), output_format.open_file(previous, 'r') as f_previous:
+                    serialize_update = output_format.serialize_update_runs if store_runs else output_format.serialize_update
+                    serialize_update(f_previous, update[3], checkpoint, metadata, payload, f_out)
+            elif store_runs:
+                with stats.stage('serialize'):
+                    output_format.serialize_runs(metadata, payload, f_out)
+            else:
+                _write_keymap(metadata, payload, encoder, output_format, f_out, passphrase, stats)
+        if target != output_file:
+            os.replace(target, output_file)
+    except Exception as e:
+        if target != output_file and os.path.exists(target):
+            os.remove(target)
+        raise HodError(f"Failed to write output file: {e}") from e
+    if streaming:
+        stats.info['input_size_bytes'] = metadata['input_size_bytes']
+    if output_file != STDIO:
+        stats.count('bytes_written', os.path.getsize(output_file))
+    if use_cache:
+        try:
+            cache.store(cache_key or cache.key(hasher.hexdigests()['sha256'], input_size, *variant), output_file)
+        except OSError as e:
+            logging.warning(f"Could not store the keymap in the cache: {e}")
+
+    logging.info(f"✅ Encoding successful. Keymap saved to '{output_file}'.")
+    return metadata
+
+def _write_keymap(metadata: Dict[str, Any], payload: Iterable[Any], encoder, output_format, output, passphrase: Optional[str],
+                  stats: Stats):
+    """Signs the payload as it streams (if a passphrase is given) and serializes the keymap to the output stream."""
+    if passphrase:
+        logging.info("Signing payload with passphrase-derived HMAC...")
+        signer = PayloadSigner(passphrase, PAYLOAD_HMAC_SCHEME, encoder.name)
+        metadata['payload_hmac_scheme'] = signer.scheme
+        payload = _then(stats.timed(signer.wrap(payload), 'hmac'), lambda: _sign(metadata, signer, passphrase))
+
+    with stats.stage('serialize'):
+        output_format.serialize_stream(metadata, payload, output)
+
+def _sign(metadata: Dict[str, Any], signer: PayloadSigner, passphrase: str):
+    """Records the payload HMAC and, for an indexed keymap, the HMAC over its chunk hashes that decode_range checks."""
+    metadata['integrity']['payload_hmac_signature'] = signer.hexdigest()
+    if INDEX_KEY in metadata:
+        metadata['integrity']['index_hmac_signature'] = sign_run_index(metadata[INDEX_KEY], metadata['input_size_bytes'],
+                                                                       passphrase)
+
+def _read_previous(previous: str):
+    """Returns the path, format, metadata and run index (None if it has none) of a keymap being updated."""
+    previous_format = select_input_format(previous)
+    try:
+        with previous_format.open_file(previous, 'r') as f:
+            metadata, run_index = previous_format.read_run_index(f)
+    except Exception as e:
+        raise HodError(f"Failed to read the previous keymap '{previous}': {e}") from e
+    return previous, previous_format, metadata, run_index
+
+def _update_checkpoint(input_file: str, input_size: int, update, encoder, output_format, index_interval: int,
+                       passphrase: Optional[str], hasher: MultiHasher):
+    """
+    Returns the checkpoint of the previous keymap's run index up to which its
+    payload still describes the input (0 to encode afresh) and the bit of that
+    checkpoint's run. The input bytes before the checkpoint are fed to hasher.
+    """
+    previous, previous_format, previous_metadata, run_index = update
+    reason = None
+    if passphrase:
+        reason = "a signature must cover the whole payload"
+    elif previous_format.name != output_format.name:
+        reason = f"it is a {previous_format.name} keymap"
+    elif not output_format.random_access:
+        reason = "compressed keymaps cannot be copied in part"
+    elif previous_metadata.get('strategy') != encoder.name:
+        reason = f"it uses the '{previous_metadata.get('strategy')}' strategy"
+    elif not run_index or run_index.get('hash_algorithm') != CHUNK_HASH_ALGORITHM or not run_index.get('positions'):
+        reason = "it has no chunk hashes and resume positions (encode it with --index-interval)"
+    elif run_index['interval'] != index_interval:
+        reason = "its run index interval differs"
+    if reason:
+        logging.info(f"Encoding afresh instead of updating '{previous}': {reason}.")
+        return 0, None
+
+    # Only whole chunks are compared, and at least the input's last byte is encoded anew.
+    hashes = run_index['hashes']
+    limit = min(len(run_index['runs']), len(run_index['positions']), len(hashes), -(-input_size // index_interval)) - 1
+    checkpoint = 0
+    last = None
+    with open(input_file, 'rb') as f:
+        while checkpoint < limit:
+            chunk = f.read(index_interval)
+            if hashlib.new(CHUNK_HASH_ALGORITHM, chunk).hexdigest() != hashes[checkpoint]:
+                break
+            if last is not None:
+                hasher.update(last)
+            last = chunk
+            checkpoint += 1
+        if checkpoint and not run_index['offsets'][checkpoint]:
+            # The checkpoint's run starts at the chunk boundary, so the run before it only ends
+            # there if the first new bit differs from its bit. Otherwise step back a chunk, whose
+            # first bit is unchanged.
+            f.seek(checkpoint * index_interval)
+            if ('1' if f.read(1)[0] & 0x80 else '0') != _checkpoint_bit(update, checkpoint):
+                checkpoint -= 1
+                last = None
+    if not checkpoint:
+        logging.info(f"Encoding afresh: the first chunk differs from '{previous}'.")
+        return 0, None
+    if last is not None:
+        hasher.update(last)
+    return checkpoint, _checkpoint_bit(update, checkpoint)
+
+def _checkpoint_bit(update, checkpoint: int) -> str:
+    """Returns the bit of the run named by a checkpoint of the previous keymap's run index."""
+    previous, previous_format, previous_metadata, run_index = update
+    with previous_format.open_file(previous, 'r') as f:
+        return next(iter(previous_format.runs_from(f, previous_metadata, run_index, checkpoint)))[0]
+
+def _file_hashes(input_file: str, algorithms: Sequence[str]) -> Dict[str, str]:
+    """Computes several hashes of a file in a single read."""
+    hasher = MultiHasher(dict.fromkeys(algorithms))
+    with open(input_file, 'rb') as f:
+        while (block := f.read(COPY_BYTES)):
+            hasher.update(block)
+    return hasher.hexdigests()
+
+def _known_hashes(input_file: str, algorithms: Sequence[str], known: Dict[str, str]) -> Dict[str, str]:
+    """Returns the requested file hashes, computing only those not already known."""
+    return {algorithm: known.get(algorithm) or calculate_file_hash(input_file, algorithm) for algorithm in algorithms}
+
+def decode_file(input_hod: str, output_file: str, passphrase: Optional[str] = None, show_payload: bool = False,
+                paranoid_reverify: bool = False, stats: Optional[Stats] = None) -> Optional[Dict[str, Any]]:
+    """
+    Reconstructs the original file from a keymap. Returns the keymap metadata
+    plus a "verified" key: True when stored hashes matched and None when no
+    hash was stored. With show_payload, prints the payload instead and
+    returns None. Raises HodError on failure, including an HMAC or hash
+    mismatch. The bytes are reconstructed into a temporary file beside
+    output_file, which replaces output_file only once every check has passed,
+    so a failed decode leaves an existing file untouched.
+
+    input_hod may be STDIO to read the keymap from stdin, and output_file
+    STDIO to write the reconstructed bytes to stdout. With a passphrase they
+    are held in a temporary file until the HMAC has been verified, so nothing
+    reaches stdout from a keymap that fails it; without one they stream
+    straight out (a signed keymap is refused first), and a hash mismatch can
+    only be reported after the fact.
+    """
+    stats = stats or Stats('decode', enabled=False)
+    logging.info(f"Starting decoding of '{input_hod}'")
+    stats.info['output'] = output_file
+    to_stdout = output_file == STDIO
+    staging = None if to_stdout and not passphrase else staging_path(None if to_stdout else output_file)
+    open_sink = (lambda: _open_output(output_file)) if staging is None else (lambda: open(staging, 'wb'))
+    try:
+        reconstructed = _reconstruct(input_hod, open_sink, passphrase, show_payload, stats)
+        if reconstructed is None:
+            return None
+        keymap, hasher, signer = reconstructed
+
+        # 6. (Optional) Verify HMAC Signature
+        _check_hmac(keymap, signer, passphrase)
+
+        # 7. (Optional) Verify Reconstructed File Hash
+        if staging is None and paranoid_reverify:
+            logging.warning("Output streamed to stdout cannot be re-read; --paranoid-reverify is skipped.")
+        verified = _check_file_hashes(keymap, hasher, stats, staging, paranoid_reverify and staging is not None)
+        if verified is False:
+            raise HodError("Reconstructed bytes do not match the stored hash.")
+
+        if staging is not None:
+            _publish(staging, output_file)
+    finally:
+        if staging is not None:
+            discard_output(staging)
+    if verified:
+        logging.info("✅ Hash verification successful. File reconstructed perfectly.")
+    else:
+        logging.info("✅ Decoding complete. No original file hash was stored to verify against.")
+    return {**keymap, "verified": verified}
+
+def staging_path(output_file: Optional[str]) -> str:
+    """
+    A temporary path to stage output in until it has been checked: beside
+    output_file (so it can be renamed over it), or in the temp directory.
+    """
+    if output_file is None:
+        fd, path = tempfile.mkstemp(prefix="hod-", suffix=".tmp")
+        os.close(fd)
+        return path
+    directory, name = os.path.split(os.path.abspath(output_file))
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+def _publish(staging: str, output_file: str):
+    """Moves checked bytes from their staging file over output_file, or copies them to stdout."""
+    if output_file == STDIO:
+        with open(staging, 'rb') as f_in, _stdio('w') as f_out:
+            shutil.copyfileobj(f_in, f_out, COPY_BYTES)
+    else:
+        os.replace(staging, output_file)
+
+def verify_file(input_hod: str, original: Optional[str] = None, passphrase: Optional[str] = None,
+                stats: Optional[Stats] = None) -> Dict[str, Any]:
+    """
+    Checks a keymap without writing any output: the reconstructed bytes stream
+    through the stored file hashes' algorithms (and are compared block by
+    block with the original file, if given) while the HMAC is checked in the
+    same pass. Returns the keymap metadata plus "verified" (as for decode_file),
+    "hmac_verified" (None when the keymap is not signed) and
+    "matches_original" (None without an original). Raises HodError when any
+    check fails.
+    """
+    stats = stats or Stats('verify', enabled=False)
+    logging.info(f"Verifying '{input_hod}'" + (f" against '{original}'" if original else ""))
+    try:
+        comparer = ComparingWriter(original) if original else None
+    except OSError as e:
+        raise HodError(f"Failed to open the original file: {e}") from e
+    try:
+        keymap, hasher, signer = _reconstruct(input_hod, lambda: comparer or NullWriter(), passphrase, False, stats)
+    finally:
+        if comparer is not None:
+            comparer.close()
+    _check_hmac(keymap, signer, passphrase)
+    verified = _check_file_hashes(keymap, hasher, stats)
+    if verified is False:
+        raise HodError("Reconstructed bytes do not match the stored hash.")
+    matches_original = None
+    if comparer is not None:
+        matches_original = comparer.mismatch is None
+        if not matches_original:
+            raise HodError(f"Reconstructed bytes differ from '{original}' at byte {comparer.mismatch}.")
+    if verified is None and matches_original is None and signer is None:
+        logging.warning(f"'{input_hod}' stores no hash or signature and no original was given; it was only checked to decode.")
+    else:
+        logging.info(f"✅ '{input_hod}' verified.")
+    return {**keymap, "verified": verified, "hmac_verified": True if signer is not None else None,
+            "matches_original": matches_original}
+
+def _reconstruct(input_hod: str, open_sink: Callable[[], Any], passphrase: Optional[str], show_payload: bool,
+                 stats: Stats):
+    """
+    Streams a keymap's reconstructed bytes into the sink returned by
+    open_sink, hashing them with the stored file hash algorithms and feeding
+    the payload HMAC as they pass. Returns the keymap metadata (including its
+    trailer), the hasher and the signer (None without a passphrase), or None
+    after printing the payload when show_payload is set.
+    """
+    from .core import pack_sequences, write_bit_runs, write_blocks
+    from .display import preview_payload, print_payload_preview
+
+    # 1. Select Format and Deserialize
+    with _open_input_keymap(input_hod) as (input_format, f_in):
+        stats.info.update(input=input_hod, format=input_format.name)
+        if input_hod != STDIO:
+            stats.count('bytes_read', os.path.getsize(input_hod))
+        try:
+            with stats.stage('deserialize'):
+                if input_format.stores_runs:
+                    keymap, sequences = input_format.deserialize_runs(f_in)
+                    sequences = stats.timed(sequences, 'deserialize', 'run_sequences', batch=1)
+                    payload = None
+                else:
+                    keymap, payload = input_format.deserialize_stream(f_in)
+                    payload = stats.timed(payload, 'deserialize', 'payload_elements')
+        except Exception as e:
+            raise HodError(f"Failed to parse keymap file: {e}") from e
+
+        # 2. Extract Data and Select Strategy
+        strategy_name = keymap.get('strategy')
+        integrity = keymap.get('integrity', {})
+        if not strategy_name or strategy_name not in STRATEGIES:
+            raise HodError(f"Unknown or missing strategy '{strategy_name}' in keymap.")
+        decoder = STRATEGIES[strategy_name]
+        stats.info['strategy'] = decoder.name
+        if payload is None and (show_payload or passphrase):
+            # The format stores bit runs; rebuild the strategy payload only where it is needed.
+            payload = decoder.encode_iter(chain.from_iterable(sequences))
+
+        # 3. (Optional) Feed the HMAC as the payload streams past
+        # The signature may be in a trailer, but the scheme is in the header of every keymap signed by streaming.
+        if (integrity.get('payload_hmac_signature') or keymap.get('payload_hmac_scheme')) and not passphrase:
+            raise HodError("This keymap is trust-paired. Please provide the --passphrase to decode.")
+        signer = None
+        if passphrase:
+            scheme = keymap.get('payload_hmac_scheme', LEGACY_HMAC_SCHEME)
+            try:
+                signer = PayloadSigner(passphrase, scheme, strategy_name)
+            except ValueError as e:
+                raise HodError(str(e)) from e
+            payload = stats.timed(signer.wrap(payload), 'hmac')
+
+        # 4. Handle --show-payload flag, once the whole payload has passed the HMAC
+        if show_payload:
+            try:
+                head, total = preview_payload(payload)
+            except Exception as e:
+                raise HodError(f"Failed to read payload: {e}") from e
+            _check_hmac(keymap, signer, passphrase)
+            print_payload_preview(strategy_name, head, total)
+            return None
+
+        # 5. Stream Decoded Bit Runs into the Sink, hashing the bytes as they are written
+        if 'integrity' in keymap:
+            hash_algos = stored_hash_algorithms(integrity)
+        elif 'file_hash_algorithms' in keymap:
+            # The integrity block is a trailer, but the header names the hashes it will hold.
+            hash_algos = [algo for algo in keymap['file_hash_algorithms'] if algo in SUPPORTED_HASH_ALGORITHMS]
+        else:
+            # Keymaps streamed before the header listed them: compute every supported hash in the same pass.
+            hash_algos = list(SUPPORTED_HASH_ALGORITHMS)
+        hasher = MultiHasher(hash_algos)
+        logging.info(f"Decoding payload using '{decoder.name}' strategy...")
+        try:
+            with open_sink() as f_out, stats.stage('reconstruction'):
+                sink = stats.writer(f_out)
+                if hash_algos:
+                    sink = HashingWriter(sink, stats.hasher(hasher))
+                if payload is None:
+                    write_blocks(pack_sequences(sequences), sink)
+                else:
+                    runs = stats.timed(decoder.decode_iter(payload), 'strategy_decode', 'runs')
+                    write_bit_runs(runs, sink)
+        except Exception as e:
+            raise HodError(f"Failed to decode payload or reconstruct file: {e}") from e
+
+    # Trailer values are only guaranteed to be complete once the payload has been consumed.
+    return keymap, hasher, signer
+
+def _check_hmac(keymap: Dict[str, Any], signer: Optional[PayloadSigner], passphrase: Optional[str]):
+    """Raises HodError unless the payload HMAC fed to signer matches the keymap's signature."""
+    hmac_sig = keymap.get('integrity', {}).get('payload_hmac_signature')
+    if hmac_sig:
+        if signer is None:
+            raise HodError("This keymap is trust-paired. Please provide the --passphrase to decode.")
+        if not signer.verify(hmac_sig):
+            raise HodError("❌ HMAC signature verification FAILED. The keymap may be tampered with or the passphrase is incorrect.")
+        logging.info("HMAC signature verified successfully.")
+    elif passphrase:
+        logging.warning("Passphrase provided, but the keymap is not trust-paired (no HMAC signature found).")
+
+def _check_file_hashes(keymap: Dict[str, Any], hasher: MultiHasher, stats: Stats, output_file: Optional[str] = None,
+                       paranoid_reverify: bool = False) -> Optional[bool]:
+    """
+    Compares the stored file hashes with those of the reconstructed bytes,
+    re-reading them from output_file with paranoid_reverify. Returns None when
+    no hash was stored.
+    """
+    original_hashes = stored_file_hashes(keymap.get('integrity', {}))
+    if not original_hashes:
+        return None
+    reconstructed_hashes = hasher.hexdigests()
+    verified = True
+    for hash_algo, original_hash in original_hashes.items():
+        logging.info(f"Verifying reconstructed file against stored {hash_algo} hash...")
+        reconstructed_hash = reconstructed_hashes.get(hash_algo)
+        if output_file and (paranoid_reverify or reconstructed_hash is None):
+            with stats.stage('reverify'):
+                reconstructed_hash = calculate_file_hash(output_file, hash_algo)
+        if reconstructed_hash != original_hash:
+            verified = False
+            logging.warning("⚠️ HASH MISMATCH! Reconstructed file does not match the original hash.")
+            logging.warning(f"  Original:     {original_hash}")
+            logging.warning(f"  Reconstructed:{reconstructed_hash}")
+    return verified
+
+def decode_range(input_hod: str, output_file: str, start: int, end: Optional[int] = None,
+                 passphrase: Optional[str] = None, stats: Optional[Stats] = None) -> Dict[str, Any]:
+    """
+    Reconstructs bytes [start, end) of the original file from a keymap with a
+    run index, resuming at the nearest checkpoint at or before start instead
+    of decoding the payload from the beginning. end defaults to the end of the
+    file, and output_file may be STDIO for stdout.
+
+    The whole-file hash and payload HMAC cannot be checked from part of the
+    payload, so the chunks covering the range are reconstructed and checked
+    against the run index's chunk hashes instead. A signed keymap needs the
+    passphrase, which must verify the HMAC over those chunk hashes. As in
+    decode_file, output_file is only replaced (and signed output only reaches
+    stdout) once the checks pass. Returns the keymap metadata plus a
+    "verified" key: True when the chunks matched and None when the index has
+    no chunk hashes. Raises HodError on failure.
+    """
+    from .core import write_bit_runs
+    stats = stats or Stats('decode', enabled=False)
+    logging.info(f"Starting partial decoding of '{input_hod}'")
+    if input_hod == STDIO:
+        raise HodError("Decoding a byte range needs a keymap file to seek in, not stdin.")
+    input_format = select_input_format(input_hod)
+    stats.info.update(input=input_hod, output=output_file, format=input_format.name, range=[start, end])
+    to_stdout = output_file == STDIO
+    staging = None if to_stdout and not passphrase else staging_path(None if to_stdout else output_file)
+    try:
+        with input_format.open_file(input_hod, 'r') as f_in:
+            try:
+                with stats.stage('read_index'):
+                    keymap, run_index = input_format.read_run_index(f_in)
+            except Exception as e:
+                raise HodError(f"Failed to parse keymap file: {e}") from e
+            if not run_index:
+                raise HodError("This keymap has no run index. Re-encode it with --index-interval to decode byte ranges.")
+            if keymap.get('strategy') not in STRATEGIES:
+                raise HodError(f"Unknown or missing strategy '{keymap.get('strategy')}' in keymap.")
+            _check_index_hmac(keymap, run_index, passphrase)
+
+            # Whole chunks are reconstructed so that they can be checked; only the range is written.
+            size = keymap['input_size_bytes']
+            end = size if end is None else min(end, size)
+            interval = run_index['interval']
+            checkpoint = checkpoint_for(run_index, start)
+            first, last = checkpoint * interval, min(-(-end // interval) * interval, size)
+            hashes = run_index.get('hashes') or []
+            checked = len(hashes) * interval >= last and run_index.get('hash_algorithm') in hashlib.algorithms_available
+            if not checked:
+                logging.warning("This run index has no chunk hashes; the reconstructed range cannot be checked.")
+                last = end
+            chunk_hasher = ChunkHasher(interval, run_index['hash_algorithm'], []) if checked else None
+            logging.info(f"Reconstructing bytes {start}:{end} into '{output_file}'...")
+            try:
+                with _open_output(output_file) if staging is None else open(staging, 'wb') as f_out, \
+                        stats.stage('reconstruction'):
+                    if start < end:
+                        sink = RangeWriter(stats.writer(f_out), start - first, end - start)
+                        if chunk_hasher is not None:
+                            sink = HashingWriter(sink, chunk_hasher)
+                        f_in.seek(0)
+                        runs = input_format.runs_from(f_in, keymap, run_index, checkpoint)
+                        runs = slice_runs(runs, run_index['offsets'][checkpoint], (last - first) * 8)
+                        write_bit_runs(stats.timed(runs, 'strategy_decode', 'runs'), sink)
+            except Exception as e:
+                raise HodError(f"Failed to decode payload or reconstruct file: {e}") from e
+
+        if chunk_hasher is not None and start < end:
+            chunk_hasher.finish()
+            if chunk_hasher.digests != hashes[checkpoint:checkpoint + len(chunk_hasher.digests)]:
+                raise HodError("Reconstructed bytes do not match the run index's chunk hashes.")
+            logging.info("Chunk hash verification successful.")
+        if staging is not None:
+            _publish(staging, output_file)
+    finally:
+        if staging is not None:
+            discard_output(staging)
+    logging.info(f"✅ Reconstructed {max(end - start, 0)} bytes into '{output_file}'.")
+    return {**keymap, "verified": True if checked else None}
+
+def _check_index_hmac(keymap: Dict[str, Any], run_index: Dict[str, Any], passphrase: Optional[str]):
+    """Raises HodError unless a signed keymap's run index HMAC verifies with passphrase."""
+    integrity = keymap.get('integrity') or {}
+    signed = integrity.get('payload_hmac_signature') or keymap.get('payload_hmac_scheme')
+    if signed and not passphrase:
+        raise HodError("This keymap is trust-paired. Please provide the --passphrase to decode.")
+    if not signed:
+        if passphrase:
+            logging.warning("Passphrase provided, but the keymap is not trust-paired (no HMAC signature found).")
+        return
+    signature = integrity.get('index_hmac_signature')
+    if not signature:
+        raise HodError("The run index of this signed keymap is not signed, so a byte range cannot be verified. "
+                       "Decode the whole file, or re-encode it to sign the index.")
+    if not verify_run_index(run_index, keymap.get('input_size_bytes'), signature, passphrase):
+        raise HodError("❌ Run index HMAC verification FAILED. The keymap may be tampered with or the passphrase is incorrect.")
+    logging.info("Run index HMAC signature verified successfully.")
+
+def discard_output(output_file: str):
+    """Removes a reconstructed (or staged) file, ignoring one that is already gone."""
+    try:
+        os.remove(output_file)
+    except OSError:
+        pass
+
+def _then(iterable: Iterable[Any], callback):
+    """Yields everything from an iterable, then calls callback once it is exhausted."""
+    yield from iterable
+    callback()
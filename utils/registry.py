@@ -0,0 +1,164 @@
+# utils/registry.py
+import importlib
+import json
+import logging
+import os
+import pkgutil
+import sys
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+class PluginRegistry(Mapping):
+    """
+    A read-only mapping of plugin name to plugin instance that imports each
+    plugin only when it is first looked up.
+
+    Plugin names (and any `attributes` needed for lookups, such as a format's
+    extension) come from a manifest cached in the package's __pycache__. The
+    manifest is rebuilt by importing every module of the package, as the old
+    eager loader did, plus any plugins registered under the `entry_point_group`
+    entry point group, whenever the package's modules or the entry points of
+    that group (or the versions of the distributions providing them) change.
+    """
+
+    def __init__(self, package_name: str, package_path: List[str], base_class: type,
+                 entry_point_group: str, attributes: Tuple[str, ...] = ()):
+        self.package_name = package_name
+        self.package_path = list(package_path)
+        self.base_class = base_class
+        self.entry_point_group = entry_point_group
+        self.attributes = attributes
+        self._manifest: Optional[Dict[str, Dict[str, Any]]] = None
+        self._instances: Dict[str, Any] = {}
+
+    @property
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Plugin name -> {"target": "module:Class", attribute: value, ...}."""
+        if self._manifest is None:
+            self._manifest = self._load_manifest()
+        return self._manifest
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._instances:
+            entry = self.manifest[name]
+            module_name, _, attribute = entry["target"].partition(":")
+            plugin = getattr(importlib.import_module(module_name), attribute)
+            self._instances[name] = plugin() if isinstance(plugin, type) else plugin
+        return self._instances[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.manifest
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest)
+
+    def __len__(self) -> int:
+        return len(self.manifest)
+
+    def register(self, plugin: Any):
+        """Adds an already instantiated plugin, e.g. one defined outside the package."""
+        self.manifest[plugin.name] = {"target": f"{type(plugin).__module__}:{type(plugin).__qualname__}",
+                                      **{key: getattr(plugin, key) for key in self.attributes}}
+        self._instances[plugin.name] = plugin
+
+    def index(self, attribute: str) -> 'RegistryIndex':
+        """Returns a lazy mapping keyed by one of the manifest attributes instead of the name."""
+        return RegistryIndex(self, attribute)
+
+    def refresh(self):
+        """Rebuilds the manifest, importing every plugin."""
+        self._manifest = self._build_manifest(self._signature())
+
+    def _cache_path(self) -> str:
+        return os.path.join(self.package_path[0], "__pycache__", "hod-plugins.json")
+
+    def _signature(self) -> List[Any]:
+        """Changes whenever a plugin module changes or a distribution providing plugins is installed, upgraded or removed."""
+        signature = [MANIFEST_VERSION, sys.version_info[:2]]
+        for directory in self.package_path:
+            for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+                if entry.name.endswith(".py") or (entry.is_dir() and entry.name != "__pycache__"):
+                    stat = entry.stat()
+                    signature.append([entry.name, stat.st_mtime_ns, stat.st_size])
+        for entry_point in _entry_points(self.entry_point_group):
+            # Python < 3.10 entry points do not know their distribution, so only the entry point itself counts there.
+            dist = getattr(entry_point, "dist", None)
+            signature.append([entry_point.name, entry_point.value,
+                              dist.metadata["Name"] if dist else None, dist.version if dist else None])
+        return json.loads(json.dumps(signature))
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        signature = self._signature()
+        try:
+            with open(self._cache_path(), "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("signature") == signature:
+                return cached["plugins"]
+        except (OSError, ValueError, AttributeError):
+            pass
+        return self._build_manifest(signature)
+
+    def _build_manifest(self, signature: List[Any]) -> Dict[str, Dict[str, Any]]:
+        plugins = {}
+        for _, module_name, _ in pkgutil.iter_modules(self.package_path, self.package_name + "."):
+            module = importlib.import_module(module_name)
+            for attribute_name in dir(module):
+                attribute = getattr(module, attribute_name)
+                if isinstance(attribute, type) and issubclass(attribute, self.base_class) and attribute is not self.base_class:
+                    self._add_discovered(plugins, attribute(), f"{attribute.__module__}:{attribute.__qualname__}")
+        for entry_point in _entry_points(self.entry_point_group):
+            try:
+                plugin = entry_point.load()
+                instance = plugin() if isinstance(plugin, type) else plugin
+            except Exception as e:
+                logging.warning(f"Skipping plugin entry point '{entry_point.name}': {e}")
+                continue
+            self._add_discovered(plugins, instance, entry_point.value)
+
+        try:
+            path = self._cache_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "plugins": plugins}, f)
+            os.replace(temporary, path)
+        except OSError:
+            pass  # A read-only install simply rebuilds the manifest on every run.
+        return plugins
+
+    def _add_discovered(self, plugins: Dict[str, Dict[str, Any]], instance: Any, target: str):
+        plugins[instance.name] = {"target": target, **{key: getattr(instance, key) for key in self.attributes}}
+        self._instances[instance.name] = instance
+
+class RegistryIndex(Mapping):
+    """A lazy view of a PluginRegistry keyed by a manifest attribute."""
+
+    def __init__(self, registry: PluginRegistry, attribute: str):
+        self.registry = registry
+        self.attribute = attribute
+
+    def _names(self) -> Dict[Any, str]:
+        return {entry[self.attribute]: name for name, entry in self.registry.manifest.items()}
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.registry[self._names()[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._names()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._names())
+
+    def __len__(self) -> int:
+        return len(self._names())
+
+def _entry_points(group: str) -> list:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    try:
+        return list(entry_points(group=group))
+    except TypeError:  # Python < 3.10 returns a dict of groups.
+        return list(entry_points().get(group, []))
@@ -0,0 +1,127 @@
+# utils/runs.py
+from array import array
+from itertools import cycle
+from typing import Iterable, Iterator, Tuple, Union
+
+def _flip(bit: str) -> str:
+    return '0' if bit == '1' else '1'
+
+class RunSequence:
+    """
+    A compact container for universal bit runs. Because the bits of
+    consecutive runs always alternate, a run sequence is stored as its starting
+    bit plus an array('Q') of run lengths (8 bytes per run). Iterating yields
+    the usual ('bit', count) tuples, so it can be passed anywhere bit runs are
+    accepted.
+    """
+    __slots__ = ('start_bit', 'lengths')
+
+    def __init__(self, start_bit: str = '0', lengths: Union[array, Iterable[int], bytes] = ()):
+        if start_bit not in ('0', '1'):
+            raise ValueError(f"Invalid starting bit: {start_bit!r}")
+        self.start_bit = start_bit
+        if isinstance(lengths, array) and lengths.typecode == 'Q':
+            self.lengths = lengths
+        else:
+            self.lengths = array('Q', lengths)
+
+    @classmethod
+    def from_runs(cls, bit_runs: Iterable[Tuple[str, int]]) -> 'RunSequence':
+        """
+        Builds a sequence from ('bit', count) tuples. Empty runs are dropped and
+        adjacent runs of the same bit are merged, which leaves the represented
+        bits unchanged.
+        """
+        if isinstance(bit_runs, RunSequence):
+            return cls(bit_runs.start_bit, array('Q', bit_runs.lengths))
+        if isinstance(bit_runs, list) and bit_runs:
+            # Fast path for the common case of already alternating, non-empty runs.
+            try:
+                bits = ''.join([run[0] for run in bit_runs])
+                lengths = array('Q', [run[1] for run in bit_runs])
+            except (TypeError, OverflowError):
+                pass
+            else:
+                start_bit = bits[0]
+                pattern = (start_bit + _flip(start_bit)) * (len(bit_runs) // 2 + 1)
+                if (start_bit in ('0', '1') and bits == pattern[:len(bit_runs)]
+                        and 0 not in lengths):
+                    return cls(start_bit, lengths)
+        sequence = cls()
+        sequence.extend(bit_runs)
+        return sequence
+
+    def append(self, bit: str, count: int):
+        """Appends a run, merging it into the last run when the bits match."""
+        bit = str(bit)
+        if count <= 0:
+            return
+        if not self.lengths:
+            if bit not in ('0', '1'):
+                raise ValueError(f"Invalid bit: {bit!r}")
+            self.start_bit = bit
+            self.lengths.append(count)
+        elif bit == self.end_bit:
+            self.lengths[-1] += count
+        elif bit in ('0', '1'):
+            self.lengths.append(count)
+        else:
+            raise ValueError(f"Invalid bit: {bit!r}")
+
+    def extend(self, bit_runs: Iterable[Tuple[str, int]]):
+        """Appends every run from an iterable of ('bit', count) tuples."""
+        for bit, count in bit_runs:
+            self.append(bit, count)
+
+    def bit_at(self, index: int) -> str:
+        """Returns the bit of the run at the given index."""
+        return self.start_bit if index % 2 == 0 else _flip(self.start_bit)
+
+    @property
+    def end_bit(self) -> str:
+        """The bit of the last run."""
+        return self.bit_at(len(self.lengths) - 1)
+
+    @property
+    def total_bits(self) -> int:
+        """The number of bits represented by the sequence."""
+        return sum(self.lengths)
+
+    def to_memoryview(self) -> memoryview:
+        """Exports the run lengths without copying them."""
+        return memoryview(self.lengths)
+
+    def to_numpy(self):
+        """Exports the run lengths as a uint64 NumPy array sharing the same buffer."""
+        try:
+            # Imported here so that using run sequences does not pay for importing NumPy.
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("NumPy is required for RunSequence.to_numpy().")
+        return np.frombuffer(self.lengths, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return zip(cycle((self.start_bit, _flip(self.start_bit))), self.lengths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.lengths))
+            if step != 1:
+                raise ValueError("RunSequence slices must be contiguous.")
+            return RunSequence(self.bit_at(start), self.lengths[start:stop])
+        if index < 0:
+            index += len(self.lengths)
+        return (self.bit_at(index), self.lengths[index])
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RunSequence):
+            return NotImplemented
+        if not self.lengths and not other.lengths:
+            return True
+        return self.start_bit == other.start_bit and self.lengths == other.lengths
+
+    def __repr__(self) -> str:
+        return f"RunSequence(start_bit={self.start_bit!r}, runs={len(self.lengths)}, bits={self.total_bits})"
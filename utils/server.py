@@ -0,0 +1,310 @@
+# utils/server.py
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from .client import FRAME, FRAME_BYTES
+from .pipeline import HodError
+
+# Options each job command accepts, passed on to the pipeline function of the same name.
+JOB_OPTIONS = {
+    "encode": ("strategy", "hash_algos", "passphrase", "format_name", "index_interval", "compression",
+               "cache_dir", "cache_size"),
+    "decode": ("passphrase", "paranoid_reverify"),
+    "verify": ("passphrase", "original"),
+}
+# Upper bound on a request header line.
+MAX_HEADER_BYTES = 1 << 16
+# Number of recent jobs per command whose latencies the percentiles are computed over.
+LATENCY_WINDOW = 1024
+
+def _warm_worker():
+    """Imports every strategy and format (and NumPy) once per worker, so jobs do not pay for it."""
+    from strategies import STRATEGIES
+    from formats import FORMATS
+    for registry in (STRATEGIES, FORMATS):
+        for name in registry:
+            registry[name]
+    # Imported only so that the run extraction code (and NumPy) is loaded before the first job.
+    from . import core, parallel  # noqa: F401
+    # The server stops the workers itself; a Ctrl-C at the terminal reaches them too.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Job progress is reported by the server; workers only log problems.
+    logging.getLogger().setLevel(max(logging.getLogger().level, logging.WARNING))
+
+def _ping() -> int:
+    return os.getpid()
+
+def _run_job(command: str, options: Dict[str, Any], input_path: str, output_path: str) -> Dict[str, Any]:
+    from .cache import KeymapCache
+    from .pipeline import decode_file, encode_file, verify_file
+    options = dict(options)
+    if command == "encode":
+        cache_dir, cache_size = options.pop("cache_dir", None), options.pop("cache_size", None)
+        if cache_dir:
+            options["cache"] = KeymapCache(cache_dir, cache_size) if cache_size else KeymapCache(cache_dir)
+        return encode_file(input_path, output_path, **options)
+    if command == "decode":
+        return decode_file(input_path, output_path, **options)
+    return verify_file(input_path, **options)
+
+class ServerMetrics:
+    """Queue depth, job counts and latency percentiles of a running server."""
+
+    def __init__(self, jobs: int, max_pending: int):
+        self.started = time.time()
+        self.jobs = jobs
+        self.max_pending = max_pending
+        self.waiting = 0  # Connections not yet admitted (their input is left unread).
+        self.queued = 0   # Admitted jobs waiting for a worker.
+        self.running = 0
+        self.completed: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        self.latencies: Dict[str, deque] = {}
+        self.queue_waits: Dict[str, deque] = {}
+
+    def record(self, command: str, latency: float, queue_wait: float, ok: bool):
+        counts = self.completed if ok else self.failed
+        counts[command] = counts.get(command, 0) + 1
+        self.latencies.setdefault(command, deque(maxlen=LATENCY_WINDOW)).append(latency)
+        self.queue_waits.setdefault(command, deque(maxlen=LATENCY_WINDOW)).append(queue_wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "jobs": self.jobs,
+            "max_pending": self.max_pending,
+            "queue_depth": self.waiting + self.queued,
+            "waiting": self.waiting,
+            "queued": self.queued,
+            "running": self.running,
+            "commands": {command: {
+                "completed": self.completed.get(command, 0),
+                "failed": self.failed.get(command, 0),
+                "latency_seconds": _summarize(self.latencies[command]),
+                "queue_wait_seconds": _summarize(self.queue_waits[command]),
+            } for command in sorted(self.latencies)},
+        }
+
+def _summarize(samples) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": round(sum(ordered) / len(ordered), 6),
+        "p50": round(ordered[len(ordered) // 2], 6),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 6),
+        "max": round(ordered[-1], 6),
+    }
+
+class HodServer:
+    """
+    Serves encode, decode and verify jobs on a Unix socket from a pool of
+    `jobs` warm worker processes. At most `max_pending` jobs are admitted at a
+    time; the input of any further connection is left unread, so clients are
+    slowed down by the socket buffers rather than queueing unbounded data.
+    Admitted jobs spool their input to a temporary directory, wait for a free
+    worker, and stream their output back once it is complete.
+    """
+
+    def __init__(self, socket_path: str, jobs: Optional[int] = None, max_pending: Optional[int] = None,
+                 spool_dir: Optional[str] = None):
+        self.socket_path = socket_path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.jobs
+        self.spool_dir = spool_dir
+        self.metrics = ServerMetrics(self.jobs, self.max_pending)
+        self.pool = None
+        self._clients = set()
+
+    def run(self):
+        """Serves until SIGINT or SIGTERM, finishing the jobs of connected clients and removing the socket on exit."""
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise HodError(f"A server is already listening on '{self.socket_path}'.")
+            os.remove(self.socket_path)
+        try:
+            asyncio.run(self._serve())
+            logging.info("Server stopped.")
+        finally:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._workers = asyncio.Semaphore(self.jobs)
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_warm_worker) as self.pool:
+            # Start (and warm) every worker before accepting jobs.
+            await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.jobs)))
+            server = await asyncio.start_unix_server(self._handle, sock=_bind_private(self.socket_path),
+                                                     limit=MAX_HEADER_BYTES)
+            logging.info(f"Serving on '{self.socket_path}' with {self.jobs} workers (at most {self.max_pending} pending jobs).")
+            stop = asyncio.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, stop.set)
+            async with server:
+                await stop.wait()
+                server.close()
+                logging.info(f"Stopping; finishing {len(self._clients)} connected clients' jobs...")
+                await asyncio.gather(*self._clients, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            await self._respond(reader, writer)
+        finally:
+            self._clients.discard(task)
+
+    async def _respond(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        started = time.perf_counter()
+        command = None
+        queue_wait = 0.0
+        try:
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError) as e:
+                # The rest of an overlong header is left unread, so its body cannot be found to discard it.
+                raise HodError(f"Malformed request header: {e}") from e
+            # A rejected request's body is read and dropped before the error is sent, so the client
+            # can finish sending it rather than fail with a broken pipe.
+            try:
+                header = json.loads(line)
+                command = header["command"]
+            except (ValueError, KeyError, TypeError) as e:
+                await _receive(reader, None)
+                raise HodError(f"Malformed request header: {e}") from e
+            if command == "metrics":
+                await _receive(reader, None)
+                result = self.metrics.snapshot()
+            elif command in JOB_OPTIONS:
+                unknown = set(header.get("options") or {}) - set(JOB_OPTIONS[command])
+                if unknown:
+                    await _receive(reader, None)
+                    raise HodError(f"Unsupported {command} options: {', '.join(sorted(unknown))}.")
+                result, queue_wait = await self._run(command, header, reader, writer)
+            else:
+                await _receive(reader, None)
+                raise HodError(f"Unknown command '{command}'.")
+            response = {"status": "ok", "result": result}
+        except HodError as e:
+            response = {"status": "error", "error": str(e)}
+        except Exception as e:
+            logging.exception(f"Job '{command}' failed unexpectedly.")
+            response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        latency = time.perf_counter() - started
+        if command in JOB_OPTIONS:
+            self.metrics.record(command, latency, queue_wait, response["status"] == "ok")
+            logging.info(f"{command} {response['status']} in {latency:.3f}s")
+        try:
+            writer.write(FRAME.pack(0) + json.dumps(response).encode('utf-8') + b"\n")
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass  # The client went away; nothing is left to tell it.
+
+    async def _run(self, command: str, header: Dict[str, Any], reader: asyncio.StreamReader,
+                   writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        self.metrics.waiting += 1
+        try:
+            await self._pending.acquire()
+        finally:
+            self.metrics.waiting -= 1
+        # File I/O runs in the default thread pool so that a slow disk cannot stall other connections.
+        directory = await asyncio.to_thread(tempfile.mkdtemp, prefix="hod-job-", dir=self.spool_dir)
+        try:
+            input_path = os.path.join(directory, _safe_name(header.get("input_name"), "input"))
+            await asyncio.to_thread(os.mkdir, os.path.join(directory, "out"))
+            output_path = os.path.join(directory, "out", _safe_name(header.get("output_name"), "output"))
+            await _receive(reader, input_path)
+            queued = time.perf_counter()
+            self.metrics.queued += 1
+            try:
+                await self._workers.acquire()
+            finally:
+                self.metrics.queued -= 1
+            queue_wait = time.perf_counter() - queued
+            self.metrics.running += 1
+            try:
+                result = await loop.run_in_executor(self.pool, _run_job, command, header.get("options") or {},
+                                                    input_path, output_path)
+            finally:
+                self.metrics.running -= 1
+                self._workers.release()
+            if command != "verify" and await asyncio.to_thread(os.path.exists, output_path):
+                await _send_file(writer, output_path)
+            return result, queue_wait
+        finally:
+            try:
+                await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+            finally:
+                self._pending.release()
+
+def _safe_name(name: Any, default: str) -> str:
+    """Keeps only the file name of a client-supplied name, whose extension selects the keymap format."""
+    name = os.path.basename(str(name or ""))
+    return name if name not in ("", ".", "..") else default
+
+async def _receive(reader: asyncio.StreamReader, path: Optional[str]):
+    """Reads frames up to the empty frame, writing them to path (or discarding them) from a worker thread."""
+    f = await asyncio.to_thread(open, path, 'wb') if path else None
+    try:
+        while True:
+            try:
+                (size,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+                if not size:
+                    return
+                data = await reader.readexactly(size)
+            except asyncio.IncompleteReadError as e:
+                raise HodError("The client closed the connection mid-request.") from e
+            if f is not None:
+                await asyncio.to_thread(f.write, data)
+    finally:
+        if f is not None:
+            await asyncio.to_thread(f.close)
+
+async def _send_file(writer: asyncio.StreamWriter, path: str):
+    """Streams a file as frames, reading it from a worker thread."""
+    f = await asyncio.to_thread(open, path, 'rb')
+    try:
+        while (chunk := await asyncio.to_thread(f.read, FRAME_BYTES)):
+            writer.write(FRAME.pack(len(chunk)) + chunk)
+            await writer.drain()
+    finally:
+        await asyncio.to_thread(f.close)
+
+def _bind_private(socket_path: str) -> socket.socket:
+    """
+    Binds a Unix socket that only its owner can connect to. Jobs name paths on
+    the daemon's side (the cache directory, the original to verify against),
+    so the socket is created under a restrictive umask rather than chmod-ed
+    after it is already reachable.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous = os.umask(0o177)
+    try:
+        sock.bind(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(previous)
+    return sock
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,292 @@
+# utils/stats.py
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is reported as null.
+    resource = None
+
+# Comma-separated profilers to enable: "cprofile", "tracemalloc".
+PROFILE_ENV = "HOD_PROFILE"
+# Directory for cProfile dumps (hod-<command>-<pid>.prof); nothing is dumped if unset.
+PROFILE_DIR_ENV = "HOD_PROFILE_DIR"
+# Comma-separated "module:factory" sinks to load, e.g. "myjobs.metrics:PushSink".
+SINKS_ENV = "HOD_STATS_SINKS"
+# Number of profile and allocation entries included in a report.
+PROFILE_TOP = 20
+# Items Stats.timed pulls per clock reading; timing every item doubled the cost of a run-heavy encode.
+TIMED_BATCH = 1024
+
+def peak_rss_mb() -> Optional[float]:
+    """Returns the peak resident set size of this process in MB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+class StatsSink(ABC):
+    """Abstract Base Class for the receivers of a finished Stats report."""
+
+    @abstractmethod
+    def emit(self, report: Dict[str, Any]):
+        """Delivers the report of a finished Stats session."""
+        pass
+
+class JsonFileSink(StatsSink):
+    """Writes the report as a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, report: Dict[str, Any]):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+class LogSink(StatsSink):
+    """Logs the report as a single JSON line."""
+
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def emit(self, report: Dict[str, Any]):
+        logging.log(self.level, "stats " + json.dumps(report, sort_keys=True))
+
+def load_env_sinks() -> List[StatsSink]:
+    """
+    Instantiates the sinks named in HOD_STATS_SINKS. A spec that is malformed
+    or cannot be loaded is logged and skipped, so it never stops the command.
+    """
+    sinks = []
+    for spec in filter(None, (part.strip() for part in os.environ.get(SINKS_ENV, "").split(","))):
+        module_name, _, attribute = spec.partition(":")
+        if not module_name or not attribute:
+            logging.warning(f"Ignoring stats sink '{spec}' in {SINKS_ENV}; expected 'module:factory'.")
+            continue
+        try:
+            sinks.append(getattr(importlib.import_module(module_name), attribute)())
+        except Exception as e:
+            logging.warning(f"Ignoring stats sink '{spec}' in {SINKS_ENV}: {type(e).__name__}: {e}")
+    return sinks
+
+class _Counted:
+    """Wraps a binary stream, adding the bytes read or written to a counter."""
+
+    def __init__(self, stream: BinaryIO, stats: 'Stats', counter: str):
+        self.stream = stream
+        self.stats = stats
+        self.counter = counter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.stats.count(self.counter, len(data))
+        return data
+
+    def write(self, data: bytes) -> int:
+        self.stats.count(self.counter, len(data))
+        return self.stream.write(data)
+
+class _TimedHasher:
+    """Wraps a MultiHasher so the time spent hashing is attributed to a stage."""
+
+    def __init__(self, hasher, stats: 'Stats', stage: str):
+        self.hasher = hasher
+        self.stats = stats
+        self.stage = stage
+
+    def update(self, data: bytes):
+        with self.stats.stage(self.stage):
+            self.hasher.update(data)
+
+    def hexdigests(self) -> Dict[str, str]:
+        return self.hasher.hexdigests()
+
+class Stats:
+    """
+    Collects stage timings, counters and peak memory for one command.
+
+    Stage times are exclusive: time spent in a nested stage, including a lazy
+    upstream stage pulled through timed(), is not counted again in the stage
+    that consumed it. A disabled Stats adds no wrappers and records nothing.
+    """
+
+    def __init__(self, command: str, sinks: Iterable[StatsSink] = (), enabled: bool = True,
+                 profilers: Iterable[str] = ()):
+        self.command = command
+        self.sinks = list(sinks)
+        self.enabled = enabled
+        self.profilers = [name for name in profilers if name]
+        self.info: Dict[str, Any] = {}
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.memory: Dict[str, Optional[float]] = {}
+        self._stack: List[float] = []
+        self._profiler = None
+        self._started = None
+
+    @classmethod
+    def for_command(cls, command: str, stats_file: Optional[str] = None) -> 'Stats':
+        """Builds the Stats for a CLI command from --stats and the HOD_* environment variables."""
+        sinks = load_env_sinks()
+        if stats_file:
+            sinks.append(JsonFileSink(stats_file))
+        profilers = [name.strip().lower() for name in os.environ.get(PROFILE_ENV, "").split(",")]
+        profilers = [name for name in profilers if name]
+        return cls(command, sinks, enabled=bool(sinks or profilers), profilers=profilers)
+
+    def _add(self, stage: str, elapsed: float, child: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - child
+        if self._stack:
+            self._stack[-1] += elapsed
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times the enclosed block as the named stage and samples peak memory afterwards."""
+        if not self.enabled:
+            yield
+            return
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._add(name, elapsed, self._stack.pop())
+            self.memory[name] = peak_rss_mb()
+
+    def timed(self, iterable: Iterable[Any], stage: str, counter: Optional[str] = None,
+              batch: int = TIMED_BATCH) -> Iterable[Any]:
+        """
+        Attributes the time spent producing the items to stage, counting them
+        under counter. Items are pulled and timed `batch` at a time, so the
+        clock is read once per batch rather than once per item; streams of
+        large chunks should pass batch=1 to avoid holding many at once.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed(iter(iterable), stage, counter, batch)
+
+    def _timed(self, iterator: Iterator[Any], stage: str, counter: Optional[str], batch: int) -> Iterator[Any]:
+        clock = time.perf_counter
+        stack = self._stack
+        while True:
+            stack.append(0.0)
+            start = clock()
+            try:
+                items = list(islice(iterator, batch))
+            finally:
+                self._add(stage, clock() - start, stack.pop())
+            if not items:
+                return
+            if counter:
+                self.counters[counter] = self.counters.get(counter, 0) + len(items)
+            yield from items
+
+    def count(self, counter: str, amount: int = 1):
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def reader(self, stream: BinaryIO, counter: str = 'bytes_read'):
+        """Wraps a binary stream so the bytes read through it are counted."""
+        return _Counted(stream, self, counter) if self.enabled else stream
+
+    def writer(self, stream: BinaryIO, counter: str = 'bytes_written'):
+        """Wraps a binary stream so the bytes written through it are counted."""
+        return _Counted(stream, self, counter) if self.enabled else stream
+
+    def hasher(self, hasher, stage: str = 'hashing'):
+        """Wraps a MultiHasher so its update time is attributed to stage."""
+        return _TimedHasher(hasher, self, stage) if self.enabled else hasher
+
+    @contextmanager
+    def session(self):
+        """
+        Wraps a whole command: starts the profilers, and on exit (including
+        sys.exit) builds the report and emits it to every sink.
+        """
+        if not self.enabled:
+            yield self
+            return
+        self._start_profilers()
+        self._started = time.perf_counter()
+        status = 0
+        try:
+            yield self
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+            raise
+        except BaseException:
+            status = 1
+            raise
+        finally:
+            report = self.report(status)
+            for sink in self.sinks:
+                try:
+                    sink.emit(report)
+                except Exception as e:
+                    logging.warning(f"Failed to emit stats to {type(sink).__name__}: {e}")
+
+    def report(self, status: int = 0) -> Dict[str, Any]:
+        """Returns the collected numbers as a JSON-serializable dictionary."""
+        wall = time.perf_counter() - self._started if self._started is not None else sum(self.stages.values())
+        report = {
+            "command": self.command,
+            "status": status,
+            **self.info,
+            "wall_seconds": round(wall, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "throughput": {f"{name}_per_s": round(value / wall, 1)
+                           for name, value in self.counters.items() if wall > 0},
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_mb_after_stage": dict(self.memory),
+        }
+        report.update(self._stop_profilers())
+        return report
+
+    def _start_profilers(self):
+        if 'tracemalloc' in self.profilers:
+            import tracemalloc
+            tracemalloc.start()
+        if 'cprofile' in self.profilers:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stop_profilers(self) -> Dict[str, Any]:
+        results = {}
+        if self._profiler is not None:
+            import pstats
+            self._profiler.disable()
+            profile_dir = os.environ.get(PROFILE_DIR_ENV)
+            if profile_dir:
+                path = os.path.join(profile_dir, f"hod-{self.command}-{os.getpid()}.prof")
+                self._profiler.dump_stats(path)
+                results["cprofile_file"] = path
+            entries = pstats.Stats(self._profiler).stats
+            top = sorted(entries.items(), key=lambda entry: entry[1][3], reverse=True)[:PROFILE_TOP]
+            results["cprofile"] = [{"function": f"{filename}:{line}({name})", "calls": calls,
+                                    "total_seconds": round(total, 6), "cumulative_seconds": round(cumulative, 6)}
+                                   for (filename, line, name), (_, calls, total, cumulative, _) in top]
+            self._profiler = None
+        if 'tracemalloc' in self.profilers:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP]
+                tracemalloc.stop()
+                results["tracemalloc"] = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "top": [{"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count} for stat in top],
+                }
+        return results
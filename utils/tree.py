@@ -0,0 +1,221 @@
+# utils/tree.py
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from formats import FORMATS, FORMATS_BY_EXT
+from .cache import KeymapCache
+from .compression import CODECS, split_compression_extension
+from .constants import MANIFEST_NAME
+from .pipeline import HodError, decode_file, encode_file, verify_file
+
+# Files smaller than this are packed together into shared tasks.
+PACK_THRESHOLD = 1 << 20
+# Upper bound on the bytes and files of one packed task.
+PACK_BYTES = 8 << 20
+PACK_FILES = 256
+
+def walk_files(root: str, keep: Callable[[str], bool] = lambda path: True,
+               exclude: Optional[str] = None) -> List[Tuple[str, int]]:
+    """
+    Returns (relative path, size) for every regular file under root, in sorted
+    order, skipping the exclude directory (e.g. a destination inside root).
+    """
+    files = []
+    exclude = os.path.realpath(exclude) if exclude else None
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories
+                                   if os.path.realpath(os.path.join(directory, name)) != exclude)
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            relative = os.path.relpath(path, root)
+            if os.path.isfile(path) and keep(relative):
+                files.append((relative, os.path.getsize(path)))
+    return files
+
+def plan_tasks(files: List[Tuple[str, int]], pack_threshold: int = PACK_THRESHOLD,
+               pack_bytes: int = PACK_BYTES, pack_files: int = PACK_FILES) -> List[List[str]]:
+    """
+    Groups files into pool tasks, largest first. Each large file is a task of
+    its own; small files are packed together up to pack_bytes or pack_files,
+    so per-task overhead is shared. Scheduling the largest tasks first keeps
+    a big file from starting last and leaving the other workers idle.
+    """
+    tasks: List[Tuple[int, List[str]]] = []
+    pack: List[str] = []
+    pack_size = 0
+    for relative, size in sorted(files, key=lambda item: (-item[1], item[0])):
+        if size >= pack_threshold:
+            tasks.append((size, [relative]))
+            continue
+        if pack and (pack_size + size > pack_bytes or len(pack) >= pack_files):
+            tasks.append((pack_size, pack))
+            pack, pack_size = [], 0
+        pack.append(relative)
+        pack_size += size
+    if pack:
+        tasks.append((pack_size, pack))
+    tasks.sort(key=lambda task: -task[0])
+    return [paths for _, paths in tasks]
+
+def _quiet_worker():
+    # Per-file progress is logged by the parent; workers only report problems.
+    logging.getLogger().setLevel(max(logging.getLogger().level, logging.WARNING))
+
+def _run_task(function: Callable[..., Dict[str, Any]], paths: List[str], *args) -> List[Dict[str, Any]]:
+    """Runs one pool task, turning each file's failure into a result instead of an exception."""
+    results = []
+    for relative in paths:
+        start = time.perf_counter()
+        try:
+            result = {"path": relative, "status": "ok", **function(relative, *args)}
+        except HodError as e:
+            result = {"path": relative, "status": "failed", "error": str(e)}
+        except Exception as e:
+            result = {"path": relative, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        results.append(result)
+    return results
+
+def _encode_one(relative: str, source: str, destination: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    input_file = os.path.join(source, relative)
+    extension = FORMATS[options['format_name']].extension
+    if options['compression']:
+        extension += CODECS[options['compression']].extension
+    keymap = os.path.join(destination, relative + extension)
+    os.makedirs(os.path.dirname(keymap), exist_ok=True)
+    metadata = encode_file(input_file, keymap, **options)
+    integrity = metadata['integrity']
+    return {
+        "keymap": os.path.relpath(keymap, destination),
+        "input_size_bytes": metadata['input_size_bytes'],
+        "keymap_size_bytes": os.path.getsize(keymap),
+        "file_hashes": integrity.get('file_hashes') or {},
+    }
+
+def _decode_one(relative: str, source: str, destination: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    keymap = os.path.join(source, relative)
+    output_file = os.path.join(destination, os.path.splitext(split_compression_extension(relative)[0])[0])
+    os.makedirs(os.path.dirname(output_file) or destination, exist_ok=True)
+    metadata = decode_file(keymap, output_file, **options)
+    return {
+        "output": os.path.relpath(output_file, destination),
+        "output_size_bytes": os.path.getsize(output_file),
+        "verified": metadata['verified'],
+    }
+
+def _verify_one(path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = verify_file(path, **options)
+    return {key: metadata.get(key) for key in ("input_size_bytes", "verified", "hmac_verified", "matches_original")}
+
+def _run_pool(command: str, function: Callable, files: List[Tuple[str, int]], args: Tuple, jobs: int) -> List[Dict[str, Any]]:
+    """Runs function(path, *args) for every file in a pool of worker processes, logging and returning the results sorted by path."""
+    results = []
+    tasks = plan_tasks(files)
+    logging.info(f"{command}: {len(files)} files in {len(tasks)} tasks across {jobs} worker processes.")
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_quiet_worker) as pool:
+        futures = {pool.submit(_run_task, function, paths, *args): paths for paths in tasks}
+        for future in as_completed(futures):
+            paths = futures[future]
+            try:
+                task_results = future.result()
+            except Exception as e:  # The worker itself died; record every file of the task.
+                task_results = [{"path": path, "status": "failed", "error": f"Worker failed: {e}"} for path in paths]
+            for result in task_results:
+                if result['status'] == 'ok':
+                    logging.info(f"✅ {result['path']}")
+                else:
+                    logging.error(f"❌ {result['path']}: {result['error']}")
+            results.extend(task_results)
+    results.sort(key=lambda result: result['path'])
+    return results
+
+def _run_tree(command: str, function: Callable, source: str, destination: str, files: List[Tuple[str, int]],
+              options: Dict[str, Any], jobs: int, manifest_path: Optional[str]) -> Dict[str, Any]:
+    os.makedirs(destination, exist_ok=True)
+    start = time.perf_counter()
+    results = _run_pool(command, function, files, (source, destination, options), jobs)
+
+    failed = sum(result['status'] != 'ok' for result in results)
+    manifest = {
+        "hod_version": "2.0",
+        "command": command,
+        "created_utc": datetime.now(timezone.utc).isoformat(),
+        "source": os.path.abspath(source),
+        "destination": os.path.abspath(destination),
+        "options": {key: value.directory if isinstance(value, KeymapCache) else value
+                    for key, value in options.items() if key != 'passphrase'},
+        "summary": {
+            "files": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "input_bytes": sum(size for _, size in files),
+            "seconds": round(time.perf_counter() - start, 6),
+            "jobs": jobs,
+        },
+        "files": results,
+    }
+    manifest_path = manifest_path or os.path.join(destination, MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Manifest written to '{manifest_path}'.")
+    return manifest
+
+def encode_tree(source: str, destination: str, strategy: str = 'rle', hash_algos=(), passphrase: Optional[str] = None,
+                format_name: str = 'json', jobs: Optional[int] = None, manifest_path: Optional[str] = None,
+                cache: Optional[KeymapCache] = None, index_interval: Optional[int] = None,
+                compression: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Encodes every file under source into a keymap at the same relative path
+    under destination (with the format's and any codec's extension appended), using a pool of
+    worker processes. Failures are recorded in the manifest rather than raised.
+    Workers share the cache, if given, so repeated content is mostly encoded once.
+    """
+    options = {"strategy": strategy, "hash_algos": list(hash_algos), "passphrase": passphrase, "format_name": format_name,
+               "cache": cache, "index_interval": index_interval, "compression": compression}
+    files = walk_files(source, exclude=destination)
+    return _run_tree("encode-tree", _encode_one, source, destination, files, options,
+                     jobs or os.cpu_count() or 1, manifest_path)
+
+def decode_tree(source: str, destination: str, passphrase: Optional[str] = None, paranoid_reverify: bool = False,
+                jobs: Optional[int] = None, manifest_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Decodes every keymap under source (recognized by extension, optionally
+    followed by a codec extension) into the file at the same relative path
+    under destination, minus the keymap extensions.
+    """
+    options = {"passphrase": passphrase, "paranoid_reverify": paranoid_reverify}
+    files = walk_files(source, keep=lambda path: os.path.splitext(split_compression_extension(path)[0])[1] in FORMATS_BY_EXT,
+                       exclude=destination)
+    return _run_tree("decode-tree", _decode_one, source, destination, files, options,
+                     jobs or os.cpu_count() or 1, manifest_path)
+
+def verify_keymaps(keymaps: List[str], original: Optional[str] = None, passphrase: Optional[str] = None,
+                   jobs: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Verifies keymaps with verify_file in a pool of worker processes, without
+    writing any output, and returns a summary and the per-keymap results.
+    An original file can only be compared with a single keymap.
+    """
+    if original and len(keymaps) != 1:
+        raise HodError("An original file can only be compared with a single keymap.")
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    options = {"original": original, "passphrase": passphrase}
+    files = [(path, os.path.getsize(path)) for path in dict.fromkeys(keymaps)]
+    results = _run_pool("verify", _verify_one, files, (options,), jobs)
+    failed = sum(result['status'] != 'ok' for result in results)
+    return {
+        "summary": {
+            "files": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 6),
+            "jobs": jobs,
+        },
+        "files": results,
+    }
@@ -0,0 +1,19 @@
+# utils/units.py
+
+# Binary size units accepted on the command line.
+_SIZE_UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30, 'B': 1}
+
+def parse_size(text: str) -> int:
+    """Parses a size such as '1KB', '64MB' or '2GB' (binary units) into bytes."""
+    text = text.strip().upper()
+    for unit in ('KB', 'MB', 'GB', 'B'):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * _SIZE_UNITS[unit])
+    return int(text)
+
+def format_size(size: int) -> str:
+    """Formats a byte count in the largest unit that divides it exactly, such as '64KB'."""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= _SIZE_UNITS[unit] and size % _SIZE_UNITS[unit] == 0:
+            return f"{size // _SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"